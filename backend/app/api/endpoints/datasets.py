@@ -1,54 +1,119 @@
 # backend/app/api/endpoints/datasets.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
 import json
+import logging
 import pandas as pd
 import numpy as np
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request
+from pydantic import BaseModel
 from sqlmodel import Session, select
 from app.core.database import get_session
+from app.core.serialization import FastJSONResponse, negotiate
 from app.models.dataset import Dataset
 from app.services.dataset_service import (
     process_uploaded_file, 
-    analyze_file_preview, 
     calculate_quality_score
 )
+from app.services import index_service, columnar_store, artifact_cache, staging_service, resumable_upload, blob_store, dtype_optimizer, type_inference, profile_service
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+class ResumableUploadInit(BaseModel):
+    filename: str
+    total_size: int
+    chunk_size: Optional[int] = None
+    sha256: Optional[str] = None  # optional whole-file checksum verified on complete
+    sheet: Optional[str] = None   # Excel worksheet (name or 0-based index)
+
+class RowFilter(BaseModel):
+    column: str
+    op: str  # eq, in, gt, gte, lt, lte, between, is_null, not_null
+    value: Optional[Any] = None
+
+class RowQueryRequest(BaseModel):
+    filters: List[RowFilter] = []
+    columns: Optional[List[str]] = None
+    offset: int = 0
+    limit: int = index_service.DEFAULT_PAGE_SIZE
 
 @router.post("/upload", response_model=Dataset)
 async def upload_dataset(
     file: UploadFile = File(...),
+    sheet: Optional[str] = Query(None, description="Excel worksheet to ingest (name or 0-based index)"),
     session: Session = Depends(get_session)
 ):
     """Functionality 7: Secure Ingestion and Audit Persistence."""
     try:
-        dataset = process_uploaded_file(file, session)
+        dataset = process_uploaded_file(file, session, sheet)
         return dataset
     except Exception as e:
-        print(f"CRITICAL UPLOAD ERROR: {str(e)}")
+        logger.exception("Upload of %s failed", file.filename)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/preview")
 async def preview_dataset_endpoint(
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    sheet: Optional[str] = Query(None, description="Excel worksheet to preview (name or 0-based index)")
 ):
     """
     Functionality 1: Automatic Orientation.
     Provides immediate feedback on file structure before saving to database.
+    The parsed result is staged under 'upload_token' so confirming does not re-upload.
     """
     try:
-        return analyze_file_preview(file)
+        return FastJSONResponse(staging_service.stage_upload(file, sheet))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Orientation Failed: {str(e)}")
 
+@router.post("/upload/{upload_token}", response_model=Dataset)
+def commit_staged_upload(upload_token: str, session: Session = Depends(get_session)):
+    """Functionality 7: Commits a previewed upload without re-sending or re-parsing the file."""
+    return staging_service.commit_staged(upload_token, session)
+
+@router.delete("/upload/{upload_token}")
+def discard_staged_upload(upload_token: str):
+    """Cancels a previewed upload and frees its staged files."""
+    staging_service.discard_staged(upload_token)
+    return {"ok": True}
+
+# ─────────────────────────────────────────────────────
+# RESUMABLE CHUNKED UPLOADS (init → PUT chunks → complete → /upload/{token})
+# ─────────────────────────────────────────────────────
+
+@router.post("/uploads")
+def init_resumable_upload(req: ResumableUploadInit):
+    """Opens a resumable upload session; the response lists the chunk layout."""
+    return resumable_upload.init_upload(req.filename, req.total_size, req.chunk_size, req.sha256, req.sheet)
+
+@router.get("/uploads/{upload_id}")
+def get_resumable_upload(upload_id: str):
+    """Received/missing chunks, so an interrupted client only resends what is missing."""
+    return resumable_upload.upload_status(upload_id)
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def put_resumable_chunk(upload_id: str, index: int, request: Request):
+    """Raw chunk bytes in the body, SHA-256 hex digest in the X-Chunk-SHA256 header."""
+    return await resumable_upload.receive_chunk(upload_id, index, request)
+
+@router.post("/uploads/{upload_id}/complete")
+def complete_resumable_upload(upload_id: str):
+    """Assembles, verifies and stages the upload; returns the preview with an upload_token."""
+    return FastJSONResponse(resumable_upload.complete_upload(upload_id))
+
+@router.delete("/uploads/{upload_id}")
+def abort_resumable_upload(upload_id: str):
+    resumable_upload.abort_upload(upload_id)
+    return {"ok": True}
+
 @router.get("/", response_model=List[Dataset])
 def read_datasets(session: Session = Depends(get_session)):
     """Retrieves high-fidelity audit history sorted by most recent ingest."""
     return session.exec(select(Dataset).order_by(Dataset.id.desc())).all()
 
 @router.get("/{dataset_id}/preview")
-def preview_existing_dataset(dataset_id: int, session: Session = Depends(get_session)):
+def preview_existing_dataset(dataset_id: int, request: Request, session: Session = Depends(get_session)):
     """
     Functionality 2: Forensic Radical Transparency.
     Isolates 'not good' rows and calculates simple metrics for the frontend cards.
@@ -60,7 +125,7 @@ def preview_existing_dataset(dataset_id: int, session: Session = Depends(get_ses
     try:
         # Use the format-aware loader (handles CSV, Excel, JSON, XML, etc.)
         from app.services.eda_service import _load_dataframe_from_disk
-        df = _load_dataframe_from_disk(dataset.filepath).copy()
+        df = _load_dataframe_from_disk(dataset.filepath, dataset.column_schema or dtype_optimizer.AUTO_SCHEMA).copy()
         
         # 1. SIMPLE FORENSIC METRICS: Terminology simplified for beginners
         null_mask = df.isnull().any(axis=1)
@@ -68,23 +133,16 @@ def preview_existing_dataset(dataset_id: int, session: Session = Depends(get_ses
         null_col_count = int(df.isnull().any(axis=0).sum())
         total_missing = int(df.isnull().sum().sum())
         
-        # 2. TYPE MISMATCH ENGINE: Detects 'Wrong Types' (Numbers stored as Text)
-        type_mismatches = 0
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                # Check if this text column contains mostly numeric patterns
-                clean_col = df[col].dropna()
-                if not clean_col.empty:
-                    numeric_conv = pd.to_numeric(clean_col, errors='coerce')
-                    if (numeric_conv.notnull().sum() / len(clean_col)) > 0.5:
-                        type_mismatches += 1
+        # 2. TYPE MISMATCH ENGINE: Detects 'Wrong Types' (numbers, amounts, flags or dates stored as Text)
+        # Same verdicts as ingestion and issue detection, cached per dataset version
+        type_mismatches = len(type_inference.mismatches(profile_service.type_verdicts(session, dataset)))
         
         # 3. ANOMALY ISOLATION: Isolates rows with nulls for the targeted preview
         anomaly_df = df[null_mask].head(50)
         
-        # Sanitize for JSON Handshake (NaN -> None)
-        df_full = df.head(100).replace({np.nan: None})
-        df_anomaly = anomaly_df.replace({np.nan: None})
+        # Row frames are encoded by the response layer straight from the column arrays (NaN -> null)
+        df_full = df.head(100)
+        df_anomaly = anomaly_df
         
         # 4. GLASS BOX UNPACKING: Extract detailed metadata from storage
         glass_box = {}
@@ -124,14 +182,14 @@ def preview_existing_dataset(dataset_id: int, session: Session = Depends(get_ses
                 "desc": glass_box["dataset_explanation"]["description"]
             })
 
-        return {
+        return negotiate(request, {
             "filename": dataset.filename,
             "file_type": dataset.file_type,
             "row_count": len(df),
             "column_count": len(df.columns),
             "columns": list(df.columns),
-            "full_data": df_full.to_dict(orient="records"),
-            "anomaly_data": df_anomaly.to_dict(orient="records"),
+            "full_data": df_full,
+            "anomaly_data": df_anomaly,
             "dtypes": df.dtypes.astype(str).to_dict(),
             "quality_score": calculate_quality_score(df),
             "processing_log": dataset.processing_log,
@@ -158,10 +216,62 @@ def preview_existing_dataset(dataset_id: int, session: Session = Depends(get_ses
             
             "forensic_trace": json.loads(dataset.forensic_trace) if dataset.forensic_trace else [],
             "ingestion_insights": insights_list
-        }
+        }, "full_data")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Forensic Audit Failed: {str(e)}")
 
+@router.get("/{dataset_id}/rows")
+def browse_dataset_rows(
+    dataset_id: int,
+    request: Request,
+    offset: int = Query(0, ge=0, description="Row position to start from (ignored when a cursor is given)"),
+    limit: int = Query(index_service.DEFAULT_PAGE_SIZE, ge=1, le=index_service.MAX_PAGE_SIZE),
+    columns: Optional[str] = Query(None, description="Comma-separated column projection"),
+    sort: Optional[str] = Query(None, description="Column to sort by on the server"),
+    descending: bool = Query(False),
+    cursor: Optional[str] = Query(None, description="Opaque keyset cursor from a previous page"),
+    session: Session = Depends(get_session)
+):
+    """
+    Row Browser Node: Windowed access to any depth of the dataset.
+    Only the row groups holding the requested window are read from the canonical columnar file.
+    """
+    projection = [c for c in columns.split(",") if c] if columns else None
+    return negotiate(request, index_service.browse_rows(
+        dataset_id,
+        session,
+        offset=offset,
+        limit=limit,
+        columns=projection,
+        sort=sort,
+        descending=descending,
+        cursor=cursor
+    ), "rows")
+
+@router.post("/{dataset_id}/rows/query")
+def query_dataset_rows(dataset_id: int, req: RowQueryRequest, request: Request, session: Session = Depends(get_session)):
+    """
+    Drilldown Node: Filtered, paginated row access.
+    Range, equality and IS NULL predicates are answered from per-column secondary
+    indexes (sorted permutations / inverted value maps) where built, otherwise pushed
+    down into the columnar reader, instead of full-frame masks.
+    """
+    return negotiate(request, index_service.query_rows(
+        dataset_id,
+        [f.model_dump() for f in req.filters],
+        session,
+        columns=req.columns,
+        offset=req.offset,
+        limit=req.limit
+    ), "rows")
+
+@router.delete("/{dataset_id}/artifacts")
+def clear_dataset_artifacts(dataset_id: int, kind: Optional[str] = None, session: Session = Depends(get_session)):
+    """Explicitly drops cached reports/insights/summaries for a dataset (optionally one kind)."""
+    if not session.get(Dataset, dataset_id):
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return {"ok": True, "removed": artifact_cache.invalidate(session, dataset_id, kind)}
+
 @router.delete("/{dataset_id}")
 def delete_dataset(dataset_id: int, session: Session = Depends(get_session)):
     """Removes MySQL metadata and associated binary files from the buffer."""
@@ -169,10 +279,17 @@ def delete_dataset(dataset_id: int, session: Session = Depends(get_session)):
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
-    if os.path.exists(dataset.filepath):
-        try: os.remove(dataset.filepath)
-        except Exception as e: print(f"Deletion Warning: {e}")
+    if dataset.content_hash:
+        # Shared blob: the file is only removed once no dataset references it
+        blob_store.release(session, dataset.content_hash)
+    else:
+        if os.path.exists(dataset.filepath):
+            try: os.remove(dataset.filepath)
+            except Exception as e: logger.warning("Deletion warning: %s", e)
+        try: columnar_store.remove_canonical(dataset.filepath)
+        except Exception as e: logger.warning("Deletion warning: %s", e)
 
+    artifact_cache.invalidate(session, dataset_id)
     session.delete(dataset)
     session.commit()
     return {"ok": True}
\ No newline at end of file
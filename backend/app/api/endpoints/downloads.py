@@ -1,5 +1,6 @@
 
-from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
 from sqlmodel import Session
 from app.core.database import get_session
 from app.services import download_service
@@ -9,13 +10,15 @@ router = APIRouter()
 @router.get("/{dataset_id}/data")
 def download_data(
     dataset_id: int, 
+    request: Request,
     version: str = Query("prepared", enum=["original", "prepared"]), 
+    format: Optional[str] = Query(None, enum=["csv", "tsv", "json", "xml", "xlsx", "parquet"], description="Defaults to the dataset's original format"),
     session: Session = Depends(get_session)
 ):
     """
-    Download the dataset in CSV format.
+    Download the dataset (streamed; stored files are sent straight from disk with Range/ETag support).
     """
-    return download_service.generate_csv_export(dataset_id, version, session)
+    return download_service.generate_csv_export(dataset_id, version, session, fmt=format, request=request)
 
 @router.get("/{dataset_id}/zip")
 def download_bundle(dataset_id: int, session: Session = Depends(get_session)):
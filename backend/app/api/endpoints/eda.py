@@ -1,7 +1,8 @@
 # backend/app/api/endpoints/eda.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session
 from app.core.database import get_session
+from app.core.serialization import negotiate
 from app.services import eda_service
 
 router = APIRouter()
@@ -37,7 +38,7 @@ def get_missing(dataset_id: int, session: Session = Depends(get_session)):
         )
 
 @router.get("/{dataset_id}/correlation")
-def get_correlation(dataset_id: int, session: Session = Depends(get_session)):
+def get_correlation(dataset_id: int, request: Request, session: Session = Depends(get_session)):
     """
     Functionality 3.2: Relationship Discovery Logic.
     Calculates connections (Symmetry or Conflict) between numeric features
@@ -45,7 +46,8 @@ def get_correlation(dataset_id: int, session: Session = Depends(get_session)):
     """
     try:
         # Returns connection matrix and top discovery sentences for the UI
-        return eda_service.get_correlation_matrix(dataset_id, session)
+        result = eda_service.get_correlation_matrix(dataset_id, session)
+        return negotiate(request, result, "matrix")
     except Exception as e:
         raise HTTPException(
             status_code=500, 
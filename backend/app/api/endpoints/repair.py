@@ -1,14 +1,17 @@
 import os
+import json
 import pandas as pd
 import numpy as np
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from sqlmodel import Session
 from app.core.database import get_session
+from app.core.serialization import negotiate
 from app.models.dataset import Dataset
 from app.services.repair_engine import generate_recommendations, simulate_repair, apply_strategy
 from app.services.eda_service import get_dataframe
-from app.services.dataset_service import calculate_quality_score, _save_dataframe
+from app.services.dataset_service import calculate_quality_score, quality_score_from_counts, _save_dataframe
+from app.services import blob_store, dtype_optimizer, out_of_core, profile_service
 from datetime import datetime
 
 router = APIRouter()
@@ -27,9 +30,12 @@ def get_recommendations(dataset_id: int, session: Session = Depends(get_session)
     return generate_recommendations(dataset_id, session)
 
 @router.post("/simulate")
-def run_simulation(req: SimulationRequest, session: Session = Depends(get_session)):
+def run_simulation(req: SimulationRequest, request: Request, session: Session = Depends(get_session)):
     """Dry-run the proposed statistical strategy on a cloned dataset and return metric deltas."""
-    return simulate_repair(req.dataset_id, req.column, req.strategy, session)
+    result = simulate_repair(req.dataset_id, req.column, req.strategy, session)
+    if "error" in result:
+        return result
+    return negotiate(request, result, ["before_sample", "after_sample"])
 
 @router.post("/apply")
 def apply_repair_endpoint(req: SimulationRequest, session: Session = Depends(get_session)):
@@ -39,6 +45,9 @@ def apply_repair_endpoint(req: SimulationRequest, session: Session = Depends(get
     original_dataset = session.get(Dataset, req.dataset_id)
     if not original_dataset:
         raise HTTPException(status_code=404, detail="Original dataset not found")
+
+    if out_of_core.enabled_for(original_dataset) and out_of_core.can_stream_fill(original_dataset, req.strategy):
+        return _apply_fill_out_of_core(original_dataset, req, session)
         
     df_original = get_dataframe(req.dataset_id, session)
     df = df_original.copy()
@@ -141,29 +150,92 @@ def _save_repaired_dataset(
     session: Session
 ):
     """Save repaired DataFrame as a new dataset entry in the ORIGINAL format."""
-    original_name = original_dataset.filename
-    clean_base = original_name.rsplit('.', 1)[0].replace('_repaired', '')
     # Use the original file_type stored in the DB, not parsed from filename
     ext = original_dataset.file_type if original_dataset.file_type else 'csv'
-    new_filename = f"{clean_base}_repaired.{ext}"
-    new_filepath = os.path.join(os.path.dirname(original_dataset.filepath), new_filename)
     
-    # Save repaired dataset in original format
-    _save_dataframe(df, new_filepath, ext)
+    # Save repaired dataset in original format (content-addressed: repeated repairs never overwrite each other)
+    blob = blob_store.put_frame(session, df, ext, _save_dataframe)
     
     new_quality = calculate_quality_score(df)
     
+    result = _record_repaired_dataset(
+        blob, original_dataset, strategy, new_quality, len(df), len(df.columns),
+        dtype_optimizer.dump_schema(df), rows_modified, rows_before, rows_after, session
+    )
+    # The new version's dashboards start from the parent's column profile: only the
+    # columns this repair rewrote are re-profiled (df still carries parent row labels)
+    profile_service.derive_profile(session, original_dataset, session.get(Dataset, result["new_dataset_id"]), df)
+    return result
+
+
+def _apply_fill_out_of_core(original_dataset: Dataset, req: SimulationRequest, session: Session):
+    """
+    Simple fills on datasets above the out-of-core threshold: one pass computes the fill
+    value, a second rewrites the file row group by row group. Median and mode fills are
+    flagged approximate when they came from a sample or pruned counts.
+    """
+    if req.column not in out_of_core.column_names(original_dataset):
+        raise HTTPException(status_code=400, detail="Strategy could not be applied.")
+    fill = out_of_core.fill_value(original_dataset, req.column, req.strategy)
+    if fill is None:
+        raise HTTPException(status_code=400, detail="Strategy could not be applied.")
+
+    ext = original_dataset.file_type if original_dataset.file_type else 'csv'
+    path = blob_store.incoming_path(ext)
+    written = out_of_core.stream_fill(original_dataset, req.column, fill, path)
+    blob = blob_store.put_file(session, path, ext)
+
+    column_count = original_dataset.column_count or len(out_of_core.column_names(original_dataset))
+    new_quality = quality_score_from_counts(
+        written["rows"] * column_count, written["rows"], column_count,
+        written["missing_cells"], written["duplicate_rows"]
+    )
+    schema = out_of_core.resolve_schema(original_dataset)
+    if fill["discrete"]:
+        schema.pop(req.column, None)  # now a nullable integer column, kept as loaded
+    filled = not (isinstance(fill["value"], float) and np.isnan(fill["value"]))
+
+    result = _record_repaired_dataset(
+        blob, original_dataset, req.strategy, new_quality, written["rows"], column_count,
+        json.dumps(schema), fill["missing"] if filled else 0, written["rows"], written["rows"], session
+    )
+    result["execution_mode"] = "out_of_core"
+    result["approximate"] = not fill["exact"]
+    return result
+
+
+def _record_repaired_dataset(
+    blob,
+    original_dataset: Dataset,
+    strategy: str,
+    new_quality: dict,
+    row_count: int,
+    column_count: int,
+    column_schema: str,
+    rows_modified: int,
+    rows_before: int,
+    rows_after: int,
+    session: Session
+):
+    """Writes the child Dataset row for a stored repaired file and builds the response."""
+    original_name = original_dataset.filename
+    clean_base = original_name.rsplit('.', 1)[0].replace('_repaired', '')
+    ext = original_dataset.file_type if original_dataset.file_type else 'csv'
+    new_filename = f"{clean_base}_repaired.{ext}"
+
     new_dataset = Dataset(
         filename=new_filename,
-        filepath=new_filepath,
+        filepath=blob.storage_path,
+        content_hash=blob.sha256,
         file_type=ext,
-        file_size_bytes=os.path.getsize(new_filepath),
-        row_count=len(df),
-        column_count=len(df.columns),
+        file_size_bytes=blob.size_bytes,
+        row_count=row_count,
+        column_count=column_count,
         quality_score=new_quality["score"],
         processing_log=original_dataset.processing_log,
         forensic_trace=original_dataset.forensic_trace,
         ingestion_insights=original_dataset.ingestion_insights,
+        column_schema=column_schema,
         characterization=original_dataset.characterization,
         analyzed=False,
         owner_id=original_dataset.owner_id,
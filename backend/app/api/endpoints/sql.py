@@ -0,0 +1,33 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlmodel import Session
+from app.core.database import get_session
+from app.core.serialization import ARROW_STREAM_MIME, accepts_arrow
+from app.services import sql_service
+
+router = APIRouter()
+
+class SQLRequest(BaseModel):
+    query: str
+    limit: Optional[int] = None
+
+@router.get("/{dataset_id}/tables")
+def get_query_tables(dataset_id: int, session: Session = Depends(get_session)):
+    """Tables a query can reference: 'data', 'v<n>' along the history path and 'dataset_<id>' for every version."""
+    return sql_service.list_tables(dataset_id, session)
+
+@router.post("/{dataset_id}")
+def run_sql_query(dataset_id: int, req: SQLRequest, request: Request, session: Session = Depends(get_session)):
+    """
+    Read-only SQL over the dataset and its versions, executed on the canonical columnar files.
+    Results stream as JSON ({columns, rows, row_count, truncated, ...}) or, with
+    'Accept: application/vnd.apache.arrow.stream', as Arrow record batches.
+    Row count and run time are capped server-side (AVIS_SQL_MAX_ROWS, AVIS_SQL_TIMEOUT_SECONDS).
+    """
+    result = sql_service.run_query(dataset_id, req.query, session, limit=req.limit)
+    if accepts_arrow(request):
+        metadata = {"dataset_id": dataset_id, "limit": result.limit}
+        return StreamingResponse(sql_service.iter_arrow(result, metadata), media_type=ARROW_STREAM_MIME)
+    return StreamingResponse(sql_service.iter_json(result), media_type="application/json")
@@ -1,36 +1,119 @@
 # backend/app/api/endpoints/viz.py
-from fastapi import APIRouter, Depends, Query, HTTPException
+import pandas as pd
+from typing import List
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from sqlmodel import Session
 from app.core.database import get_session
-from app.services import viz_service
+from app.core.serialization import accepts_arrow, negotiate
+from app.services import viz_service, index_service, aggregation_service, timeseries_service
 
 router = APIRouter()
 
 @router.get("/{dataset_id}/chart")
 def get_chart_data(
     dataset_id: int,
+    request: Request,
     x_col: str = Query(..., description="The primary dimension for the X-axis"),
     chart_type: str = Query(..., description="The type of chart to render (bar, line, pie, scatter)"),
     y_col: str = Query(None, description="The secondary dimension for the Y-axis (optional for distribution charts)"),
+    filters: str = Query(None, description='JSON list of row predicates, e.g. [{"column": "region", "op": "eq", "value": "EU"}]'),
+    agg: str = Query("mean", description="Aggregation of Y for bar/line/area charts: count, sum, mean, median, min, max, std, nunique or pNN"),
+    top_k: int = Query(50, ge=1, le=1000, description="Bar charts keep the top_k groups ranked by value; line/area charts the first top_k x values"),
+    others: bool = Query(False, description="Fold the groups beyond top_k into an 'Others' bar"),
+    granularity: str = Query("auto", description="Time bucket for datetime X axes: auto, minute, hour, day, week, month, quarter, year"),
+    start: str = Query(None, description="Inclusive lower bound of a datetime X axis (ISO timestamp)"),
+    end: str = Query(None, description="Exclusive upper bound of a datetime X axis (ISO timestamp)"),
     session: Session = Depends(get_session)
 ):
     """
     Functionality 4: Interactive Data Visualization.
     Acts as the Forensic Data Handshake, retrieving formatted arrays for dynamic Plotly charting.
     This endpoint ensures no 'black-box' math by passing raw parameters directly to the service logic.
+    Clients sending 'Accept: application/vnd.apache.arrow.stream' receive the (x, y) points as Arrow batches.
+    Filters use the row drilldown's predicate format and are pushed down to the columnar reader.
     """
+    row_filters = index_service.parse_filters(filters)
+    agg = aggregation_service.check_aggregation(agg)
+    granularity = timeseries_service.check_granularity(granularity)
     try:
         # Pass the validated session and parameters to the visualization service
-        return viz_service.get_chart_data(
+        chart = viz_service.get_chart_data(
             dataset_id=dataset_id, 
             x_col=x_col, 
             chart_type=chart_type, 
             y_col=y_col, 
-            session=session
+            session=session,
+            filters=row_filters,
+            agg=agg,
+            top_k=top_k,
+            others=others,
+            granularity=granularity,
+            start=start,
+            end=end
         )
+        if not accepts_arrow(request):
+            return chart
+
+        # Columnar handshake: points become the table, trace styling rides along as metadata
+        trace = chart["data"][0]
+        points = pd.DataFrame({"x": trace["x"], "y": trace["y"]})
+        styling = {k: v for k, v in trace.items() if k not in ("x", "y", "labels", "values")}
+        return negotiate(request, {**chart, "data": [styling]}, [], table=points)
+    except HTTPException:
+        raise
     except Exception as e:
         # Forensic Error Mapping: Converts backend crashes into readable transparency logs
         raise HTTPException(
             status_code=500, 
             detail=f"Visualization Node Failure: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/{dataset_id}/aggregate")
+def aggregate_dataset(
+    dataset_id: int,
+    request: Request,
+    group_by: List[str] = Query(..., description="Group keys, outermost first (repeat the parameter for several)"),
+    measure: List[str] = Query(None, description="'agg:column' measures, e.g. sum:amount, p90:amount; a bare 'count' counts rows"),
+    sort_by: str = Query(None, description="Measure name (e.g. sum_amount) or group key; defaults to the first measure"),
+    descending: bool = Query(True),
+    top_k: int = Query(None, ge=1, description="Keep the top_k values of the first key, ranked by the sort measure"),
+    others: bool = Query(False, description="Merge the values beyond top_k into one 'Others' group"),
+    limit: int = Query(aggregation_service.DEFAULT_GROUP_LIMIT, ge=1, le=100000),
+    filters: str = Query(None, description="JSON list of row predicates (same format as the chart endpoint)"),
+    session: Session = Depends(get_session)
+):
+    """
+    Pivot-style GROUP BY over one or more keys with several measures, ranked top-k and an
+    optional 'Others' bucket. Answers are cached per dataset version; decomposable measures
+    reuse (and roll up) previously built aggregate cubes. Arrow clients get the rows as batches.
+    """
+    row_filters = index_service.parse_filters(filters)
+    result = aggregation_service.aggregate(
+        dataset_id, group_by, aggregation_service.parse_measures(measure), session,
+        sort_by=sort_by, descending=descending, top_k=top_k, others=others,
+        filters=row_filters, limit=limit
+    )
+    return negotiate(request, result, "rows")
+
+@router.get("/{dataset_id}/timeseries")
+def resample_timeseries(
+    dataset_id: int,
+    request: Request,
+    time_col: str = Query(..., description="Datetime column to bucket"),
+    measure: List[str] = Query(None, description="'agg:column' measures per bucket; a bare 'count' counts rows"),
+    granularity: str = Query("auto", description="auto, minute, hour, day, week, month, quarter or year"),
+    start: str = Query(None, description="Inclusive lower bound (ISO timestamp)"),
+    end: str = Query(None, description="Exclusive upper bound (ISO timestamp)"),
+    filters: str = Query(None, description="JSON list of row predicates (same format as the chart endpoint)"),
+    session: Session = Depends(get_session)
+):
+    """
+    Resamples a datetime column into calendar buckets, oldest first. Served from a sorted
+    time index and pre-computed rollups, so any granularity over the same version is a roll-up.
+    """
+    row_filters = index_service.parse_filters(filters)
+    result = timeseries_service.resample(
+        dataset_id, time_col, aggregation_service.parse_measures(measure), session,
+        granularity=granularity, start=start, end=end, filters=row_filters
+    )
+    return negotiate(request, result, "rows")
@@ -0,0 +1,95 @@
+# backend/app/core/http_cache.py
+import re
+import json
+import hashlib
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from app.core.database import engine
+from app.models.dataset import Dataset
+
+# Analysis GETs whose output is a pure function of the dataset content, the dataset
+# record and the request (path, query, Accept). Repairs always write a new version,
+# so a dataset id only changes content on re-preparation, which changes the hash.
+CACHEABLE_ROUTES = [
+    re.compile(r"^/api/eda/(\d+)/(summary|missing|correlation)$"),
+    re.compile(r"^/api/quality/(\d+)$"),
+    re.compile(r"^/api/viz/(\d+)/chart$"),
+    re.compile(r"^/api/insights/(\d+)$"),
+    re.compile(r"^/api/datasets/(\d+)/(preview|rows)$"),
+]
+
+CACHE_CONTROL = "private, max-age=0, must-revalidate"
+
+# Bump when response shapes change so clients drop validators from older builds
+ETAG_GENERATION = "1"
+
+
+def _dataset_id_for(path: str):
+    for pattern in CACHEABLE_ROUTES:
+        match = pattern.match(path)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _dataset_state(dataset_id: int):
+    """Content hash plus record stamp for a dataset, or None when it cannot be validated."""
+    from app.services import artifact_cache
+    with Session(engine) as session:
+        dataset = session.get(Dataset, dataset_id)
+        if not dataset or not dataset.filepath:
+            return None
+        try:
+            fingerprint = artifact_cache.dataset_fingerprint(dataset)
+        except OSError:
+            return None
+        return fingerprint + json.dumps(artifact_cache.record_state(dataset), sort_keys=True, default=str)
+
+
+def compute_etag(state: str, request: Request) -> str:
+    digest = hashlib.sha256()
+    for part in (ETAG_GENERATION, state, request.url.path, request.url.query, request.headers.get("accept", "")):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:40]}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    """
+    Strong ETags for dataset analysis endpoints. A matching If-None-Match is answered
+    with 304 before the handler runs, so revisits skip the analysis entirely.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method not in ("GET", "HEAD"):
+            return await call_next(request)
+        dataset_id = _dataset_id_for(request.url.path)
+        if dataset_id is None:
+            return await call_next(request)
+
+        state = await run_in_threadpool(_dataset_state, dataset_id)
+        if state is None:
+            return await call_next(request)
+
+        etag = compute_etag(state, request)
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept"}
+        if _matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            for key, value in headers.items():
+                response.headers[key] = value
+        return response
@@ -0,0 +1,253 @@
+# backend/app/core/serialization.py
+import datetime
+import decimal
+import re
+from itertools import repeat
+import orjson
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# orjson writes NaN/Infinity as null and serializes NumPy arrays/scalars natively
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+ARROW_STREAM_MIME = "application/vnd.apache.arrow.stream"
+ARROW_BATCH_ROWS = 65536
+
+
+def _default(obj):
+    """Fallback for types orjson does not handle natively."""
+    if isinstance(obj, orjson.Fragment):
+        return obj
+    if isinstance(obj, pd.DataFrame):
+        return records_fragment(obj)
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return str(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, pd.Series):
+        return obj.to_numpy()
+    return str(obj)
+
+
+def _plain_key(key):
+    if isinstance(key, np.generic):
+        return key.item()
+    if isinstance(key, (pd.Timestamp, datetime.date, datetime.time)):
+        return key.isoformat()
+    if isinstance(key, (str, int, float, bool)) or key is None:
+        return key
+    return str(key)
+
+
+def _plain_keys(obj):
+    """Recursively converts dict keys orjson rejects (NumPy scalars, Timestamps from value_counts)."""
+    if isinstance(obj, dict):
+        return {_plain_key(k): _plain_keys(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_plain_keys(v) for v in obj]
+    return obj
+
+
+def dumps(content) -> bytes:
+    """
+    Serialize API payloads to JSON bytes. Handles dicts, lists, NumPy values,
+    pre-encoded fragments, and DataFrames (encoded as row records).
+    """
+    try:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        # orjson only accepts builtin key types; normalize and retry once
+        return orjson.dumps(_plain_keys(content), default=_default, option=ORJSON_OPTIONS)
+
+
+def iso_strings(series: pd.Series) -> list:
+    """
+    ISO 8601 text for a datetime column, None for NaT. Same format as Timestamp.isoformat()
+    (seconds unless a value carries a fraction), so every endpoint emits dates alike.
+    """
+    present = series.dropna()
+    if series.dt.tz is None and (present == present.dt.floor("s")).all():
+        text = np.datetime_as_string(series.to_numpy(dtype="datetime64[s]"), unit="s")
+        return [None if value == "NaT" else value for value in text.tolist()]
+    return [None if value is pd.NaT else value.isoformat() for value in series]
+
+
+def column_values(series: pd.Series) -> list:
+    """JSON-ready Python values of one column; NaN/NaT/NA and infinities become null."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return iso_strings(series)
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+# Elements of an encoded array of strings/nulls (escaped quotes stay inside their string)
+_JSON_STRINGS = re.compile(rb'null|"[^"\\]*(?:\\.[^"\\]*)*"')
+# Inferred kinds whose encoded values hold no commas, so the array splits on b","
+_COMMA_FREE_KINDS = {"integer", "floating", "mixed-integer-float", "decimal", "boolean", "empty"}
+
+
+def _encode_value(value) -> bytes:
+    return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+
+
+def _encoded_column(series: pd.Series) -> list:
+    """
+    JSON text of each value of one column (see column_values). The column is encoded
+    with one orjson call and split into its elements; only columns holding nested or
+    unusual objects fall back to a call per value.
+    """
+    if not len(series):
+        return []
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and (dtype.kind in "biu" or dtype == np.float64):
+        # NaN/inf -> null and shortest round-trip floats straight from the NumPy buffer
+        return orjson.dumps(np.ascontiguousarray(series.to_numpy()), option=ORJSON_OPTIONS)[1:-1].split(b",")
+    values = column_values(series)
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind in _COMMA_FREE_KINDS:
+        return _encode_value(values)[1:-1].split(b",")
+    if kind == "string":
+        return _JSON_STRINGS.findall(_encode_value(values))
+    return list(map(_encode_value, values))
+
+
+def row_fragments(df: pd.DataFrame) -> list:
+    """
+    JSON object text per row, written straight from the column arrays: each column is
+    encoded once, then every row joins its values between the shared key prefixes.
+    """
+    if df.empty:
+        return [b"{}"] * len(df)
+    parts = []
+    for position in range(df.shape[1]):
+        # '"name":' as orjson writes the key of {name: null}
+        key = orjson.dumps({_plain_key(df.columns[position]): None}, option=ORJSON_OPTIONS)[1:-5]
+        parts.append(repeat((b"{" if position == 0 else b",") + key))
+        parts.append(_encoded_column(df.iloc[:, position]))
+    parts.append(repeat(b"}"))
+    return list(map(b"".join, zip(*parts)))
+
+
+def records_fragment(df: pd.DataFrame) -> orjson.Fragment:
+    """
+    Encode a frame as a JSON array of row objects from its column arrays. Each column is
+    converted once (NaN -> null, dates -> ISO text) and orjson writes floats as their
+    shortest round-trip repr. The fragment is spliced verbatim into the payload by dumps().
+    """
+    return orjson.Fragment(b"[" + b",".join(row_fragments(df)) + b"]")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson. Accepts payloads containing records fragments."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# ─────────────────────────────────────────────────────
+# COLUMNAR (ARROW IPC) RESPONSES
+# ─────────────────────────────────────────────────────
+
+def frame_to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert a frame to Arrow, stringifying mixed-type text columns Arrow cannot type."""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        safe = df.copy()
+        for col in safe.columns:
+            if safe[col].dtype == 'object':
+                try:
+                    pa.array(safe[col], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                    safe[col] = safe[col].map(lambda v: None if pd.isna(v) else str(v))
+        return pa.Table.from_pandas(safe, preserve_index=False)
+
+
+def accepts_arrow(request: Request) -> bool:
+    return ARROW_STREAM_MIME in request.headers.get("accept", "")
+
+
+class _ChunkSink:
+    """Write-only file object that hands IPC bytes back to the response generator."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_ipc_batches(schema: pa.Schema, batches):
+    """Encodes record batches as an Arrow IPC stream as they are produced."""
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    yield sink.drain()
+    for batch in batches:
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _iter_ipc_stream(table: pa.Table, batch_rows: int):
+    return iter_ipc_batches(table.schema, table.to_batches(max_chunksize=batch_rows))
+
+
+class ArrowStreamResponse(StreamingResponse):
+    """
+    Streams a frame as Arrow IPC record batches. Non-tabular fields of the payload
+    travel as JSON in the schema metadata under the 'avis' key.
+    """
+
+    def __init__(self, frame: pd.DataFrame, metadata: dict = None, batch_rows: int = ARROW_BATCH_ROWS, **kwargs):
+        table = frame_to_arrow(frame)
+        if metadata:
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"avis": dumps(metadata)})
+        super().__init__(_iter_ipc_stream(table, batch_rows), media_type=ARROW_STREAM_MIME, **kwargs)
+
+
+def negotiate(request: Request, payload: dict, table_keys, table: pd.DataFrame = None):
+    """
+    Content negotiation for data-heavy endpoints. JSON by default; when the client
+    sends 'Accept: application/vnd.apache.arrow.stream' the tabular part (frames at
+    table_keys, or an explicit table) is streamed as Arrow and the rest becomes metadata.
+    Several table keys are stacked into one stream with a '__part__' discriminator column.
+    """
+    if not accepts_arrow(request):
+        return FastJSONResponse(payload)
+
+    keys = [table_keys] if isinstance(table_keys, str) else list(table_keys)
+    if table is None:
+        # Cached artifacts come back as lists of row records rather than frames
+        frames = [pd.DataFrame(payload[k]) if isinstance(payload[k], list) else payload[k] for k in keys]
+        if len(frames) == 1:
+            table = frames[0]
+        else:
+            table = pd.concat([f.assign(__part__=k) for k, f in zip(keys, frames)], ignore_index=True)
+
+    metadata = {k: v for k, v in payload.items() if k not in keys}
+    return ArrowStreamResponse(table, metadata)
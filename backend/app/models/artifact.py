@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Text, UniqueConstraint
+from sqlalchemy.dialects.mysql import LONGTEXT
+
+class DatasetArtifact(SQLModel, table=True):
+    """
+    Persistent cache of computed analysis artifacts (reports, insights, summaries,
+    correlation results). Valid only while content_hash matches the dataset's data.
+    """
+    __table_args__ = (UniqueConstraint("dataset_id", "kind", "params_key", name="uq_artifact_key"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    dataset_id: int = Field(index=True, foreign_key="dataset.id")
+
+    # e.g. "report", "insights", "summary", "correlation"
+    kind: str = Field(index=True)
+    params_key: str = Field(default="")
+
+    # SHA-256 of the stored dataset file the artifact was computed from
+    content_hash: str = Field(index=True)
+
+    # JSON payload (LONGTEXT on MySQL: wide correlation matrices exceed TEXT limits)
+    payload: str = Field(sa_column=Column(Text().with_variant(LONGTEXT(), "mysql"), nullable=False))
+
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Text
+from sqlalchemy.dialects.mysql import LONGTEXT
+
+class StoredBlob(SQLModel, table=True):
+    """
+    Content-addressed dataset file. One physical file per distinct SHA-256, shared by
+    every Dataset row whose content_hash points at it and removed when ref_count hits 0.
+    """
+    sha256: str = Field(primary_key=True, max_length=64)
+    file_ext: str
+    storage_path: str
+    size_bytes: int
+    ref_count: int = Field(default=0)
+
+    # SHA-256 of the raw upload this blob was processed from, so identical
+    # re-uploads can skip parsing and reuse the stored profile
+    source_sha256: Optional[str] = Field(default=None, index=True, max_length=64)
+    source_filename: Optional[str] = Field(default=None)
+    profile: Optional[str] = Field(default=None, sa_column=Column(Text().with_variant(LONGTEXT(), "mysql")))
+
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -15,6 +15,8 @@ class Dataset(SQLModel, table=True):
     filepath: str
     file_type: str = Field(index=True) # csv, xlsx, json, xml
     file_size_bytes: int
+    # SHA-256 of the stored file (key into the content-addressed blob store)
+    content_hash: Optional[str] = Field(default=None, index=True, max_length=64)
     
     # --- Structural Intelligence (Functionality 1 & 2) ---
     row_count: int
@@ -35,6 +37,8 @@ class Dataset(SQLModel, table=True):
     processing_log: Optional[str] = Field(default="[]", sa_column=Column(Text), description="JSON string of audit log")
     forensic_trace: Optional[str] = Field(default="[]", sa_column=Column(Text), description="JSON string of forensic trace")
     ingestion_insights: Optional[str] = Field(default="[]", sa_column=Column(Text), description="JSON string of AI insights")
+    # Compact dtypes resolved at ingestion ({column: dtype}), re-applied on every load
+    column_schema: Optional[str] = Field(default=None, sa_column=Column(Text), description="JSON string of column dtypes")
     
     # --- State Management ---
     analyzed: bool = Field(default=False)
@@ -0,0 +1,393 @@
+import os
+import re
+import json
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from fastapi import HTTPException
+from sqlmodel import Session
+from app.models.dataset import Dataset
+from app.services import out_of_core
+from app.services.eda_service import get_column_names, get_columns
+
+# Group-by aggregation for charts and pivots: several keys, several measures, ranked
+# top-k with an "Others" bucket. Decomposable measures are answered from a cube of
+# mergeable partials (rows, count, sum, M2, min, max per group), and a cube built for
+# a finer grouping is rolled up for any coarser one over the same dataset version.
+DECOMPOSABLE = ("count", "sum", "mean", "std", "min", "max")
+HOLISTIC = ("median", "nunique")
+PERCENTILE = re.compile(r"^p(\d{1,2}(\.\d+)?)$")
+NUMERIC_ONLY = ("sum", "mean", "std", "min", "max", "median")
+
+ROW_COUNT = "*"
+OTHERS_LABEL = "Others"
+DEFAULT_GROUP_LIMIT = 1000
+CUBE_CACHE_SIZE = 32
+RESULT_CACHE_SIZE = 64
+# Streamed cubes are re-merged once this many chunk partials have accumulated
+_MERGE_EVERY = 32
+
+_lock = threading.Lock()
+_cubes = OrderedDict()
+_results = OrderedDict()
+
+
+def _remember(cache: OrderedDict, key, value, size: int):
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+
+def _recall(cache: OrderedDict, key):
+    with _lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    return None
+
+
+# ─────────────────────────────────────────────────────
+# REQUEST NORMALISATION
+# ─────────────────────────────────────────────────────
+
+def check_aggregation(agg: str) -> str:
+    agg = (agg or "").strip().lower()
+    if agg not in DECOMPOSABLE + HOLISTIC and not PERCENTILE.match(agg):
+        raise HTTPException(status_code=400, detail=f"Unsupported aggregation '{agg}'")
+    return agg
+
+
+def parse_measures(raw: list) -> list:
+    """
+    'agg:column' strings (e.g. 'sum:amount', 'p90:latency') or a bare 'count' for the
+    number of rows. Returns [{name, agg, column}] in request order.
+    """
+    measures = []
+    for item in raw or ["count"]:
+        agg, _, column = item.partition(":")
+        agg = check_aggregation(agg)
+        column = column or ROW_COUNT
+        if column == ROW_COUNT and agg != "count":
+            raise HTTPException(status_code=400, detail=f"'{agg}' needs a column ('{agg}:<column>')")
+        name = "count" if column == ROW_COUNT else f"{agg}_{column}"
+        if name not in [m["name"] for m in measures]:
+            measures.append({"name": name, "agg": agg, "column": column})
+    return measures
+
+
+def _is_decomposable(measure: dict) -> bool:
+    return measure["agg"] in DECOMPOSABLE
+
+
+def _value_columns(measures: list) -> list:
+    return list(dict.fromkeys(m["column"] for m in measures if m["column"] != ROW_COUNT))
+
+
+def _validate(frame: pd.DataFrame, keys: list, measures: list):
+    for col in keys + _value_columns(measures):
+        if col not in frame.columns:
+            raise HTTPException(status_code=400, detail=f"Column '{col}' not found")
+    for m in measures:
+        if (m["agg"] in NUMERIC_ONLY or PERCENTILE.match(m["agg"])) and not pd.api.types.is_numeric_dtype(frame[m["column"]]):
+            raise HTTPException(status_code=400, detail=f"'{m['agg']}' needs a numeric column; '{m['column']}' is not")
+
+
+def _numeric(series: pd.Series) -> pd.Series:
+    # Booleans sum/average as 0/1 but groupby variance rejects them
+    return series.astype("float64") if pd.api.types.is_bool_dtype(series) else series
+
+
+# ─────────────────────────────────────────────────────
+# CUBES (mergeable partials per group)
+# ─────────────────────────────────────────────────────
+
+def _build_cube(frame: pd.DataFrame, keys: list, columns: list) -> pd.DataFrame:
+    """One row per key combination (NaN keys kept so coarser roll-ups stay exact)."""
+    grouped = frame.groupby(keys, observed=True, dropna=False, sort=False)
+    parts = {(ROW_COUNT, "rows"): grouped.size()}
+    for col in columns:
+        values = grouped[col]
+        count = values.count()
+        parts[(col, "count")] = count
+        if pd.api.types.is_numeric_dtype(frame[col]):
+            parts[(col, "sum")] = values.sum()
+            parts[(col, "m2")] = (values.var(ddof=0) * count).fillna(0.0)
+            parts[(col, "min")] = values.min()
+            parts[(col, "max")] = values.max()
+    return pd.DataFrame(parts)
+
+
+def _group_arrays(index: pd.Index, keys: list, others: dict = None) -> list:
+    arrays = []
+    for key in keys:
+        values = index.get_level_values(key)
+        if others and key in others:
+            keep = values.isin(others[key]) | values.isna()
+            values = pd.Index(np.where(keep, values.astype(object), OTHERS_LABEL), name=key)
+        arrays.append(values)
+    return arrays
+
+
+def _rollup(cube: pd.DataFrame, keys: list, others: dict = None) -> pd.DataFrame:
+    """Merges cube partials onto a coarser set of keys (pairwise M2 update, Chan et al.)."""
+    arrays = _group_arrays(cube.index, keys, others)
+
+    def group(frame):
+        return frame.groupby(arrays, observed=True, dropna=False, sort=False)
+
+    additive = cube[[c for c in cube.columns if c[1] in ("rows", "count", "sum", "m2")]].copy()
+    numeric = [col for col, stat in cube.columns if stat == "sum"]
+    if numeric:
+        # Each partial's M2 is re-centred on the merged group mean before summing
+        totals = group(cube[[(c, "sum") for c in numeric] + [(c, "count") for c in numeric]]).transform("sum")
+        for col in numeric:
+            count = cube[(col, "count")].where(cube[(col, "count")] > 0)
+            merged_mean = totals[(col, "sum")] / totals[(col, "count")].where(totals[(col, "count")] > 0)
+            spread = (count * (cube[(col, "sum")] / count - merged_mean) ** 2).fillna(0.0)
+            additive[(col, "m2")] = cube[(col, "m2")] + spread
+
+    parts = [group(additive).sum()]
+    lows = [c for c in cube.columns if c[1] == "min"]
+    highs = [c for c in cube.columns if c[1] == "max"]
+    if lows:
+        parts.append(group(cube[lows]).min())
+        parts.append(group(cube[highs]).max())
+    return pd.concat(parts, axis=1)[cube.columns]
+
+
+def _finalize_cube(cube: pd.DataFrame, measures: list) -> pd.DataFrame:
+    out = pd.DataFrame(index=cube.index)
+    for m in measures:
+        col, agg = m["column"], m["agg"]
+        if col == ROW_COUNT:
+            out[m["name"]] = cube[(ROW_COUNT, "rows")]
+            continue
+        count = cube[(col, "count")]
+        if agg == "count":
+            out[m["name"]] = count
+        elif agg == "sum":
+            out[m["name"]] = cube[(col, "sum")]
+        elif agg == "mean":
+            out[m["name"]] = cube[(col, "sum")] / count.where(count > 0)
+        elif agg == "std":
+            out[m["name"]] = np.sqrt(cube[(col, "m2")].clip(lower=0) / (count - 1).where(count > 1))
+        else:
+            out[m["name"]] = cube[(col, agg)]
+    return out
+
+
+def _finalize_rows(frame: pd.DataFrame, keys: list, measures: list, others: dict = None) -> pd.DataFrame:
+    """Direct hash aggregation for measures that do not merge (median, percentiles, nunique)."""
+    if others:
+        frame = frame.copy()
+        for key, top in others.items():
+            keep = frame[key].isin(top) | frame[key].isna()
+            frame[key] = np.where(keep, frame[key].astype(object), OTHERS_LABEL)
+    grouped = frame.groupby(keys, observed=True, dropna=False, sort=False)
+    out = {}
+    for m in measures:
+        col, agg = m["column"], m["agg"]
+        if col == ROW_COUNT:
+            out[m["name"]] = grouped.size()
+        elif agg == "count":
+            out[m["name"]] = grouped[col].count()
+        elif agg == "nunique":
+            out[m["name"]] = grouped[col].nunique()
+        elif agg == "median":
+            out[m["name"]] = grouped[col].median()
+        elif PERCENTILE.match(agg):
+            out[m["name"]] = grouped[col].quantile(float(PERCENTILE.match(agg).group(1)) / 100)
+        else:
+            out[m["name"]] = grouped[col].agg(agg)
+    return pd.DataFrame(out)
+
+
+# ─────────────────────────────────────────────────────
+# DATA ACCESS (in memory, or merged row group by row group)
+# ─────────────────────────────────────────────────────
+
+class _Source:
+    """The projected rows of one dataset version, loaded at most once per request."""
+
+    def __init__(self, dataset: Dataset, session: Session, columns: list, filters: list):
+        self.dataset = dataset
+        self.session = session
+        self.columns = columns
+        self.filters = filters
+        self.streamed = out_of_core.enabled_for(dataset)
+        self._frame = None
+
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            if self.streamed:
+                chunks = list(out_of_core.iter_chunks(self.dataset, columns=self.columns, filters=self.filters))
+                self._frame = pd.concat(chunks) if chunks else out_of_core.empty_frame(self.dataset, self.columns)
+            else:
+                self._frame = get_columns(self.dataset.id, self.columns, self.session, filters=self.filters)
+            for col in self._frame.columns:
+                self._frame[col] = _numeric(self._frame[col])
+        return self._frame
+
+    def cube(self, keys: list, value_columns: list) -> pd.DataFrame:
+        if not self.streamed or self._frame is not None:
+            return _build_cube(self.frame(), keys, value_columns)
+        parts = []
+        for chunk in out_of_core.iter_chunks(self.dataset, columns=self.columns, filters=self.filters):
+            for col in value_columns:
+                chunk[col] = _numeric(chunk[col])
+            parts.append(_build_cube(chunk, keys, value_columns))
+            if len(parts) > _MERGE_EVERY:
+                parts = [_rollup(pd.concat(parts), keys)]
+        if not parts:
+            return _build_cube(self.frame(), keys, value_columns)
+        return _rollup(pd.concat(parts), keys) if len(parts) > 1 else parts[0]
+
+
+def _version_key(dataset: Dataset) -> tuple:
+    return (dataset.filepath, os.stat(dataset.filepath).st_mtime_ns)
+
+
+def _find_cube(version: tuple, filters_key: str, keys: list, value_columns: list):
+    """Smallest cached cube over the same rows whose keys and columns cover the request."""
+    best = None
+    with _lock:
+        for (v, f, cube_keys, cube_cols), cube in _cubes.items():
+            if v == version and f == filters_key and set(keys) <= set(cube_keys) and set(value_columns) <= set(cube_cols):
+                if best is None or len(cube) < len(best[1]):
+                    best = (cube_keys, cube)
+    return best
+
+
+def _cube_for(source: _Source, version: tuple, filters_key: str, keys: list, value_columns: list) -> tuple:
+    """(cube at exactly `keys`, how it was obtained: 'cube' reuse, 'rollup' of a finer cube, or 'scan')."""
+    found = _find_cube(version, filters_key, keys, value_columns)
+    if found:
+        cube_keys, cube = found
+        if list(cube_keys) == keys:
+            return cube, "cube"
+        return _rollup(cube, keys), "rollup"
+    cube = source.cube(keys, value_columns)
+    _remember(_cubes, (version, filters_key, tuple(keys), tuple(value_columns)), cube, CUBE_CACHE_SIZE)
+    return cube, "scan"
+
+
+def _drop_missing_keys(result: pd.DataFrame, keys: list) -> pd.DataFrame:
+    frame = result.reset_index()
+    frame.columns = keys + list(result.columns)
+    return frame.dropna(subset=keys).reset_index(drop=True)
+
+
+# ─────────────────────────────────────────────────────
+# PUBLIC ENTRY POINT
+# ─────────────────────────────────────────────────────
+
+def aggregate(dataset_id: int, group_by: list, measures: list, session: Session,
+              sort_by: str = None, descending: bool = True, top_k: int = None,
+              others: bool = False, filters: list = None, limit: int = DEFAULT_GROUP_LIMIT) -> dict:
+    """
+    GROUP BY `group_by` computing `measures` ({name, agg, column}, see parse_measures).
+    Rows are sorted by `sort_by` (a measure name or a group key; default the first measure).
+    top_k keeps the k highest-ranked values of the first key (ranked by the sort measure over
+    that key alone); with others=True the remaining values are merged into one 'Others' group.
+    Results are cached per dataset version, so repeated chart requests are dictionary lookups.
+    """
+    if not group_by:
+        raise HTTPException(status_code=400, detail="At least one group-by column is required.")
+    keys = list(dict.fromkeys(group_by))
+    measures = measures or parse_measures(None)
+    measure_names = [m["name"] for m in measures]
+    sort_by = sort_by or measure_names[0]
+    if sort_by not in measure_names and sort_by not in keys:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sort_by}': not a measure or group key")
+    if top_k is not None and top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+
+    dataset = session.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset record missing in database.")
+    available = get_column_names(dataset_id, session)
+    for col in keys + _value_columns(measures):
+        if col not in available:
+            raise HTTPException(status_code=400, detail=f"Column '{col}' not found")
+
+    version = _version_key(dataset)
+    filters_key = json.dumps(filters or [], sort_keys=True, default=str)
+    request_key = (version, filters_key, json.dumps([keys, measures, sort_by, descending, top_k, others, limit], default=str))
+    cached = _recall(_results, request_key)
+    if cached is not None:
+        return {**cached, "meta": {**cached["meta"], "cached": True}}
+
+    columns = list(dict.fromkeys(keys + _value_columns(measures)))
+    source = _Source(dataset, session, columns, filters)
+    _validate(out_of_core.empty_frame(dataset, columns), keys, measures)
+
+    def compute(group_keys: list, wanted: list, others_map: dict = None):
+        if all(_is_decomposable(m) for m in wanted):
+            cube, how = _cube_for(source, version, filters_key, group_keys, _value_columns(wanted))
+            if others_map:
+                cube = _rollup(cube, group_keys, others_map)
+            return _finalize_cube(cube, wanted), how
+        return _finalize_rows(source.frame(), group_keys, wanted, others_map), "scan"
+
+    lead = keys[0]
+    by_measure = sort_by in measure_names
+    top_values, total_groups, how = None, None, None
+    if top_k is not None:
+        # The first key alone, ranked by the sort measure (highest first when sorting by key),
+        # decides the top-k cut. The full-grouping cube is built first so this is a roll-up.
+        rank_measure = next(m for m in measures if m["name"] == (sort_by if by_measure else measure_names[0]))
+        if all(_is_decomposable(m) for m in measures):
+            _, how = _cube_for(source, version, filters_key, keys, _value_columns(measures))
+        ranking, _ = compute([lead], [rank_measure])
+        ranking = _drop_missing_keys(ranking, [lead])
+        total_groups = len(ranking)
+        ranking = ranking.sort_values(
+            rank_measure["name"], ascending=by_measure and not descending, kind="stable", na_position="last"
+        )
+        top_values = ranking[lead].head(top_k).tolist()
+
+    others_map = {lead: top_values} if (top_values is not None and others and total_groups > top_k) else None
+    result, result_how = compute(keys, measures, others_map)
+    how = how or result_how
+    result = _drop_missing_keys(result, keys)
+    if top_values is not None and not others_map:
+        result = result[result[lead].isin(top_values)]
+    if total_groups is None:
+        total_groups = len(result)
+
+    # Ordering: by the sort measure (grouped by the lead key's rank when top-k splits
+    # several keys) or by a key; the Others bucket always comes last
+    bucket = result[lead].astype(object).eq(OTHERS_LABEL) if others_map else pd.Series(False, index=result.index)
+    ranked, rest = result[~bucket], result[bucket]
+    ranked = ranked.sort_values(sort_by, ascending=not descending, kind="stable", na_position="last")
+    if by_measure and top_values is not None and len(keys) > 1:
+        position = {v: i for i, v in enumerate(top_values)}
+        ranked = ranked.iloc[np.argsort(ranked[lead].map(position).to_numpy(), kind="stable")]
+    rest = rest.sort_values(sort_by, ascending=not descending, kind="stable", na_position="last") if len(keys) > 1 else rest
+    result = pd.concat([ranked, rest])
+    truncated = len(result) > limit
+    result = result.head(limit).reset_index(drop=True)
+
+    payload = {
+        "group_by": keys,
+        "measures": measures,
+        "sort_by": sort_by,
+        "descending": descending,
+        "top_k": top_k,
+        "others": bool(others_map),
+        "rows": result,
+        "meta": {
+            "groups": int(total_groups),
+            "returned": len(result),
+            "truncated": truncated,
+            "source": how,
+            "execution_mode": "out_of_core" if source.streamed else "in_memory",
+            "filters": filters or [],
+            "cached": False
+        }
+    }
+    _remember(_results, request_key, payload, RESULT_CACHE_SIZE)
+    return payload
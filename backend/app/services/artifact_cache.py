@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+import orjson
+from functools import lru_cache
+from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
+from app.models.dataset import Dataset
+from app.models.artifact import DatasetArtifact
+from app.core.serialization import dumps
+
+HASH_READ_BYTES = 1024 * 1024
+
+
+@lru_cache(maxsize=256)
+def _hash_file(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(HASH_READ_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(dataset: Dataset) -> str:
+    """Content hash of the dataset's stored file (memoized per path/mtime/size)."""
+    if dataset.content_hash:
+        # Blob-store files are immutable and already keyed by their SHA-256
+        return dataset.content_hash
+    stat = os.stat(dataset.filepath)
+    return _hash_file(dataset.filepath, stat.st_mtime_ns, stat.st_size)
+
+
+def _params_key(params: dict = None) -> str:
+    if not params:
+        return ""
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def record_state(dataset: Dataset) -> dict:
+    """Dataset record fields that reports and insights read besides the file itself."""
+    return {
+        "filename": dataset.filename,
+        "analyzed": dataset.analyzed,
+        "quality_score": dataset.quality_score,
+        "row_count": dataset.row_count,
+        "column_count": dataset.column_count,
+        "ingestion_insights": dataset.ingestion_insights,
+        "processing_log": dataset.processing_log,
+        "unstructured_row_removal_count": dataset.unstructured_row_removal_count,
+    }
+
+
+def _artifact_row(session: Session, dataset_id: int, kind: str, params_key: str):
+    return session.exec(
+        select(DatasetArtifact).where(
+            DatasetArtifact.dataset_id == dataset_id,
+            DatasetArtifact.kind == kind,
+            DatasetArtifact.params_key == params_key
+        )
+    ).first()
+
+
+def lookup(session: Session, dataset: Dataset, kind: str, params: dict = None):
+    """The cached artifact when it is current for the dataset's content, else None (nothing is computed)."""
+    if not dataset or not dataset.filepath or not os.path.exists(dataset.filepath):
+        return None
+    cached = _artifact_row(session, dataset.id, kind, _params_key(params))
+    if cached and cached.content_hash == dataset_fingerprint(dataset):
+        return orjson.loads(cached.payload)
+    return None
+
+
+def get_or_compute(session: Session, dataset: Dataset, kind: str, compute, params: dict = None, depends_on: dict = None):
+    """
+    Returns the cached artifact for (dataset, kind, params) when it was computed from
+    the same content hash; otherwise runs compute(), stores the result and returns it.
+    depends_on lists record metadata the artifact reads besides the file (it is folded
+    into the hash so edits to it invalidate too). Cached results come back JSON-decoded
+    (frames become lists of row records).
+    """
+    if not dataset or not dataset.filepath or not os.path.exists(dataset.filepath):
+        return compute()
+
+    fingerprint = dataset_fingerprint(dataset)
+    if depends_on:
+        fingerprint = hashlib.sha256((fingerprint + _params_key(depends_on)).encode()).hexdigest()
+    params_key = _params_key(params)
+    cached = _artifact_row(session, dataset.id, kind, params_key)
+
+    if cached and cached.content_hash == fingerprint:
+        return orjson.loads(cached.payload)
+
+    result = compute()
+    payload = dumps(result).decode("utf-8")
+
+    try:
+        if cached:
+            cached.content_hash = fingerprint
+            cached.payload = payload
+            session.add(cached)
+        else:
+            session.add(DatasetArtifact(
+                dataset_id=dataset.id,
+                kind=kind,
+                params_key=params_key,
+                content_hash=fingerprint,
+                payload=payload
+            ))
+        session.commit()
+    except IntegrityError:
+        # A concurrent request stored the same artifact first
+        session.rollback()
+    return result
+
+
+def invalidate(session: Session, dataset_id: int, kind: str = None) -> int:
+    """Explicitly drops cached artifacts for a dataset (optionally one kind). Returns the count removed."""
+    query = select(DatasetArtifact).where(DatasetArtifact.dataset_id == dataset_id)
+    if kind:
+        query = query.where(DatasetArtifact.kind == kind)
+    removed = 0
+    for artifact in session.exec(query).all():
+        session.delete(artifact)
+        removed += 1
+    session.commit()
+    return removed
@@ -0,0 +1,175 @@
+import os
+import json
+import uuid
+import hashlib
+import pandas as pd
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from app.models.blob import StoredBlob
+from app.services import columnar_store
+
+# Dataset files live at uploads/blobs/<first two hex chars>/<sha256>.<ext>: names can
+# never collide, identical content is stored once, and files are never rewritten.
+BLOB_DIR = os.path.join("uploads", "blobs")
+INCOMING_DIR = os.path.join(BLOB_DIR, "incoming")
+HASH_READ_BYTES = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(HASH_READ_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def copy_and_hash(source, target_path: str) -> str:
+    """Copies a file object to disk, hashing the bytes on the way through."""
+    digest = hashlib.sha256()
+    with open(target_path, "wb") as out:
+        for block in iter(lambda: source.read(HASH_READ_BYTES), b""):
+            digest.update(block)
+            out.write(block)
+    return digest.hexdigest()
+
+
+def source_key(source_sha256: str, sheet: str = None) -> str:
+    """Dedup key of a raw upload; selecting a different Excel sheet is a different source."""
+    if not sheet:
+        return source_sha256
+    return hashlib.sha256(f"{source_sha256}#sheet={sheet}".encode("utf-8")).hexdigest()
+
+
+def blob_path(sha256: str, file_ext: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], f"{sha256}.{file_ext}")
+
+
+def incoming_path(file_ext: str) -> str:
+    """Unique scratch location for a file that is about to be stored."""
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    return os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}.{file_ext}")
+
+
+def find_by_source(session: Session, source_sha256: str):
+    """A stored blob processed from byte-identical raw input, if its profile was kept."""
+    return session.exec(
+        select(StoredBlob).where(
+            StoredBlob.source_sha256 == source_sha256,
+            StoredBlob.profile != None  # noqa: E711
+        )
+    ).first()
+
+
+def _add_ref(session: Session, sha256: str, delta: int) -> bool:
+    """
+    Adjusts ref_count with one UPDATE evaluated by the database, so concurrent uploads
+    and deletes cannot lose each other's changes. False when the row no longer exists.
+    """
+    result = session.exec(
+        update(StoredBlob)
+        .where(StoredBlob.sha256 == sha256)
+        .values(ref_count=StoredBlob.ref_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def _locked_blob(session: Session, sha256: str):
+    # A locking read sees rows committed since this transaction's snapshot was taken
+    return session.get(StoredBlob, sha256, populate_existing=True, with_for_update=True)
+
+
+def acquire(session: Session, blob: StoredBlob) -> StoredBlob:
+    _add_ref(session, blob.sha256, 1)
+    session.expire(blob, ["ref_count"])
+    return blob
+
+
+def _insert(session: Session, blob: StoredBlob) -> StoredBlob:
+    """Stores a new row; if a concurrent upload inserted the same content first, returns its row."""
+    try:
+        with session.begin_nested():
+            session.add(blob)
+    except IntegrityError:
+        # Only the savepoint is rolled back; the caller's pending Dataset work survives
+        return _locked_blob(session, blob.sha256)
+    return blob
+
+
+def put_file(session: Session, path: str, file_ext: str) -> StoredBlob:
+    """
+    Moves a finished file (and its canonical twin, if written) into the store and
+    takes a reference. When identical content is already stored the new copy is
+    discarded. The caller commits the session together with the Dataset row.
+    """
+    sha256 = hash_file(path)
+    blob = session.get(StoredBlob, sha256)
+    if blob and os.path.exists(blob.storage_path):
+        if _add_ref(session, sha256, 1):
+            session.expire(blob, ["ref_count"])
+            os.remove(path)
+            staged_canonical = columnar_store.canonical_path(path)
+            if os.path.exists(staged_canonical):
+                os.remove(staged_canonical)
+            return blob
+        # Its last reference was released concurrently: store this copy afresh
+        session.expunge(blob)
+        blob = None
+
+    target = blob_path(sha256, file_ext)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+    staged_canonical = columnar_store.canonical_path(path)
+    if os.path.exists(staged_canonical):
+        # Renames keep mtimes, so the canonical file stays fresh relative to its source
+        os.replace(staged_canonical, columnar_store.canonical_path(target))
+
+    if blob is None:
+        blob = _insert(session, StoredBlob(
+            sha256=sha256, file_ext=file_ext, storage_path=target, size_bytes=os.path.getsize(target)
+        ))
+    else:
+        blob.storage_path = target
+    return acquire(session, blob)
+
+
+def put_frame(session: Session, df: pd.DataFrame, file_ext: str, writer) -> StoredBlob:
+    """Writes a frame with writer(df, path, ext), builds its canonical file and stores both."""
+    path = incoming_path(file_ext)
+    writer(df, path, file_ext)
+    columnar_store.write_canonical(df, path)
+    return put_file(session, path, file_ext)
+
+
+def remember_source(blob: StoredBlob, source_sha256: str, source_filename: str, profile: dict):
+    """Records which raw upload produced this blob and the profile computed for it."""
+    if blob.source_sha256 is None:
+        blob.source_sha256 = source_sha256
+        blob.source_filename = source_filename
+        blob.profile = json.dumps(profile)
+
+
+def reuse_profile(blob: StoredBlob, filename: str) -> dict:
+    """Stored record fields for a re-upload, re-titled for the new filename."""
+    fields = json.loads(blob.profile)
+    if blob.source_filename and blob.source_filename != filename:
+        fields["ingestion_insights"] = fields["ingestion_insights"].replace(
+            json.dumps(f"**'{blob.source_filename}'**")[1:-1], json.dumps(f"**'{filename}'**")[1:-1]
+        )
+    fields["filename"] = filename
+    return fields
+
+
+def release(session: Session, sha256: str):
+    """Drops one reference; the file and its canonical twin go when none remain."""
+    if not _add_ref(session, sha256, -1):
+        return
+    blob = _locked_blob(session, sha256)
+    if blob.ref_count > 0:
+        return
+    for path in (blob.storage_path, columnar_store.canonical_path(blob.storage_path)):
+        if os.path.exists(path):
+            try: os.remove(path)
+            except Exception as e: print(f"Deletion Warning: {e}")
+    session.delete(blob)
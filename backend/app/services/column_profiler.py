@@ -0,0 +1,74 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+# Column-parallel profiling. Wide frames are split into contiguous column blocks that
+# worker threads reduce independently (NumPy and the pandas hash/sort kernels release
+# the GIL on numeric data); the per-block results are merged back in column order.
+# Threads share the loaded frame, so nothing is copied or pickled between workers.
+def _available_cpus() -> int:
+    """CPUs this process may run on (the affinity mask is Linux-only; elsewhere all CPUs)."""
+    affinity = getattr(os, "sched_getaffinity", None)
+    return len(affinity(0)) if affinity else (os.cpu_count() or 1)
+
+
+PROFILE_WORKERS = int(os.getenv("AVIS_PROFILE_WORKERS", "0")) or _available_cpus()
+# Frames smaller than this many cells are profiled on the calling thread
+PARALLEL_MIN_CELLS = int(os.getenv("AVIS_PROFILE_PARALLEL_MIN_CELLS", "1000000"))
+# Blocks per worker, so one slow block (e.g. a wide text column) does not idle the rest
+BLOCKS_PER_WORKER = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=PROFILE_WORKERS, thread_name_prefix="avis-profile")
+        return _pool
+
+
+def partition(positions: list, parts: int) -> list:
+    """Splits column positions into at most `parts` contiguous, near-equal blocks."""
+    parts = max(1, min(parts, len(positions)))
+    return [list(block) for block in np.array_split(np.asarray(positions, dtype=np.int64), parts) if len(block)]
+
+
+def _run(func, df: pd.DataFrame, block: list):
+    _local.worker = True
+    try:
+        return func(df.iloc[:, block])
+    finally:
+        _local.worker = False
+
+
+def map_blocks(df: pd.DataFrame, func, columns: list = None) -> list:
+    """
+    func(frame_block) for contiguous blocks of `columns` (default: all), in column order.
+    Small frames, single-worker setups and calls made from inside a worker run as one block.
+    """
+    positions = list(range(len(df.columns))) if columns is None else [df.columns.get_loc(c) for c in columns]
+    if not positions:
+        return []
+    serial = (
+        PROFILE_WORKERS <= 1
+        or len(positions) < 2
+        or len(df) * len(positions) < PARALLEL_MIN_CELLS
+        or getattr(_local, "worker", False)
+    )
+    if serial:
+        return [func(df.iloc[:, positions])]
+    blocks = partition(positions, PROFILE_WORKERS * BLOCKS_PER_WORKER)
+    return list(_executor().map(lambda block: _run(func, df, block), blocks))
+
+
+def map_columns(df: pd.DataFrame, func, columns: list = None) -> list:
+    """[func(series) for each column], with the columns profiled in parallel blocks."""
+    blocks = map_blocks(df, lambda frame: [func(frame.iloc[:, i]) for i in range(frame.shape[1])], columns)
+    return [result for block in blocks for result in block]
+
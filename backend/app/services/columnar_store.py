@@ -0,0 +1,119 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from functools import lru_cache
+from app.core.serialization import frame_to_arrow
+
+# Every stored dataset file gets a canonical columnar twin (Parquet) next to it.
+# Row groups are kept small enough that a page of rows only decodes one or two groups.
+CANONICAL_SUFFIX = ".canonical.parquet"
+ROW_GROUP_SIZE = 65536
+
+
+def canonical_path(filepath: str) -> str:
+    """Location of the canonical columnar file for a stored dataset file."""
+    base = filepath.rsplit('.', 1)[0] if '.' in os.path.basename(filepath) else filepath
+    return base + CANONICAL_SUFFIX
+
+
+def write_canonical(df: pd.DataFrame, filepath: str) -> str:
+    """Write the canonical columnar file for a dataset. Returns its path."""
+    target = canonical_path(filepath)
+    tmp_path = target + ".tmp"
+    pq.write_table(frame_to_arrow(df), tmp_path, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, target)
+    return target
+
+
+def ensure_canonical(filepath: str) -> str:
+    """
+    Returns the canonical file for a dataset, building it on first access for
+    datasets ingested before the columnar store existed.
+    """
+    target = canonical_path(filepath)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(filepath):
+        return target
+    from app.services.eda_service import _load_dataframe_from_disk
+    return write_canonical(_load_dataframe_from_disk(filepath), filepath)
+
+
+def remove_canonical(filepath: str):
+    target = canonical_path(filepath)
+    if os.path.exists(target):
+        os.remove(target)
+
+
+# ─────────────────────────────────────────────────────
+# METADATA (footer only — no data pages are decoded)
+# ─────────────────────────────────────────────────────
+
+@lru_cache(maxsize=64)
+def _layout(path: str, mtime_ns: int) -> dict:
+    meta = pq.ParquetFile(path).metadata
+    sizes = [meta.row_group(i).num_rows for i in range(meta.num_row_groups)]
+    return {
+        "num_rows": meta.num_rows,
+        "starts": np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+        "columns": list(pq.read_schema(path).names),
+    }
+
+
+def get_layout(filepath: str) -> dict:
+    """Row count, row-group boundaries and column names of the canonical file."""
+    path = ensure_canonical(filepath)
+    return _layout(path, os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=32)
+def _read_row_group(path: str, mtime_ns: int, group: int, columns: tuple) -> pd.DataFrame:
+    return pq.ParquetFile(path).read_row_group(group, columns=list(columns)).to_pandas()
+
+
+# ─────────────────────────────────────────────────────
+# PROJECTED READS
+# ─────────────────────────────────────────────────────
+
+def read_column(filepath: str, column: str) -> pd.Series:
+    """Reads a single column from the canonical file."""
+    path = ensure_canonical(filepath)
+    return pq.read_table(path, columns=[column]).column(0).to_pandas()
+
+
+def read_columns(filepath: str, columns: list) -> pd.DataFrame:
+    """Reads only the given columns (in that order) from the canonical file."""
+    path = ensure_canonical(filepath)
+    return pq.read_table(path, columns=list(columns)).to_pandas()
+
+
+def read_rows(filepath: str, row_ids, columns: list) -> pd.DataFrame:
+    """
+    Fetch specific rows (by position) decoding only the row groups that contain them.
+    Output order follows row_ids.
+    """
+    path = ensure_canonical(filepath)
+    mtime_ns = os.stat(path).st_mtime_ns
+    layout = _layout(path, mtime_ns)
+    row_ids = np.asarray(row_ids, dtype=np.int64)
+    if row_ids.size == 0:
+        return pq.read_schema(path).empty_table().select(list(columns)).to_pandas()
+
+    groups = np.searchsorted(layout["starts"], row_ids, side="right") - 1
+    pieces = []
+    positions = []
+    for group in np.unique(groups):
+        in_group = np.flatnonzero(groups == group)
+        frame = _read_row_group(path, mtime_ns, int(group), tuple(columns))
+        local = row_ids[in_group] - layout["starts"][group]
+        pieces.append(frame.iloc[local])
+        positions.append(in_group)
+
+    result = pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0].reset_index(drop=True)
+    # Restore the caller's requested order (e.g. a sorted permutation)
+    restore = np.argsort(np.concatenate(positions), kind="stable")
+    return result.iloc[restore].reset_index(drop=True)
+
+
+def read_window(filepath: str, start: int, stop: int, columns: list) -> pd.DataFrame:
+    """Contiguous row range [start, stop) — touches at most the overlapping row groups."""
+    return read_rows(filepath, np.arange(start, stop, dtype=np.int64), columns)
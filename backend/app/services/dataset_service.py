@@ -1,4 +1,3 @@
-import shutil
 import os
 import pandas as pd
 import numpy as np
@@ -8,6 +7,7 @@ import logging
 from fastapi import UploadFile, HTTPException
 from app.models.dataset import Dataset
 from app.core.database import Session
+from app.services import columnar_store, blob_store, ingestion, dtype_optimizer, type_inference, column_profiler
 
 # Setup high-fidelity logging for the Audit Trail
 UPLOAD_DIR = "uploads"
@@ -37,8 +37,13 @@ def calculate_quality_score(df: pd.DataFrame) -> dict:
     Calculates a multi-dimensional health score with explicit markdown explanation.
     Glass Box Logic: Start at 100, subtract points for specific issues.
     """
-    total_cells = df.size
-    row_count = len(df)
+    return quality_score_from_counts(
+        df.size, len(df), len(df.columns), int(df.isnull().sum().sum()), int(df.duplicated().sum())
+    )
+
+
+def quality_score_from_counts(total_cells: int, row_count: int, column_count: int, missing_count: int, duplicate_rows: int) -> dict:
+    """The same scoring from precomputed counts (used when a dataset is never loaded whole)."""
     score = 100
     breakdown = []
     
@@ -46,7 +51,6 @@ def calculate_quality_score(df: pd.DataFrame) -> dict:
         return {"score": 0, "rating": "Critical", "score_breakdown": [{"reason": "Empty File", "score_change": -100, "explanation": "File contains no data."}]}
     
     # 1. Missing Values (Heavy Penalty)
-    missing_count = int(df.isnull().sum().sum())
     if missing_count > 0:
         penalty = 15
         if (missing_count / total_cells) > 0.1: penalty = 25 # High penalty if >10% missing
@@ -64,7 +68,6 @@ def calculate_quality_score(df: pd.DataFrame) -> dict:
         })
 
     # 2. Duplicates (Medium Penalty)
-    duplicate_rows = int(df.duplicated().sum())
     if duplicate_rows > 0:
         penalty = 10
         score -= penalty
@@ -75,7 +78,7 @@ def calculate_quality_score(df: pd.DataFrame) -> dict:
         })
 
     # 3. Valid Structure (Bonus)
-    if len(df.columns) > 1 and row_count > 5:
+    if column_count > 1 and row_count > 5:
         breakdown.append({
             "reason": "Good Structure",
             "score_change": 0,
@@ -239,46 +242,10 @@ def clean_and_audit(df: pd.DataFrame):
              "result": f"Pruned {empty_rows} rows"
         })
 
-    # 2. Glass Box: Column Type & Issue Detection
-    for col in df.columns:
-        col_data = df[col]
-        
-        # Step 3: Column Types
-        dtype_name = str(col_data.dtype)
-        rep = "Text"
-        if pd.api.types.is_numeric_dtype(col_data): rep = "Number"
-        elif pd.api.types.is_datetime64_any_dtype(col_data): rep = "Date"
-        
-        column_types.append({
-            "column_name": col,
-            "representation": rep,
-            "data_type": dtype_name
-        })
-        
-        # Step 4: Missing Values
-        missing = col_data.isnull().sum()
-        if missing > 0:
-            # Capture first 5 affected row indices (0-indexed)
-            affected_rows = df[col_data.isnull()].index.tolist()[:5] 
-            data_issues.append({
-                "issue_type": "Missing Value",
-                "column_name": col,
-                "explanation": f"Column '{col}' has {missing} empty cells.",
-                "severity": "High" if (missing/len(df)) > 0.1 else "Medium",
-                "affected_rows": affected_rows
-            })
-            
-        # Step 5: Type Mismatch (Text in Number column)
-        if col_data.dtype == 'object':
-            numeric_test = pd.to_numeric(col_data, errors='coerce')
-            if numeric_test.notnull().mean() > 0.8: # If 80% is numeric
-                 data_issues.append({
-                    "issue_type": "Wrong Data Type",
-                    "column_name": col,
-                    "explanation": f"Column '{col}' looks like Numbers but is stored as Text.",
-                    "severity": "Medium",
-                    "affected_rows": [] # Difficult to capture specifically without deeper parse
-                })
+    # 2. Glass Box: Column Type & Issue Detection (columns audited in parallel blocks)
+    for column_type, issues in column_profiler.map_columns(df, _audit_column):
+        column_types.append(column_type)
+        data_issues.extend(issues)
 
     # Capture final stats for summary
     raw_stats.update({
@@ -288,152 +255,190 @@ def clean_and_audit(df: pd.DataFrame):
 
     return df, audit_log, raw_stats, forensic_trace, column_types, data_issues
 
-def analyze_file_preview(file: UploadFile):
-    """Functionality 1: Automated Orientation Engine."""
-    temp_path = f"{UPLOAD_DIR}/temp_{file.filename}"
-    try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            file.file.seek(0)
-            
-        file_ext = file.filename.split('.')[-1].lower()
-        
-        # Multi-format Ingestion Node (Robust Loaders)
-        try:
-            if file_ext == 'csv': 
-                try: df = pd.read_csv(temp_path)
-                except UnicodeDecodeError: df = pd.read_csv(temp_path, encoding='latin1')
-            elif file_ext == 'tsv':
-                try: df = pd.read_csv(temp_path, sep='\t')
-                except UnicodeDecodeError: df = pd.read_csv(temp_path, sep='\t', encoding='latin1')
-            elif file_ext in ['xlsx', 'xls']: 
-                df = pd.read_excel(temp_path)
-            elif file_ext == 'json': 
-                # Try multiple JSON orientations
-                try: df = pd.read_json(temp_path)
-                except ValueError: 
-                    try: df = pd.read_json(temp_path, orient='index')
-                    except ValueError: df = pd.read_json(temp_path, lines=True) # NDJSON
-            elif file_ext == 'xml': 
-                df = pd.read_xml(temp_path)
-            elif file_ext == 'parquet':
-                df = pd.read_parquet(temp_path)
-            else: 
-                raise HTTPException(status_code=400, detail=f"Sorry, we can't read '.{file_ext}' files yet. Please use CSV, Excel, JSON, XML, TSV, or Parquet.")
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=422, detail=f"We couldn't read your file. Please check that it is a valid data file. Error: {str(e)}")
-            
-        # Execute Forensic Audit
-        df_cleaned, audit_log, forensic_stats, forensic_trace, column_types, data_issues = clean_and_audit(df)
+def _audit_column(col_data: pd.Series) -> tuple:
+    """Steps 3-5 of the audit for one column: (column type entry, data issues)."""
+    col = col_data.name
+    data_issues = []
+    
+    # Step 3: Column Types
+    dtype_name = str(col_data.dtype)
+    rep = "Text"
+    if pd.api.types.is_numeric_dtype(col_data): rep = "Number"
+    elif pd.api.types.is_datetime64_any_dtype(col_data): rep = "Date"
+    
+    column_type = {
+        "column_name": col,
+        "representation": rep,
+        "data_type": dtype_name
+    }
+    
+    # Step 4: Missing Values
+    null_mask = col_data.isnull().to_numpy()
+    missing = int(null_mask.sum())
+    if missing > 0:
+        # Capture first 5 affected row indices (0-indexed)
+        affected_rows = col_data.index[np.flatnonzero(null_mask)[:5]].tolist()
+        data_issues.append({
+            "issue_type": "Missing Value",
+            "column_name": col,
+            "explanation": f"Column '{col}' has {missing} empty cells.",
+            "severity": "High" if (missing/len(col_data)) > 0.1 else "Medium",
+            "affected_rows": affected_rows
+        })
         
-        # Calculate Quality & Insights
-        quality = calculate_quality_score(df)
-        insight_ctx = generate_ingestion_insights(df, quality, filename=file.filename)
+    # Step 5: Type Mismatch (Numbers, amounts, flags or dates stored as Text)
+    if dtype_optimizer.is_text_dtype(col_data):
+        for verdict in type_inference.mismatches([type_inference.infer_column(col_data)]):
+            expected = verdict["expected_type"]
+            data_issues.append({
+                "issue_type": "Wrong Data Type",
+                "column_name": col,
+                "explanation": f"Column '{col}' looks like {expected}s but is stored as Text.",
+                "severity": "Medium",
+                "expected_type": expected,
+                "affected_rows": col_data.index[verdict["bad_rows"][:5]].tolist()
+            })
+
+    return column_type, data_issues
+
+def _load_uploaded_frame(path: str, file_ext: str, sheet: str = None) -> pd.DataFrame:
+    """
+    Multi-format Ingestion Node. Encoding, delimiter, quoting, header, compression and
+    JSON layout are sniffed from the first bytes, then the file is parsed once.
+    `sheet` selects an Excel worksheet.
+    """
+    if file_ext not in ('csv', 'tsv', 'xlsx', 'xls', 'json', 'xml', 'parquet'):
+        raise HTTPException(status_code=400, detail=f"Sorry, we can't read '.{file_ext}' files yet. Please use CSV, Excel, JSON, XML, TSV, or Parquet.")
+    return ingestion.load_frame(path, file_ext, sheet)
+
+def profile_upload(df: pd.DataFrame, filename: str) -> dict:
+    """Runs the forensic audit, quality scoring and insight generation once for an upload."""
+    df_cleaned, audit_log, forensic_stats, forensic_trace, column_types, data_issues = clean_and_audit(df)
+    quality = calculate_quality_score(df)
+    insight_ctx = generate_ingestion_insights(df, quality, filename=filename)
+    return {
+        "df": df,
+        "df_cleaned": df_cleaned,
+        "schema": dtype_optimizer.infer_schema(df_cleaned),
+        "audit_log": audit_log,
+        "forensic_stats": forensic_stats,
+        "forensic_trace": forensic_trace,
+        "column_types": column_types,
+        "data_issues": data_issues,
+        "quality": quality,
+        "insight_ctx": insight_ctx,
+    }
+
+def build_preview_payload(profile: dict, filename: str, file_ext: str) -> dict:
+    """Orientation payload returned by /datasets/preview."""
+    df = profile["df"]
+    forensic_stats = profile["forensic_stats"]
+    insight_ctx = profile["insight_ctx"]
+
+    # Isolate Anomaly Instances (Rows with at least one NULL)
+    anomaly_df = df[df.isnull().any(axis=1)].head(50)
+    # Text dates are shown as the stored version loads them, so they serialize in the API's ISO form
+    dates = {col: target for col, target in profile["schema"].items() if target == "datetime64[ns]"}
+
+    return {
+        "filename": filename,
+        "file_type": file_ext,
+        "row_count": len(df),
+        "column_count": len(df.columns),
+        "columns": list(df.columns),
+        "full_data": dtype_optimizer.apply_schema(df.head(100), dates),
+        "anomaly_data": dtype_optimizer.apply_schema(anomaly_df, dates),
+        "dtypes": df.dtypes.astype(str).to_dict(),
         
-        # Isolate Anomaly Instances (Rows with at least one NULL)
-        anomaly_df = df[df.isnull().any(axis=1)].head(50)
+        # Glass Box Metadata
+        "quality_score": profile["quality"], # includes score, rating, score_breakdown
+        "column_types": profile["column_types"],
+        "data_issues": profile["data_issues"],
+        "dataset_explanation": insight_ctx["dataset_explanation"],
+        "readiness": insight_ctx["readiness"],
         
-        return {
-            "filename": file.filename,
-            "file_type": file_ext,
-            "row_count": len(df),
-            "column_count": len(df.columns),
-            "columns": list(df.columns),
-            "full_data": df.head(100).replace({np.nan: None}).to_dict(orient="records"),
-            "anomaly_data": anomaly_df.replace({np.nan: None}).to_dict(orient="records"),
-            "dtypes": df.dtypes.astype(str).to_dict(),
-            
-            # Glass Box Metadata
-            "quality_score": quality, # includes score, rating, score_breakdown
-            "column_types": column_types,
-            "data_issues": data_issues,
-            "dataset_explanation": insight_ctx["dataset_explanation"],
-            "readiness": insight_ctx["readiness"],
-            
-            "structural_audit": {
-                "total_nulls": forensic_stats["total_nulls"],
-                "null_rows": forensic_stats["null_rows"],
-                "null_cols": forensic_stats["null_cols"],
-                "duplicates": forensic_stats["duplicate_count"]
-            },
-            "processing_log": json.dumps(audit_log),
-            "forensic_trace": forensic_trace
-        }
-    finally:
-        if os.path.exists(temp_path): os.remove(temp_path)
+        "structural_audit": {
+            "total_nulls": forensic_stats["total_nulls"],
+            "null_rows": forensic_stats["null_rows"],
+            "null_cols": forensic_stats["null_cols"],
+            "duplicates": forensic_stats["duplicate_count"]
+        },
+        "processing_log": json.dumps(profile["audit_log"]),
+        "forensic_trace": profile["forensic_trace"]
+    }
 
-def process_uploaded_file(file: UploadFile, session: Session) -> Dataset:
-    """Functionality 7: Final Handshake and MySQL Persistence."""
-    file_location = f"{UPLOAD_DIR}/{file.filename}"
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
+def build_dataset_fields(profile: dict, filename: str, file_ext: str) -> dict:
+    """Dataset record columns derived from an upload profile (everything except storage paths)."""
+    df_cleaned = profile["df_cleaned"]
+    forensic_stats = profile["forensic_stats"]
+    quality = profile["quality"]
+    insight_ctx = profile["insight_ctx"]
+
+    # GLASS BOX PERSISTENCE: Pack all explanation metadata into the JSON field
+    glass_box_metadata = {
+        "dataset_explanation": insight_ctx["dataset_explanation"],
+        "readiness": insight_ctx["readiness"],
+        "data_issues": profile["data_issues"],
+        "column_types": profile["column_types"],
+        "score_breakdown": quality["score_breakdown"]
+    }
+    return {
+        "filename": filename,
+        "file_type": file_ext,
+        "row_count": len(df_cleaned),
+        "column_count": len(df_cleaned.columns),
+        "unstructured_null_count": forensic_stats["total_nulls"],
+        "unstructured_row_removal_count": forensic_stats["null_rows"],
+        "quality_score": quality["score"],
+        "analyzed": True,
+        "processing_log": json.dumps(profile["audit_log"]),
+        "forensic_trace": json.dumps(profile["forensic_trace"]),
+        "ingestion_insights": json.dumps(glass_box_metadata),
+        "column_schema": json.dumps(profile["schema"])
+    }
+
+def process_uploaded_file(file: UploadFile, session: Session, sheet: str = None) -> Dataset:
+    """
+    Functionality 7: Final Handshake and MySQL Persistence.
+    Files go into the content-addressed blob store; a byte-identical re-upload
+    reuses the stored file and profile without being parsed again.
+    """
     file_ext = file.filename.split('.')[-1].lower()
+    file_location = blob_store.incoming_path(file_ext)
+    source_sha256 = blob_store.source_key(blob_store.copy_and_hash(file.file, file_location), sheet)
+    
     try:
-        # Load for final audit (Robust Loaders)
-        if file_ext == 'csv': 
-            try: df = pd.read_csv(file_location)
-            except UnicodeDecodeError: df = pd.read_csv(file_location, encoding='latin1')
-        elif file_ext == 'tsv':
-            try: df = pd.read_csv(file_location, sep='\t')
-            except UnicodeDecodeError: df = pd.read_csv(file_location, sep='\t', encoding='latin1')
-        elif file_ext in ['xlsx', 'xls']: 
-            df = pd.read_excel(file_location)
-        elif file_ext == 'json': 
-            try: df = pd.read_json(file_location)
-            except ValueError: 
-                try: df = pd.read_json(file_location, orient='index')
-                except ValueError: df = pd.read_json(file_location, lines=True)
-        elif file_ext == 'xml': 
-            df = pd.read_xml(file_location)
-        elif file_ext == 'parquet':
-            df = pd.read_parquet(file_location)
+        known = blob_store.find_by_source(session, source_sha256)
+        if known and known.file_ext == file_ext and os.path.exists(known.storage_path):
+            blob_store.acquire(session, known)
+            dataset = Dataset(
+                filepath=known.storage_path,
+                content_hash=known.sha256,
+                file_size_bytes=known.size_bytes,
+                **blob_store.reuse_profile(known, file.filename)
+            )
         else:
-             raise HTTPException(status_code=400, detail=f"Sorry, we can't read '.{file_ext}' files yet. Please use CSV, Excel, JSON, XML, TSV, or Parquet.")
-        
-        df_cleaned, audit_log, forensic_stats, forensic_trace, column_types, data_issues = clean_and_audit(df)
-        quality = calculate_quality_score(df)
-        insight_ctx = generate_ingestion_insights(df, quality, filename=file.filename)
-        
-        # Save processed version in the SAME format as the original
-        storage_path = file_location.rsplit('.', 1)[0] + "_processed." + file_ext
-        _save_dataframe(df_cleaned, storage_path, file_ext)
-        
-        # GLASS BOX PERSISTENCE: Pack all explanation metadata into the JSON field
-        glass_box_metadata = {
-            "dataset_explanation": insight_ctx["dataset_explanation"],
-            "readiness": insight_ctx["readiness"],
-            "data_issues": data_issues,
-            "column_types": column_types,
-            "score_breakdown": quality["score_breakdown"]
-        }
-        
-        dataset = Dataset(
-            filename=file.filename,
-            filepath=storage_path,
-            file_type=file_ext,
-            row_count=len(df_cleaned),
-            column_count=len(df_cleaned.columns),
-            file_size_bytes=os.path.getsize(storage_path),
-            unstructured_null_count=forensic_stats["total_nulls"],
-            unstructured_row_removal_count=forensic_stats["null_rows"],
-            quality_score=quality["score"],
-            analyzed=True,
-            processing_log=json.dumps(audit_log),
-            forensic_trace=json.dumps(forensic_trace),
-            ingestion_insights=json.dumps(glass_box_metadata)
-        )
+            # Load for final audit (Robust Loaders)
+            df = _load_uploaded_frame(file_location, file_ext, sheet)
+            profile = profile_upload(df, file.filename)
+            fields = build_dataset_fields(profile, file.filename, file_ext)
+            
+            # Save processed version in the SAME format as the original
+            blob = blob_store.put_frame(session, profile["df_cleaned"], file_ext, _save_dataframe)
+            blob_store.remember_source(blob, source_sha256, file.filename, fields)
+            dataset = Dataset(
+                filepath=blob.storage_path,
+                content_hash=blob.sha256,
+                file_size_bytes=blob.size_bytes,
+                **fields
+            )
         
         session.add(dataset)
         session.commit()
         session.refresh(dataset)
-        
-        if file_location != storage_path and os.path.exists(file_location):
-            os.remove(file_location)
-            
         return dataset
     except Exception as e:
+        session.rollback()
+        raise HTTPException(status_code=400, detail=f"We couldn't process your file. Please check that it contains valid data. Error: {str(e)}")
+    finally:
         if os.path.exists(file_location): os.remove(file_location)
-        raise HTTPException(status_code=400, detail=f"We couldn't process your file. Please check that it contains valid data. Error: {str(e)}")
\ No newline at end of file
@@ -1,14 +1,13 @@
 
-import io
-import zipfile
 import json
-import pandas as pd
-from fastapi import HTTPException
-from fastapi.responses import StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse, FileResponse, Response
+from starlette.background import BackgroundTask
 from sqlmodel import Session
+from app.core.database import engine
 from app.models.dataset import Dataset
-from app.services import export_service
-from app.services.dataset_service import _save_dataframe
+from app.services import export_service, columnar_store, stream_export
 
 import os
 
@@ -23,10 +22,38 @@ FORMAT_MIME = {
     "parquet": "application/octet-stream",
 }
 
-def generate_csv_export(dataset_id: int, version: str, session: Session):
+def _export_filename(dataset: Dataset, fmt: str) -> str:
+    base = dataset.filename.rsplit('.', 1)[0]
+    return dataset.filename if dataset.filename.lower().endswith(f".{fmt}") else f"{base}.{fmt}"
+
+
+def _file_etag(path: str) -> str:
+    stat = os.stat(path)
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _send_stored_file(path: str, mime: str, filename: str, request: Request = None):
+    """Serve a file straight from disk: zero-copy where the server supports it, Range + ETag aware."""
+    etag = _file_etag(path)
+    if request is not None and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return FileResponse(
+        path,
+        media_type=mime,
+        filename=filename,
+        headers={"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"},
+    )
+
+
+def generate_csv_export(dataset_id: int, version: str, session: Session, fmt: str = None, request: Request = None):
     """
-    Generates a file download in the ORIGINAL format of the dataset.
+    Generates a file download, by default in the ORIGINAL format of the dataset.
     version: "original" or "prepared"
+    fmt: optional target format (csv, tsv, json, xml, xlsx, parquet)
+
+    Nothing is buffered in full: files already stored in the requested format are
+    sent from disk, everything else is encoded chunk by chunk from the canonical
+    columnar file.
     """
     dataset = session.get(Dataset, dataset_id)
     if not dataset:
@@ -34,102 +61,97 @@ def generate_csv_export(dataset_id: int, version: str, session: Session):
 
     target_filepath = dataset.filepath
     file_type = dataset.file_type if dataset.file_type else "csv"
+    fmt = (fmt or file_type).lower()
 
     if not target_filepath or not os.path.exists(target_filepath):
          raise HTTPException(status_code=404, detail="File is missing. Please re-upload.")
+    if fmt not in stream_export.EXPORT_FORMATS and fmt != file_type:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{fmt}'.")
+
+    mime = FORMAT_MIME.get(fmt, "application/octet-stream")
+    filename = _export_filename(dataset, fmt)
 
     try:
-        # Read the stored file using the format-aware loader from eda_service
-        from app.services.eda_service import _load_dataframe_from_disk
-        df = _load_dataframe_from_disk(target_filepath)
-
-        # Write back in the original format
-        if file_type in ("csv", "tsv"):
-            sep = '\t' if file_type == 'tsv' else ','
-            stream = io.StringIO()
-            df.to_csv(stream, index=False, sep=sep)
-            content = stream.getvalue().encode('utf-8')
-        elif file_type in ("xlsx", "xls"):
-            stream = io.BytesIO()
-            df.to_excel(stream, index=False, engine='openpyxl')
-            content = stream.getvalue()
-        elif file_type == "json":
-            content = df.to_json(orient='records', indent=2).encode('utf-8')
-        elif file_type == "xml":
-            content = df.to_xml(index=False).encode('utf-8')
-        elif file_type == "parquet":
-            stream = io.BytesIO()
-            df.to_parquet(stream, index=False)
-            content = stream.getvalue()
-        else:
-            # Fallback to CSV
-            stream = io.StringIO()
-            df.to_csv(stream, index=False)
-            content = stream.getvalue().encode('utf-8')
-
-        mime = FORMAT_MIME.get(file_type, "application/octet-stream")
-        response = StreamingResponse(iter([content]), media_type=mime)
-        response.headers["Content-Disposition"] = f"attachment; filename={dataset.filename}"
+        # 1. Already in the requested format on disk -> send the bytes as stored
+        if fmt == file_type and target_filepath.lower().endswith(f".{fmt}"):
+            return _send_stored_file(target_filepath, mime, filename, request)
+        if fmt == "parquet":
+            return _send_stored_file(columnar_store.ensure_canonical(target_filepath), mime, filename, request)
+
+        # 2. Containers need a seekable target: spool chunk by chunk to a temp file
+        if fmt in ("xlsx", "xls"):
+            tmp_path = stream_export.write_spooled(target_filepath, fmt)
+            return FileResponse(tmp_path, media_type=mime, filename=filename, background=BackgroundTask(os.remove, tmp_path))
+
+        # 3. Text formats stream straight out of the chunk encoder
+        response = StreamingResponse(stream_export.iter_encoded(target_filepath, fmt), media_type=mime)
+        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
+def _bundle_data_entry(dataset: Dataset):
+    """(name, chunks) for the data file: raw bytes from disk when stored in its own format, else chunk-encoded."""
+    file_type = dataset.file_type if dataset.file_type else "csv"
+    if dataset.filepath.lower().endswith(f".{file_type}"):
+        return dataset.filename, stream_export.iter_file(dataset.filepath)
+    if file_type in ("csv", "tsv", "json", "xml"):
+        return dataset.filename, stream_export.iter_encoded(dataset.filepath, file_type)
+    return f"{dataset.filename}_data.csv", stream_export.iter_encoded(dataset.filepath, "csv")
+
+
+def _build_report(dataset_id: int):
+    # Runs on a worker thread, so it needs its own database session
+    with Session(engine) as worker_session:
+        return export_service.generate_research_report(dataset_id, worker_session)
+
+
+def _iter_bundle(dataset: Dataset):
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # Report generation overlaps with streaming the data entry
+        report_future = pool.submit(_build_report, dataset.id)
+
+        def entries():
+            # 1. Add Data in original format
+            try:
+                yield _bundle_data_entry(dataset)
+            except Exception:
+                pass
+
+            report = report_future.result()
+
+            # 2. Add Report (Markdown)
+            yield "research_report.md", [report["markdown_content"]]
+
+            # 3. Add Issues (JSON)
+            issues = {
+                "identity": report["identity"],
+                "readiness": report["readiness"],
+                "recommendations": report["recommendations"]
+            }
+            yield "key_insights.json", [json.dumps(issues, indent=2)]
+
+            # 4. Add Readme
+            yield "README.txt", ["Generated by A.V.I.S.\nThis export contains your dataset and automated analysis results."]
+
+        yield from stream_export.iter_zip(entries())
+
+
 def generate_full_zip(dataset_id: int, session: Session):
     """
-    Bundles all artifacts into a single ZIP file.
+    Bundles all artifacts into a single ZIP file, streamed entry by entry.
     - Data (in original format)
     - Summary (MD)
     - Issues (JSON)
+    Time-to-first-byte and peak memory do not depend on dataset size.
     """
     dataset = session.get(Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
-        
-    report = export_service.generate_research_report(dataset_id, session)
-    file_type = dataset.file_type if dataset.file_type else "csv"
-    
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        
-        # 1. Add Data in original format
-        try:
-            from app.services.eda_service import _load_dataframe_from_disk
-            df = _load_dataframe_from_disk(dataset.filepath)
-            
-            if file_type in ("csv", "tsv"):
-                sep = '\t' if file_type == 'tsv' else ','
-                data_content = df.to_csv(index=False, sep=sep)
-                zip_file.writestr(f"{dataset.filename}", data_content)
-            elif file_type in ("xlsx", "xls"):
-                excel_buf = io.BytesIO()
-                df.to_excel(excel_buf, index=False, engine='openpyxl')
-                zip_file.writestr(f"{dataset.filename}", excel_buf.getvalue())
-            elif file_type == "json":
-                zip_file.writestr(f"{dataset.filename}", df.to_json(orient='records', indent=2))
-            elif file_type == "xml":
-                zip_file.writestr(f"{dataset.filename}", df.to_xml(index=False))
-            else:
-                zip_file.writestr(f"{dataset.filename}_data.csv", df.to_csv(index=False))
-        except Exception:
-            pass
-            
-        # 2. Add Report (Markdown)
-        zip_file.writestr("research_report.md", report["markdown_content"])
-        
-        # 3. Add Issues (JSON)
-        issues = {
-            "identity": report["identity"],
-            "readiness": report["readiness"],
-            "recommendations": report["recommendations"]
-        }
-        zip_file.writestr("key_insights.json", json.dumps(issues, indent=2))
-        
-        # 4. Add Readme
-        zip_file.writestr("README.txt", "Generated by A.V.I.S.\nThis export contains your dataset and automated analysis results.")
-
-    zip_buffer.seek(0)
-    
-    response = StreamingResponse(iter([zip_buffer.getvalue()]), media_type="application/zip")
+    if not dataset.filepath or not os.path.exists(dataset.filepath):
+        raise HTTPException(status_code=404, detail="File is missing. Please re-upload.")
+
+    response = StreamingResponse(_iter_bundle(dataset), media_type="application/zip")
     response.headers["Content-Disposition"] = f"attachment; filename={dataset.filename.rsplit('.', 1)[0]}_bundle.zip"
     return response
 
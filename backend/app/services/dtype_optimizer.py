@@ -0,0 +1,141 @@
+import re
+import json
+import numpy as np
+import pandas as pd
+
+# Loaded frames otherwise sit in memory as int64/float64 and Python-object strings.
+# The schema resolved at ingestion is stored on the Dataset and re-applied on every load.
+CATEGORY_MAX_RATIO = 0.5
+AUTO_SCHEMA = "auto"
+ARROW_STRING = pd.StringDtype(storage="pyarrow", na_value=np.nan)
+
+_INT_WIDTHS = ("int8", "int16", "int32")
+_DATE_LIKE = re.compile(
+    r"^(\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{4})"
+    r"([ T]\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?)?$"
+)
+
+
+def is_text_dtype(series: pd.Series) -> bool:
+    """Text-like columns: Python objects, categoricals and (Arrow) strings."""
+    return (
+        pd.api.types.is_object_dtype(series)
+        or isinstance(series.dtype, pd.CategoricalDtype)
+        or isinstance(series.dtype, pd.StringDtype)
+    )
+
+
+def fill_text(series: pd.Series, value) -> pd.Series:
+    """fillna that also works on categoricals, where a new fill value is not a known category."""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.astype(object)
+    return series.fillna(value)
+
+
+# ─────────────────────────────────────────────────────
+# SCHEMA RESOLUTION
+# ─────────────────────────────────────────────────────
+
+def _integer_width(series: pd.Series):
+    """Narrowest signed width holding every value (unsigned would wrap on subtraction)."""
+    if series.empty:
+        return None
+    low, high = series.min(), series.max()
+    for width in _INT_WIDTHS:
+        info = np.iinfo(width)
+        if info.min <= low and high <= info.max:
+            return width
+    return None
+
+
+def _text_target(series: pd.Series):
+    values = series.dropna()
+    if values.empty or pd.api.types.infer_dtype(values, skipna=True) != "string":
+        return None  # mixed Python objects stay as they are
+    sample = values.head(1000)
+    if sample.map(lambda v: bool(_DATE_LIKE.match(v))).all():
+        parsed = pd.to_datetime(values, errors="coerce")
+        if parsed.notna().all():
+            return "datetime64[ns]"
+    if values.nunique() <= len(values) * CATEGORY_MAX_RATIO:
+        return "category"
+    return "string"
+
+
+def column_target(series: pd.Series):
+    """Compact dtype for one column, or None to keep what the loader produced."""
+    if pd.api.types.is_bool_dtype(series):
+        return None
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return "category"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime64[ns]" if series.dt.tz is None else None
+    if pd.api.types.is_integer_dtype(series):
+        # Nullable Int64 columns keep their NA semantics
+        return _integer_width(series) if isinstance(series.dtype, np.dtype) else None
+    if is_text_dtype(series):
+        return _text_target(series)
+    # Floats stay float64: float32 reductions would shift the reported statistics
+    return None
+
+
+def infer_schema(df: pd.DataFrame) -> dict:
+    """{column: dtype} for every column that has a more compact representation."""
+    schema = {}
+    for col in df.columns:
+        target = column_target(df[col])
+        if target:
+            schema[str(col)] = target
+    return schema
+
+
+def dump_schema(df: pd.DataFrame) -> str:
+    return json.dumps(infer_schema(df))
+
+
+# ─────────────────────────────────────────────────────
+# SCHEMA APPLICATION (every reload)
+# ─────────────────────────────────────────────────────
+
+def _convert(series: pd.Series, target: str) -> pd.Series:
+    if target == "category":
+        return series.astype("category")
+    if target == "string":
+        return series.astype(ARROW_STRING)
+    if target == "datetime64[ns]":
+        return pd.to_datetime(series, errors="coerce")
+    if target in _INT_WIDTHS:
+        if not pd.api.types.is_integer_dtype(series) or series.isna().any():
+            return series
+        info = np.iinfo(target)
+        if series.empty or (info.min <= series.min() and series.max() <= info.max):
+            return series.astype(target)
+    return series
+
+
+def apply_schema(df: pd.DataFrame, schema) -> pd.DataFrame:
+    """
+    Restores the compact dtypes of a stored schema (a dict or its JSON text).
+    AUTO_SCHEMA resolves one from the frame itself (datasets stored before schemas were kept).
+    Columns that no longer fit their recorded dtype are left untouched.
+    """
+    if schema == AUTO_SCHEMA:
+        schema = infer_schema(df)
+    elif isinstance(schema, str):
+        schema = json.loads(schema)
+    if not schema:
+        return df
+    converted = {}
+    for col in df.columns:
+        target = schema.get(str(col))
+        if target and str(df[col].dtype) != target:
+            try:
+                converted[col] = _convert(df[col], target)
+            except (ValueError, TypeError, OverflowError):
+                pass
+    if not converted:
+        return df
+    df = df.copy(deep=False)
+    for col, series in converted.items():
+        df[col] = series
+    return df
@@ -4,45 +4,28 @@ import os
 from fastapi import HTTPException
 from sqlmodel import Session
 from app.models.dataset import Dataset
+from app.services import artifact_cache, ingestion, dtype_optimizer, out_of_core, columnar_store, index_service
 
 from functools import lru_cache
 
 @lru_cache(maxsize=15)
-def _load_dataframe_from_disk(filepath: str) -> pd.DataFrame:
-    """Internal cached loader — format-aware to handle CSV, Excel, JSON, XML, TSV, Parquet."""
-    ext = filepath.rsplit('.', 1)[-1].lower() if '.' in filepath else 'csv'
-    try:
-        if ext == 'csv':
-            try: return pd.read_csv(filepath)
-            except UnicodeDecodeError: return pd.read_csv(filepath, encoding='latin1')
-        elif ext == 'tsv':
-            try: return pd.read_csv(filepath, sep='\t')
-            except UnicodeDecodeError: return pd.read_csv(filepath, sep='\t', encoding='latin1')
-        elif ext in ('xlsx', 'xls'):
-            return pd.read_excel(filepath)
-        elif ext == 'json':
-            try: return pd.read_json(filepath)
-            except ValueError:
-                try: return pd.read_json(filepath, orient='index')
-                except ValueError: return pd.read_json(filepath, lines=True)
-        elif ext == 'xml':
-            return pd.read_xml(filepath)
-        elif ext == 'parquet':
-            return pd.read_parquet(filepath)
-        else:
-            # Fallback to CSV
-            try: return pd.read_csv(filepath)
-            except UnicodeDecodeError: return pd.read_csv(filepath, encoding='latin1')
-    except Exception:
-        # Ultimate fallback
-        try: return pd.read_csv(filepath)
-        except UnicodeDecodeError: return pd.read_csv(filepath, encoding='latin1')
-
-def get_dataframe(dataset_id: int, session: Session) -> pd.DataFrame:
+def _load_dataframe_from_disk(filepath: str, schema: str = None) -> pd.DataFrame:
     """
-    Functionality 1: Secure Ingestion Node.
-    Validates physical file existence and handles encoding fallbacks.
+    Internal cached loader — one sniffed parse for CSV, Excel, JSON, XML, TSV, Parquet.
+    With a schema the cached frame holds the compact dtypes (downcast ints, categoricals,
+    Arrow strings, parsed dates) instead of int64 / Python-object defaults.
     """
+    ext = filepath.rsplit('.', 1)[-1].lower() if '.' in filepath else 'csv'
+    df = ingestion.load_frame(filepath, ext)
+    return dtype_optimizer.apply_schema(df, schema) if schema else df
+
+@lru_cache(maxsize=64)
+def _load_columns_from_disk(filepath: str, columns: tuple, schema: str = None) -> pd.DataFrame:
+    """Internal cached projected read: only `columns` are decoded from the canonical columnar file."""
+    df = columnar_store.read_columns(filepath, list(columns))
+    return dtype_optimizer.apply_schema(df, schema) if schema else df
+
+def _stored_dataset(dataset_id: int, session: Session) -> Dataset:
     dataset = session.get(Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset record missing in database.")
@@ -52,9 +35,52 @@ def get_dataframe(dataset_id: int, session: Session) -> pd.DataFrame:
             status_code=404, 
             detail="The cleaned data matrix is missing from storage. Please re-upload."
         )
+    return dataset
+
+def get_dataframe(dataset_id: int, session: Session) -> pd.DataFrame:
+    """
+    Functionality 1: Secure Ingestion Node.
+    Validates physical file existence and handles encoding fallbacks.
+    """
+    dataset = _stored_dataset(dataset_id, session)
     
     try:
-        df = _load_dataframe_from_disk(dataset.filepath)
+        df = _load_dataframe_from_disk(dataset.filepath, dataset.column_schema or dtype_optimizer.AUTO_SCHEMA)
+        return df.copy() # Protect cached instance from mutation
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Handshake Failure: Matrix corrupted ({str(e)})")
+
+def get_column_names(dataset_id: int, session: Session) -> list:
+    """Column names from the canonical file's footer; no data pages are read."""
+    dataset = _stored_dataset(dataset_id, session)
+    return columnar_store.get_layout(dataset.filepath)["columns"]
+
+def get_columns(dataset_id: int, columns: list, session: Session, filters: list = None) -> pd.DataFrame:
+    """
+    Projection-aware counterpart of get_dataframe: reads only `columns` (with the same
+    compact dtypes), so the cost scales with the columns a caller uses, not the table width.
+    `filters` ({column, op, value} predicates) keep only matching rows, resolved through
+    index_service before any of the projected columns are decoded; the frame is then
+    indexed by the original row positions.
+    """
+    dataset = _stored_dataset(dataset_id, session)
+    wanted = tuple(dict.fromkeys(columns))
+    all_columns = columnar_store.get_layout(dataset.filepath)["columns"]
+    missing = [c for c in wanted if c not in all_columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Column '{missing[0]}' not found")
+    schema = dataset.column_schema or dtype_optimizer.AUTO_SCHEMA
+
+    row_ids = index_service.match_rows(
+        dataset.filepath, all_columns, filters, index_service.schema_dates(dataset)
+    ) if filters else None
+    if row_ids is not None:
+        df = columnar_store.read_rows(dataset.filepath, row_ids, list(wanted))
+        df.index = pd.Index(row_ids)
+        return dtype_optimizer.apply_schema(df, schema)
+    
+    try:
+        df = _load_columns_from_disk(dataset.filepath, wanted, schema)
         return df.copy() # Protect cached instance from mutation
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Handshake Failure: Matrix corrupted ({str(e)})")
@@ -63,79 +89,111 @@ def get_summary_statistics(dataset_id: int, session: Session):
     """
     Functionality 3.3: Visible Backend Steps & Automated Statistics.
     Provides detailed reasoning for every calculation performed.
+    Served from the artifact cache while the dataset content is unchanged.
     """
-    df = get_dataframe(dataset_id, session)
+    dataset = session.get(Dataset, dataset_id)
+    return artifact_cache.get_or_compute(
+        session, dataset, "summary", lambda: _compute_summary_statistics(dataset_id, session)
+    )
+
+def _compute_summary_statistics(dataset_id: int, session: Session):
+    dataset = session.get(Dataset, dataset_id)
+    if out_of_core.enabled_for(dataset):
+        return _summary_out_of_core(dataset)
+
+    # Read from the version's column profile (shared with issue detection and quality metrics)
+    from app.services import profile_service
+    profile = profile_service.get_profile(session, dataset)
     
-    # 1. Quantitative Logic: Central Tendency Audit
-    numeric_df = df.select_dtypes(include=[np.number])
+    # 1. Quantitative Logic: Central Tendency Audit (skip NaNs, do NOT fill with 0)
     numeric_dict = []
-    
-    if not numeric_df.empty:
-        # Compute stats on actual data (skip NaNs, do NOT fill with 0)
-        desc = numeric_df.describe().T.reset_index()
-        desc.columns = ['column', 'count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
-        
-        for _, row in desc.iterrows():
-            col_name = row['column']
-            col_data = numeric_df[col_name].dropna()
-            skew = float(col_data.skew()) if len(col_data) > 2 else 0.0
-            
-            # --- Simple, clear reasoning ---
-            logic_steps = [
-                f"Calculated the average (mean) of {int(row['count'])} values in this column.",
-                f"Measured how spread out the values are (standard deviation = {row['std']:.2f}).",
-                f"Checked if values lean to one side (skewness = {skew:.2f})."
-            ]
-            
-            insight = "Values are evenly spread — no unusual patterns."
-            if abs(skew) > 1:
-                insight = f"Values are clustered toward the {'lower' if skew > 0 else 'higher'} end of the range."
-            elif row['std'] > row['mean'] and row['mean'] > 0:
-                insight = "Values vary widely — there's a big difference between the smallest and largest entries."
-            elif row['std'] < (row['mean'] * 0.05) and row['std'] != 0:
-                insight = "Values are very consistent — most entries are nearly the same."
-            
-            numeric_dict.append({
-                **row.replace({np.nan: None}).to_dict(),
-                "skew": round(skew, 2),
-                "insight": insight,
-                "logic_desc": " | ".join(logic_steps)
-            })
-
     # 2. Text / Category Columns
-    categorical_df = df.select_dtypes(exclude=[np.number])
     categorical_summary = []
-    
-    for col in categorical_df.columns:
-        counts = categorical_df[col].value_counts().head(5).to_dict()
-        unique_count = int(categorical_df[col].nunique())
-        
-        diversity = "Balanced"
-        insight = "Values are spread across multiple categories."
+    for entry in profile["columns"]:
+        if entry["numeric"]:
+            row = {"column": entry["column"], **{k: np.nan if v is None else v for k, v in entry["describe"].items()}}
+            skew = (entry["skew"] or 0.0) if row["count"] > 2 else 0.0
+            numeric_dict.append(_numeric_summary(row, skew))
+        else:
+            categorical_summary.append(
+                _categorical_summary(entry["column"], entry["top_values"], entry["distinct"], profile["row_count"])
+            )
         
-        if unique_count > (len(df) * 0.8):
-            diversity = "Unique ID"
-            insight = "Almost every row has a different value — this column is likely an ID or name."
-        elif unique_count == 1:
-            diversity = "Single Value"
-            insight = "Every row has the same value — this column has no variety."
-        elif unique_count < 5:
-            diversity = "Few Categories"
-            insight = "Only a few distinct values — good for grouping and comparison."
-            
-        categorical_summary.append({
-            "column": col,
-            "unique_count": unique_count,
-            "top_values": counts,
-            "diversity_index": diversity,
-            "insight": insight
-        })
+    return {
+        "numeric": numeric_dict,
+        "categorical": categorical_summary,
+        "total_rows": profile["row_count"],
+        "total_columns": profile["column_count"]
+    }
+
+def _numeric_summary(row: dict, skew: float) -> dict:
+    # --- Simple, clear reasoning ---
+    logic_steps = [
+        f"Calculated the average (mean) of {int(row['count'])} values in this column.",
+        f"Measured how spread out the values are (standard deviation = {row['std']:.2f}).",
+        f"Checked if values lean to one side (skewness = {skew:.2f})."
+    ]
+    
+    insight = "Values are evenly spread — no unusual patterns."
+    if abs(skew) > 1:
+        insight = f"Values are clustered toward the {'lower' if skew > 0 else 'higher'} end of the range."
+    elif row['std'] > row['mean'] and row['mean'] > 0:
+        insight = "Values vary widely — there's a big difference between the smallest and largest entries."
+    elif row['std'] < (row['mean'] * 0.05) and row['std'] != 0:
+        insight = "Values are very consistent — most entries are nearly the same."
+    
+    return {
+        **{k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in row.items()},
+        "skew": round(skew, 2),
+        "insight": insight,
+        "logic_desc": " | ".join(logic_steps)
+    }
+
+def _categorical_summary(col, counts: dict, unique_count: int, total_rows: int) -> dict:
+    diversity = "Balanced"
+    insight = "Values are spread across multiple categories."
+    
+    if unique_count > (total_rows * 0.8):
+        diversity = "Unique ID"
+        insight = "Almost every row has a different value — this column is likely an ID or name."
+    elif unique_count == 1:
+        diversity = "Single Value"
+        insight = "Every row has the same value — this column has no variety."
+    elif unique_count < 5:
+        diversity = "Few Categories"
+        insight = "Only a few distinct values — good for grouping and comparison."
         
+    return {
+        "column": col,
+        "unique_count": unique_count,
+        "top_values": counts,
+        "diversity_index": diversity,
+        "insight": insight
+    }
+
+def _summary_out_of_core(dataset: Dataset) -> dict:
+    """
+    Same report streamed over the canonical file. Quartiles beyond the sample size and
+    top values of very high-cardinality columns are estimates, flagged per entry.
+    """
+    stats = out_of_core.summary_statistics(dataset)
+    numeric_dict = []
+    for entry in stats["numeric"]:
+        approximate = entry.pop("approximate")
+        skew = entry.pop("skew")
+        numeric_dict.append({**_numeric_summary(entry, skew), "approximate": approximate})
+    categorical_summary = [
+        {**_categorical_summary(entry["column"], entry["top_values"], entry["unique_count"], stats["total_rows"]),
+         "approximate": entry["approximate"]}
+        for entry in stats["categorical"]
+    ]
     return {
         "numeric": numeric_dict,
         "categorical": categorical_summary,
-        "total_rows": len(df),
-        "total_columns": len(df.columns)
+        "total_rows": stats["total_rows"],
+        "total_columns": stats["total_columns"],
+        "execution_mode": "out_of_core",
+        "approximate": any(e["approximate"] for e in numeric_dict + categorical_summary)
     }
 
 def get_missing_values(dataset_id: int, session: Session):
@@ -180,12 +238,27 @@ def get_correlation_matrix(dataset_id: int, session: Session):
     """
     Functionality 3.2: Relationship Discovery Logic.
     Explains the 'Pearson' math as a simple 'Connection Test'.
+    Served from the artifact cache while the dataset content is unchanged.
     """
+    dataset = session.get(Dataset, dataset_id)
+    return artifact_cache.get_or_compute(
+        session, dataset, "correlation", lambda: _compute_correlation_matrix(dataset_id, session)
+    )
+
+def _compute_correlation_matrix(dataset_id: int, session: Session):
+    dataset = session.get(Dataset, dataset_id)
+    if out_of_core.enabled_for(dataset):
+        # Pairwise sums merge exactly across row groups, so this result is not approximate
+        corr = out_of_core.correlation_matrix(dataset)
+        return {**_correlation_report(corr), "execution_mode": "out_of_core", "approximate": False}
+
     df = get_dataframe(dataset_id, session)
     # Remove columns that don't change (std=0) to prevent math errors
     numeric_df = df.select_dtypes(include=[np.number]).loc[:, df.nunique() > 1]
-    
-    if numeric_df.empty or len(numeric_df.columns) < 2:
+    return _correlation_report(numeric_df.corr() if len(numeric_df.columns) >= 2 else pd.DataFrame())
+
+def _correlation_report(corr: pd.DataFrame) -> dict:
+    if corr.empty or len(corr.columns) < 2:
         return {
             "matrix": [], 
             "top_discoveries": ["The engine needs at least two varying number columns to find links."],
@@ -193,7 +266,7 @@ def get_correlation_matrix(dataset_id: int, session: Session):
         }
         
     # Handle NaN and ensure JSON serializable output
-    corr_matrix = numeric_df.corr().replace({np.nan: 0})
+    corr_matrix = corr.replace({np.nan: 0})
     
     discovery_insights = []
     stack = corr_matrix.stack()
@@ -218,7 +291,7 @@ def get_correlation_matrix(dataset_id: int, session: Session):
     result.rename(columns={'index': 'column'}, inplace=True)
     
     return {
-        "matrix": result.to_dict(orient='records'),
+        "matrix": result,
         "top_discoveries": list(discovery_insights)[:3],
         "logic_desc": "A.V.I.S performed a 'Relationship Discovery' scan using the Pearson Correlation method to find hidden patterns."
     }
\ No newline at end of file
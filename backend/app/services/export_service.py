@@ -2,18 +2,26 @@
 import json
 from sqlmodel import Session
 from app.models.dataset import Dataset
-from app.services import eda_service, insight_service
+from app.services import eda_service, insight_service, artifact_cache
 
 def generate_research_report(dataset_id: int, session: Session):
     """
     Functionality: Final Research Report Generation.
     Aggregates all analysis into a structured, academic-style report.
+    Served from the artifact cache while the dataset content and record are unchanged.
     """
-    # 1. Fetch Core Data
     dataset = session.get(Dataset, dataset_id)
     if not dataset:
         return None
-        
+    return artifact_cache.get_or_compute(
+        session, dataset, "report", lambda: _compute_research_report(dataset, session),
+        depends_on=artifact_cache.record_state(dataset)
+    )
+
+def _compute_research_report(dataset: Dataset, session: Session):
+    dataset_id = dataset.id
+
+    # 1. Fetch Core Data
     insights = insight_service.generate_insights(dataset_id, session)
     ingestion_meta = json.loads(dataset.ingestion_insights) if dataset.ingestion_insights else {}
     processing_log = json.loads(dataset.processing_log) if dataset.processing_log else []
@@ -0,0 +1,614 @@
+import os
+import json
+import base64
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import OrderedDict
+from functools import lru_cache
+from fastapi import HTTPException
+from sqlmodel import Session
+from app.models.dataset import Dataset
+from app.services import columnar_store, dtype_optimizer
+
+# Pagination guard rails for the drilldown / filtering API
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Pushed-down filter results kept for re-use while paging or re-charting a filtered view
+SCAN_CACHE_SIZE = 32
+# Secondary column indexes kept per process (least recently used are rebuilt on demand)
+INDEX_CACHE_SIZE = 64
+
+RANGE_OPS = {"gt", "gte", "lt", "lte", "between"}
+SUPPORTED_OPS = RANGE_OPS | {"eq", "in", "is_null", "not_null"}
+
+
+# ─────────────────────────────────────────────────────
+# INDEX CONSTRUCTION (lazy, one column at a time)
+# ─────────────────────────────────────────────────────
+
+def _to_sortable(series: pd.Series):
+    """Map numeric and datetime columns onto a float64 axis (NaN = missing)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[ns]").astype("int64").astype("float64")
+        values[series.isna().to_numpy()] = np.nan
+        return values
+    return series.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _is_range_indexable(series: pd.Series) -> bool:
+    if pd.api.types.is_bool_dtype(series):
+        return False
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+
+
+# (filepath, mtime_ns, column, as_date) -> index, least recently used first
+_column_indexes = OrderedDict()
+_column_indexes_lock = threading.Lock()
+
+
+def _dataset_schema(dataset: Dataset) -> dict:
+    from app.services.out_of_core import resolve_schema
+    return resolve_schema(dataset)
+
+
+def _date_columns(schema: dict) -> tuple:
+    return tuple(sorted(col for col, target in schema.items() if target == "datetime64[ns]"))
+
+
+def schema_dates(dataset: Dataset) -> tuple:
+    """
+    Columns the dataset's dtype schema loads as datetimes. The canonical file can still
+    hold them as text, so indexes and scans parse them the same way loads do.
+    """
+    return _date_columns(_dataset_schema(dataset))
+
+
+def _read_indexed_column(filepath: str, column: str, as_date: bool) -> pd.Series:
+    series = columnar_store.read_column(filepath, column)
+    if as_date and not pd.api.types.is_datetime64_any_dtype(series):
+        # Text dates are parsed like the dtype schema (and timeseries_service) parse them
+        series = pd.to_datetime(series, errors="coerce")
+    return series
+
+
+def _build_column_index(filepath: str, column: str, as_date: bool = False) -> dict:
+    """
+    Builds a secondary index for a single column of an immutable dataset file.
+    - Numeric / date columns: sorted permutation (row ids ordered by value).
+    - Everything else: inverted index (value -> sorted row ids).
+    Null positions are stored separately so IS NULL never touches the data.
+    Only the requested column is read from the canonical columnar file.
+    """
+    series = _read_indexed_column(filepath, column, as_date)
+
+    if _is_range_indexable(series):
+        values = _to_sortable(series)
+        null_mask = np.isnan(values)
+        valid_rows = np.flatnonzero(~null_mask)
+        order = valid_rows[np.argsort(values[valid_rows], kind="stable")]
+        return {
+            "kind": "sorted",
+            "is_datetime": pd.api.types.is_datetime64_any_dtype(series),
+            "order": order,
+            "sorted_values": values[order],
+            "row_keys": values,
+            "null_rows": np.flatnonzero(null_mask),
+            "row_count": len(series),
+        }
+
+    # Sorted factorization makes codes follow value order, so the posting lists
+    # double as a lexical sort permutation for server-side sorting.
+    try:
+        codes, uniques = pd.factorize(series, sort=True, use_na_sentinel=True)
+    except TypeError:
+        codes, uniques = pd.factorize(series.map(lambda v: v if pd.isna(v) else str(v)), sort=True, use_na_sentinel=True)
+    null_rows = np.flatnonzero(codes == -1)
+    valid_rows = np.flatnonzero(codes != -1)
+    # Stable sort by code keeps row ids ascending inside every posting list
+    order = valid_rows[np.argsort(codes[valid_rows], kind="stable")]
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(codes[valid_rows], minlength=len(uniques)))))
+
+    postings = {}
+    for i, value in enumerate(uniques):
+        postings[value] = (int(bounds[i]), int(bounds[i + 1]))
+
+    return {
+        "kind": "inverted",
+        "order": order,
+        "postings": postings,
+        "postings_by_text": {str(k): v for k, v in postings.items()},
+        "row_keys": np.where(codes == -1, np.nan, codes.astype("float64")),
+        "null_rows": null_rows,
+        "row_count": len(series),
+    }
+
+
+def _column_index(filepath: str, mtime_ns: int, column: str, as_date: bool) -> dict:
+    key = (filepath, mtime_ns, column, as_date)
+    with _column_indexes_lock:
+        index = _column_indexes.get(key)
+        if index is not None:
+            _column_indexes.move_to_end(key)
+            return index
+    index = _build_column_index(filepath, column, as_date)
+    with _column_indexes_lock:
+        _column_indexes[key] = index
+        while len(_column_indexes) > INDEX_CACHE_SIZE:
+            _column_indexes.popitem(last=False)
+    return index
+
+
+def get_column_index(filepath: str, column: str, date_columns: tuple = ()) -> dict:
+    """
+    Returns the (cached) secondary index for one column of a stored dataset file.
+    date_columns (see schema_dates) are indexed as datetimes even when stored as text.
+    """
+    return _column_index(filepath, os.stat(filepath).st_mtime_ns, column, column in date_columns)
+
+
+def has_column_index(filepath: str, column: str, date_columns: tuple = ()) -> bool:
+    """True while an index for this column is cached (built by a drilldown or a sort)."""
+    key = (filepath, os.stat(filepath).st_mtime_ns, column, column in date_columns)
+    with _column_indexes_lock:
+        return key in _column_indexes
+
+
+@lru_cache(maxsize=32)
+def _build_sort_order(filepath: str, mtime_ns: int, column: str, descending: bool, as_date: bool) -> dict:
+    index = _column_index(filepath, mtime_ns, column, as_date)
+    keys = index["row_keys"]
+    valid_rows = np.flatnonzero(~np.isnan(keys))
+    # Stable sort on the (negated) key keeps ties in ascending row-id order both ways
+    directed = -keys[valid_rows] if descending else keys[valid_rows]
+    ranking = np.argsort(directed, kind="stable")
+    return {
+        # Nulls always trail the sorted values
+        "order": np.concatenate((valid_rows[ranking], index["null_rows"])),
+        "sorted_keys": directed[ranking],
+        "valid_count": len(valid_rows),
+    }
+
+
+def get_sort_order(filepath: str, column: str, descending: bool = False, date_columns: tuple = ()) -> dict:
+    """Full row permutation for server-side sorting on one column (nulls last)."""
+    return _build_sort_order(filepath, os.stat(filepath).st_mtime_ns, column, descending, column in date_columns)
+
+
+# ─────────────────────────────────────────────────────
+# PREDICATE EVALUATION (index lookups, no frame masks)
+# ─────────────────────────────────────────────────────
+
+def _coerce_bound(value, index: dict) -> float:
+    if value is None:
+        raise HTTPException(status_code=400, detail="Range filters need a comparison value.")
+    try:
+        if index["is_datetime"]:
+            return float(pd.Timestamp(value).value)
+        return float(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"'{value}' is not a valid bound for this column.")
+
+
+def _sorted_range(index: dict, low=None, high=None, low_inclusive=True, high_inclusive=True) -> np.ndarray:
+    values = index["sorted_values"]
+    start = 0
+    stop = len(values)
+    if low is not None:
+        start = np.searchsorted(values, _coerce_bound(low, index), side="left" if low_inclusive else "right")
+    if high is not None:
+        stop = np.searchsorted(values, _coerce_bound(high, index), side="right" if high_inclusive else "left")
+    if stop <= start:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(index["order"][start:stop])
+
+
+def _inverted_lookup(index: dict, values: list) -> np.ndarray:
+    hits = []
+    for value in values:
+        span = index["postings"].get(value)
+        if span is None:
+            span = index["postings_by_text"].get(str(value))
+        if span is not None:
+            hits.append(index["order"][span[0]:span[1]])
+    if not hits:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(hits))
+
+
+def evaluate_predicate(index: dict, op: str, value=None) -> np.ndarray:
+    """Resolves a single predicate to a sorted array of matching row ids."""
+    if op == "is_null":
+        return index["null_rows"]
+    if op == "not_null":
+        return np.sort(index["order"])
+
+    if op in RANGE_OPS and index["kind"] != "sorted":
+        raise HTTPException(status_code=400, detail="Range filters are only available on number or date columns.")
+
+    if op == "eq":
+        if index["kind"] == "sorted":
+            return _sorted_range(index, value, value)
+        return _inverted_lookup(index, [value])
+    if op == "in":
+        options = value if isinstance(value, list) else [value]
+        if index["kind"] == "sorted":
+            parts = [_sorted_range(index, v, v) for v in options]
+            return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        return _inverted_lookup(index, options)
+    if op == "gt":
+        return _sorted_range(index, low=value, low_inclusive=False)
+    if op == "gte":
+        return _sorted_range(index, low=value)
+    if op == "lt":
+        return _sorted_range(index, high=value, high_inclusive=False)
+    if op == "lte":
+        return _sorted_range(index, high=value)
+    if op == "between":
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            raise HTTPException(status_code=400, detail="'between' expects a [low, high] pair.")
+        return _sorted_range(index, value[0], value[1])
+
+    raise HTTPException(status_code=400, detail=f"Unsupported filter operator '{op}'.")
+
+
+def _validate_filters(columns: list, filters: list):
+    for f in filters:
+        if f.get("column") not in columns:
+            raise HTTPException(status_code=400, detail=f"Column '{f.get('column')}' not found")
+        if f.get("op") not in SUPPORTED_OPS:
+            raise HTTPException(status_code=400, detail=f"Unsupported filter operator '{f.get('op')}'.")
+
+
+def parse_filters(raw: str) -> list:
+    """Decodes the JSON filter list carried in a query string ([{column, op, value}, ...])."""
+    if not raw:
+        return []
+    try:
+        filters = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Filters must be a JSON list of {column, op, value} objects.")
+    if isinstance(filters, dict):
+        filters = [filters]
+    if not isinstance(filters, list) or not all(isinstance(f, dict) for f in filters):
+        raise HTTPException(status_code=400, detail="Filters must be a JSON list of {column, op, value} objects.")
+    return filters
+
+
+def match_rows(filepath: str, columns: list, filters: list, date_columns: tuple = ()) -> np.ndarray:
+    """
+    AND-combines every filter. Returns sorted row ids (None when there are no filters).
+    Columns that already have a secondary index are answered from it; the remaining
+    predicates are pushed down into a row-group scan of the canonical file, which only
+    visits groups that can still match. date_columns (see schema_dates) compare as
+    datetimes even when the canonical file stores them as text.
+    """
+    _validate_filters(columns, filters)
+    if not filters:
+        return None
+
+    indexed = [f for f in filters if has_column_index(filepath, f["column"], date_columns)]
+    pushed = [f for f in filters if not has_column_index(filepath, f["column"], date_columns)]
+
+    result = None
+    if indexed:
+        matches = [
+            evaluate_predicate(get_column_index(filepath, f["column"], date_columns), f["op"], f.get("value"))
+            for f in indexed
+        ]
+        # Intersect smallest-first so every step shrinks the candidate set fastest
+        matches.sort(key=len)
+        result = matches[0]
+        for ids in matches[1:]:
+            if result.size == 0:
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+
+    if pushed and (result is None or result.size > 0):
+        result = scan_rows(filepath, pushed, candidates=result, date_columns=date_columns)
+    return result
+
+
+# ─────────────────────────────────────────────────────
+# PREDICATE PUSHDOWN (row-group statistics, projected scans)
+# ─────────────────────────────────────────────────────
+
+def _range_type(arrow_type) -> bool:
+    """Arrow types that load as numeric / datetime64 columns (the 'sorted' index kind)."""
+    return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_timestamp(arrow_type)
+
+
+def _stat_key(value, is_datetime: bool) -> float:
+    return float(pd.Timestamp(value).value) if is_datetime else float(value)
+
+
+def _excluded_by_statistics(stats, arrow_type, num_rows: int, op: str, value) -> bool:
+    """True when the row group's footer statistics prove no row can satisfy the predicate."""
+    if stats is None:
+        return False
+    if op == "is_null":
+        return stats.null_count == 0
+    if op == "not_null":
+        return stats.null_count == num_rows
+    if not stats.has_min_max:
+        return False
+
+    if _range_type(arrow_type):
+        is_datetime = pa.types.is_timestamp(arrow_type)
+        info = {"is_datetime": is_datetime}
+        low, high = _stat_key(stats.min, is_datetime), _stat_key(stats.max, is_datetime)
+        if op in ("eq", "in"):
+            options = value if isinstance(value, list) else [value]
+            return all(not (low <= _coerce_bound(v, info) <= high) for v in options)
+        if op == "between":
+            if not isinstance(value, (list, tuple)) or len(value) != 2:
+                return False
+            return _coerce_bound(value[0], info) > high or _coerce_bound(value[1], info) < low
+        bound = _coerce_bound(value, info)
+        return {
+            "gt": high <= bound, "gte": high < bound,
+            "lt": low >= bound, "lte": low > bound,
+        }.get(op, False)
+
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        if op in ("eq", "in"):
+            options = value if op == "in" and isinstance(value, list) else [value]
+            return all(not (stats.min <= str(v) <= stats.max) for v in options)
+    return False
+
+
+def _chunk_mask(series: pd.Series, op: str, value) -> np.ndarray:
+    """Same semantics as evaluate_predicate, on one decoded row group."""
+    if op == "is_null":
+        return series.isna().to_numpy()
+    if op == "not_null":
+        return series.notna().to_numpy()
+
+    if _is_range_indexable(series):
+        info = {"is_datetime": pd.api.types.is_datetime64_any_dtype(series)}
+        keys = _to_sortable(series)
+        if op in ("eq", "in"):
+            options = value if op == "in" and isinstance(value, list) else [value]
+            return np.isin(keys, [_coerce_bound(v, info) for v in options])
+        if op == "between":
+            if not isinstance(value, (list, tuple)) or len(value) != 2:
+                raise HTTPException(status_code=400, detail="'between' expects a [low, high] pair.")
+            return (keys >= _coerce_bound(value[0], info)) & (keys <= _coerce_bound(value[1], info))
+        bound = _coerce_bound(value, info)
+        with np.errstate(invalid="ignore"):
+            return {"gt": keys > bound, "gte": keys >= bound, "lt": keys < bound, "lte": keys <= bound}[op]
+
+    if op in RANGE_OPS:
+        raise HTTPException(status_code=400, detail="Range filters are only available on number or date columns.")
+    options = value if op == "in" and isinstance(value, list) else [value]
+    texts = [str(v) for v in options]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Dictionary-encoded: test each distinct value once, then map the codes
+        categories = series.cat.categories
+        hit = np.asarray(categories.isin(options) | categories.astype(str).isin(texts))
+        codes = series.cat.codes.to_numpy()
+        return np.where(codes >= 0, hit[codes], False) if hit.size else np.zeros(len(series), dtype=bool)
+    return (series.notna() & (series.isin(options) | series.astype(str).isin(texts))).to_numpy()
+
+
+@lru_cache(maxsize=SCAN_CACHE_SIZE)
+def _scan(path: str, mtime_ns: int, filters_key: str, candidates_key: bytes, date_columns: tuple) -> np.ndarray:
+    filters = json.loads(filters_key)
+    candidates = np.frombuffer(candidates_key, dtype=np.int64) if candidates_key is not None else None
+    schema = pq.read_schema(path)
+    names = list(dict.fromkeys(f["column"] for f in filters))
+    # Text dates are parsed per row group; their string statistics say nothing about time order
+    text_dates = [c for c in names if c in date_columns and not pa.types.is_timestamp(schema.field(c).type)]
+    text = [
+        c for c in names
+        if c not in text_dates and (pa.types.is_string(schema.field(c).type) or pa.types.is_large_string(schema.field(c).type))
+    ]
+    parquet = pq.ParquetFile(path, read_dictionary=text)
+    meta = parquet.metadata
+    positions = {c: schema.get_field_index(c) for c in names}
+
+    hits = []
+    stop = 0
+    for group in range(meta.num_row_groups):
+        start, stop = stop, stop + meta.row_group(group).num_rows
+        local = None
+        if candidates is not None:
+            local = candidates[np.searchsorted(candidates, start):np.searchsorted(candidates, stop)]
+            if local.size == 0:
+                continue
+        row_group = meta.row_group(group)
+        if any(
+            _excluded_by_statistics(row_group.column(positions[f["column"]]).statistics,
+                                    schema.field(f["column"]).type, row_group.num_rows, f["op"], f.get("value"))
+            for f in filters if f["column"] not in text_dates
+        ):
+            continue
+        frame = parquet.read_row_group(group, columns=names).to_pandas()
+        for col in text_dates:
+            frame[col] = pd.to_datetime(frame[col], errors="coerce")
+        mask = np.ones(len(frame), dtype=bool)
+        for f in filters:
+            mask &= _chunk_mask(frame[f["column"]], f["op"], f.get("value"))
+        ids = start + np.flatnonzero(mask)
+        hits.append(np.intersect1d(ids, local, assume_unique=True) if local is not None else ids)
+
+    result = np.concatenate(hits).astype(np.int64) if hits else np.empty(0, dtype=np.int64)
+    result.setflags(write=False)
+    return result
+
+
+def scan_rows(filepath: str, filters: list, candidates: np.ndarray = None, date_columns: tuple = ()) -> np.ndarray:
+    """
+    Row ids matching every filter, evaluated one row group of the canonical file at a
+    time. Groups whose min/max/null-count statistics rule a predicate out (or that hold
+    none of the candidate rows) are never decoded, only the filtered columns are read,
+    and text columns are read dictionary-encoded so each distinct value is tested once.
+    """
+    path = columnar_store.ensure_canonical(filepath)
+    filters_key = json.dumps(
+        [{"column": f["column"], "op": f["op"], "value": f.get("value")} for f in filters],
+        sort_keys=True, default=str
+    )
+    candidates_key = np.asarray(candidates, dtype=np.int64).tobytes() if candidates is not None else None
+    return _scan(path, os.stat(path).st_mtime_ns, filters_key, candidates_key, tuple(date_columns))
+
+
+# ─────────────────────────────────────────────────────
+# PAGINATED ROW QUERY
+# ─────────────────────────────────────────────────────
+
+def _resolve_dataset_file(dataset_id: int, session: Session) -> Dataset:
+    dataset = session.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset record missing in database.")
+    if not dataset.filepath or not os.path.exists(dataset.filepath):
+        raise HTTPException(status_code=404, detail="The cleaned data matrix is missing from storage. Please re-upload.")
+    return dataset
+
+
+def _resolve_projection(columns: list, all_columns: list) -> list:
+    if not columns:
+        return all_columns
+    missing = [c for c in columns if c not in all_columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Column '{missing[0]}' not found")
+    return columns
+
+
+def _clamp_limit(limit: int) -> int:
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def query_rows(dataset_id: int, filters: list, session: Session, columns: list = None,
+               offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Functionality 2 (Drilldown): Filtered, paginated row access.
+    Predicates are answered from per-column secondary indexes where they exist and
+    pushed down into row-group scans otherwise; either way the matching row ids are
+    cached, so paging through a filtered view never re-masks the full frame.
+    """
+    dataset = _resolve_dataset_file(dataset_id, session)
+    layout = columnar_store.get_layout(dataset.filepath)
+    all_columns = layout["columns"]
+    columns = _resolve_projection(columns, all_columns)
+
+    offset = max(0, int(offset))
+    limit = _clamp_limit(limit)
+
+    schema = _dataset_schema(dataset)
+    matched = match_rows(dataset.filepath, all_columns, filters or [], _date_columns(schema))
+    if matched is None:
+        total = layout["num_rows"]
+        page_ids = np.arange(min(offset, total), min(offset + limit, total))
+    else:
+        total = int(matched.size)
+        page_ids = matched[offset:offset + limit]
+
+    # Pages carry the dataset's dtypes, so dates serialize like every other endpoint's
+    page = dtype_optimizer.apply_schema(columnar_store.read_rows(dataset.filepath, page_ids, columns), schema)
+
+    return {
+        "dataset_id": dataset_id,
+        "total_matches": total,
+        "offset": offset,
+        "limit": limit,
+        "columns": columns,
+        "row_ids": page_ids.tolist(),
+        "rows": page,
+        "has_more": offset + limit < total,
+    }
+
+
+# ─────────────────────────────────────────────────────
+# ROW WINDOW BROWSING (offset + keyset cursors)
+# ─────────────────────────────────────────────────────
+
+def _encode_cursor(payload: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid or expired page cursor.")
+
+
+def _keyset_position(order: dict, cursor: dict) -> int:
+    """Locates the first row strictly after the cursor's (sort key, row id) pair."""
+    after_row = int(cursor["row"])
+    key = cursor.get("key")
+    if key is None:
+        # Cursor sits inside the trailing null block, ordered by row id
+        nulls = order["order"][order["valid_count"]:]
+        return order["valid_count"] + int(np.searchsorted(nulls, after_row, side="right"))
+
+    keys = order["sorted_keys"]
+    tie_start = int(np.searchsorted(keys, key, side="left"))
+    tie_stop = int(np.searchsorted(keys, key, side="right"))
+    ties = order["order"][tie_start:tie_stop]
+    return tie_start + int(np.searchsorted(ties, after_row, side="right"))
+
+
+def browse_rows(dataset_id: int, session: Session, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                columns: list = None, sort: str = None, descending: bool = False, cursor: str = None) -> dict:
+    """
+    Functionality 2 (Row Browser): Windowed access to any depth of a dataset.
+    Reads only the row groups that hold the requested window from the canonical
+    columnar file, so row 5,000,000 costs the same as row 100. Supports column
+    projection, server-side sort and opaque keyset cursors for stable paging.
+    """
+    dataset = _resolve_dataset_file(dataset_id, session)
+    layout = columnar_store.get_layout(dataset.filepath)
+    columns = _resolve_projection(columns, layout["columns"])
+    total = layout["num_rows"]
+    limit = _clamp_limit(limit)
+
+    if sort is not None and sort not in layout["columns"]:
+        raise HTTPException(status_code=400, detail=f"Column '{sort}' not found")
+
+    schema = _dataset_schema(dataset)
+    order = get_sort_order(dataset.filepath, sort, descending, _date_columns(schema)) if sort else None
+
+    if cursor:
+        state = _decode_cursor(cursor)
+        if state.get("sort") != sort or bool(state.get("desc")) != bool(descending):
+            raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order.")
+        start = _keyset_position(order, state) if order else int(state["row"]) + 1
+    else:
+        start = max(0, int(offset))
+
+    start = min(start, total)
+    stop = min(start + limit, total)
+
+    if order:
+        page_ids = order["order"][start:stop]
+        page = columnar_store.read_rows(dataset.filepath, page_ids, columns)
+    else:
+        page_ids = np.arange(start, stop, dtype=np.int64)
+        page = columnar_store.read_window(dataset.filepath, start, stop, columns)
+    page = dtype_optimizer.apply_schema(page, schema)
+
+    next_cursor = None
+    if stop < total and stop > start:
+        last_row = int(page_ids[-1])
+        state = {"sort": sort, "desc": bool(descending), "row": last_row}
+        if order:
+            last_pos = stop - 1
+            state["key"] = float(order["sorted_keys"][last_pos]) if last_pos < order["valid_count"] else None
+        next_cursor = _encode_cursor(state)
+
+    return {
+        "dataset_id": dataset_id,
+        "total_rows": total,
+        "offset": start,
+        "limit": limit,
+        "columns": columns,
+        "sort": sort,
+        "descending": bool(descending),
+        "row_ids": page_ids.tolist(),
+        "rows": page,
+        "next_cursor": next_cursor,
+    }
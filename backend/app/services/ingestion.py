@@ -0,0 +1,637 @@
+import io
+import re
+import csv
+import bz2
+import gzip
+import lzma
+import json
+import codecs
+import zipfile
+import datetime
+import orjson
+import pandas as pd
+import pyarrow as pa
+from openpyxl import load_workbook
+from lxml import etree
+from app.core.serialization import frame_to_arrow
+
+# Optional faster Excel engine (Rust calamine bindings); openpyxl streaming otherwise
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # pragma: no cover - depends on the deployment
+    CalamineWorkbook = None
+
+# Rows per batch handed to dtype inference / Arrow conversion
+INGEST_BATCH_ROWS = 50000
+
+
+# ─────────────────────────────────────────────────────
+# BATCH PIPELINE (row batches → Arrow → one table)
+# ─────────────────────────────────────────────────────
+
+def _dedupe_header(header) -> list:
+    """Blank and repeated header cells named the way pandas names them."""
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _rows_to_frame(rows: list, columns: list) -> pd.DataFrame:
+    """
+    Builds one batch and infers its dtypes (numbers, datetimes, booleans stay typed).
+    Mirrors read_excel: empty cells are missing and whole-number float columns are ints.
+    """
+    width = len(columns)
+    rows = [tuple(None if v == "" else v for v in row[:width]) + (None,) * (width - len(row)) for row in rows]
+    frame = pd.DataFrame.from_records(rows, columns=columns).infer_objects()
+    for col in frame.columns:
+        values = frame[col]
+        if values.dtype.kind == "f" and len(values) and values.notna().all() and (values == values.round()).all():
+            frame[col] = values.astype("int64")
+        elif values.dtype == object:
+            # Date cells at midnight come back as date, others as datetime
+            present = values.dropna()
+            if len(present) and present.map(lambda v: isinstance(v, (datetime.date, datetime.datetime))).all():
+                frame[col] = pd.to_datetime(values)
+    return frame
+
+
+def _unify_tables(tables: list) -> pa.Table:
+    """
+    Concatenates per-batch tables whose inferred types may differ (e.g. a column that is
+    integer in one batch and float or text in another). Numeric widening is done by
+    Arrow; columns with irreconcilable types across batches fall back to text.
+    """
+    if len(tables) == 1:
+        return tables[0]
+    try:
+        return pa.concat_tables(tables, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError, NotImplementedError):
+        pass
+
+    names = tables[0].column_names
+    conflicting = set()
+    for name in names:
+        types = {t.schema.field(name).type for t in tables if not pa.types.is_null(t.schema.field(name).type)}
+        if len(types) > 1 and not all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+            conflicting.add(name)
+
+    def as_text(table: pa.Table) -> pa.Table:
+        for name in conflicting:
+            idx = table.schema.get_field_index(name)
+            column = table.column(name)
+            if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+                continue
+            text = pa.chunked_array(
+                [pa.array([None if v is None else str(v) for v in chunk.to_pylist()], type=pa.string()) for chunk in column.chunks],
+                type=pa.string()
+            )
+            table = table.set_column(idx, name, text)
+        return table
+
+    return pa.concat_tables([as_text(t) for t in tables], promote_options="permissive")
+
+
+def batches_to_table(batches) -> pa.Table:
+    """Converts DataFrame batches to Arrow as they arrive and joins them into one table."""
+    tables = [frame_to_arrow(batch) for batch in batches]
+    if not tables:
+        return pa.table({})
+    return _unify_tables(tables)
+
+
+def _row_batches(rows, batch_rows: int):
+    """Splits a header-first row iterator into inferred DataFrame batches."""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _dedupe_header(header)
+    batch = []
+    emitted = False
+    for row in rows:
+        if row is None or all(v is None or v == "" for v in row):
+            # Fully blank sheet rows (openpyxl pads used ranges with them)
+            continue
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield _rows_to_frame(batch, columns)
+            emitted = True
+            batch = []
+    if batch or not emitted:
+        yield _rows_to_frame(batch, columns)
+
+
+# ─────────────────────────────────────────────────────
+# EXCEL
+# ─────────────────────────────────────────────────────
+
+def list_sheets(path: str) -> list:
+    """Sheet names in workbook order (reads only the workbook index)."""
+    if CalamineWorkbook is not None:
+        return list(CalamineWorkbook.from_path(path).sheet_names)
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _resolve_sheet(names: list, sheet) -> str:
+    if sheet is None or sheet == "":
+        return names[0]
+    if isinstance(sheet, int) or (isinstance(sheet, str) and sheet.isdigit() and sheet not in names):
+        index = int(sheet)
+        if index >= len(names):
+            raise ValueError(f"Workbook has {len(names)} sheet(s); sheet index {index} does not exist.")
+        return names[index]
+    if sheet not in names:
+        raise ValueError(f"Sheet '{sheet}' not found. Available sheets: {', '.join(names)}")
+    return sheet
+
+
+def iter_excel_batches(path: str, sheet=None, batch_rows: int = INGEST_BATCH_ROWS):
+    """
+    Streams one worksheet as typed DataFrame batches. Uses calamine when installed,
+    otherwise openpyxl in read-only mode (rows are parsed lazily from the sheet XML,
+    so the cell objects of the whole workbook are never materialized).
+    """
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_path(path)
+        name = _resolve_sheet(list(workbook.sheet_names), sheet)
+        rows = workbook.get_sheet_by_name(name).iter_rows()
+        yield from _row_batches(rows, batch_rows)
+        return
+
+    if path.lower().endswith(".xls"):
+        # openpyxl cannot read legacy BIFF workbooks
+        frame = pd.read_excel(path, sheet_name=sheet if sheet not in (None, "") else 0)
+        yield frame
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        name = _resolve_sheet(list(workbook.sheetnames), sheet)
+        rows = workbook[name].iter_rows(values_only=True)
+        yield from _row_batches(rows, batch_rows)
+    finally:
+        workbook.close()
+
+
+def read_excel_table(path: str, sheet=None) -> pa.Table:
+    """One worksheet as an Arrow table (the canonical columnar representation)."""
+    return batches_to_table(iter_excel_batches(path, sheet))
+
+
+def read_excel(path: str, sheet=None) -> pd.DataFrame:
+    """One worksheet as a DataFrame, built batch by batch rather than cell by cell."""
+    return read_excel_table(path, sheet).to_pandas()
+
+
+# ─────────────────────────────────────────────────────
+# TEXT VALUE INFERENCE (XML / JSON batches)
+# ─────────────────────────────────────────────────────
+
+_BOOL_TEXT = {"true": True, "false": False}
+
+
+def _is_default_date_column(name) -> bool:
+    """pandas' read_json heuristic for columns it converts to datetimes by name."""
+    if not isinstance(name, str):
+        return False
+    name = name.lower()
+    return name.endswith("_at") or name.endswith("_time") or name.startswith("timestamp") or name in ("modified", "date", "datetime")
+
+
+def _infer_text_columns(frame: pd.DataFrame, date_names: bool = False) -> pd.DataFrame:
+    """Types text columns the way the pandas readers do: numbers, booleans, (optionally) named dates."""
+    for col in frame.columns:
+        values = frame[col]
+        if values.dtype != object:
+            continue
+        present = values.dropna()
+        if present.empty:
+            continue
+        if date_names and _is_default_date_column(col):
+            try:
+                frame[col] = pd.to_datetime(values)
+                continue
+            except (ValueError, TypeError, OverflowError):
+                pass
+        if not present.map(lambda v: isinstance(v, str)).all():
+            continue
+        try:
+            frame[col] = pd.to_numeric(values)
+            continue
+        except (ValueError, TypeError):
+            pass
+        lowered = present.str.strip().str.lower()
+        if lowered.isin(_BOOL_TEXT.keys()).all() and len(present) == len(values):
+            frame[col] = lowered.map(_BOOL_TEXT).astype(bool)
+    return frame
+
+
+def _record_batches(records, batch_rows: int, date_names: bool = False):
+    """Groups an iterator of row dicts into typed DataFrame batches with a stable column order."""
+    columns = {}
+    batch = []
+    emitted = False
+    for record in records:
+        for key in record:
+            columns.setdefault(key, None)
+        batch.append(record)
+        if len(batch) >= batch_rows:
+            yield _infer_text_columns(pd.DataFrame.from_records(batch, columns=list(columns)), date_names)
+            emitted = True
+            batch = []
+    if batch or not emitted:
+        yield _infer_text_columns(pd.DataFrame.from_records(batch, columns=list(columns)), date_names)
+
+
+def _align_columns(tables: list) -> list:
+    """Later batches may introduce new keys; give every batch the full column order."""
+    order = []
+    for table in tables:
+        for name in table.column_names:
+            if name not in order:
+                order.append(name)
+    aligned = []
+    for table in tables:
+        for name in order:
+            if name not in table.column_names:
+                table = table.append_column(name, pa.nulls(table.num_rows))
+        aligned.append(table.select(order))
+    return aligned
+
+
+def records_to_table(batches) -> pa.Table:
+    tables = [frame_to_arrow(batch) for batch in batches]
+    if not tables:
+        return pa.table({})
+    return _unify_tables(_align_columns(tables))
+
+
+# ─────────────────────────────────────────────────────
+# XML (iterparse with clearing: one row element resident at a time)
+# ─────────────────────────────────────────────────────
+
+def _local_name(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else str(tag)
+
+
+def iter_xml_records(path: str, compression: str = None):
+    """
+    Yields one dict per child of the document root, like pd.read_xml's default
+    xpath ('./*'): row attributes plus the text of each child element.
+    Finished rows are cleared and detached so memory stays bounded.
+    """
+    depth = 0
+    with open_binary(path, compression) as handle:
+        for event, elem in etree.iterparse(handle, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            record = {_local_name(k): v for k, v in elem.attrib.items()}
+            children = list(elem)
+            if children:
+                for child in children:
+                    record[_local_name(child.tag)] = child.text.strip() if child.text and child.text.strip() else None
+            elif elem.text and elem.text.strip():
+                record[_local_name(elem.tag)] = elem.text.strip()
+            yield record
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+def iter_xml_batches(path: str, batch_rows: int = INGEST_BATCH_ROWS, compression: str = None):
+    return _record_batches(iter_xml_records(path, compression), batch_rows)
+
+
+def read_xml(path: str, info: dict = None) -> pd.DataFrame:
+    """XML rows parsed in one streaming pass and assembled batch by batch."""
+    info = info or sniff(path, "xml")
+    return records_to_table(iter_xml_batches(path, compression=info["compression"])).to_pandas()
+
+
+# ─────────────────────────────────────────────────────
+# JSON (record arrays and NDJSON detected from a prefix sniff)
+# ─────────────────────────────────────────────────────
+
+JSON_READ_CHARS = 1024 * 1024
+
+
+def _json_layout(head: str) -> str:
+    """
+    'records' for a top-level array, 'ndjson' for one object per line, 'object' for a
+    single top-level object (column/index orientations). Decided from the first bytes.
+    """
+    head = head.lstrip()
+    if head.startswith("["):
+        return "records"
+    if head.startswith("{"):
+        first, _, rest = head.partition("\n")
+        try:
+            first_value = json.loads(first)
+        except ValueError:
+            return "object"
+        if rest.strip() == "":
+            # A lone one-line object is a column/index mapping when every value is nested
+            values = list(first_value.values())
+            nested = values and all(isinstance(v, (dict, list)) for v in values)
+            return "object" if nested else "ndjson"
+        # A complete object on the first line followed by another line-object is NDJSON
+        return "ndjson" if rest.lstrip().startswith("{") else "object"
+    return "ndjson"
+
+
+_JSON_SKIP = re.compile(r"[\s,]*")
+
+
+def iter_json_array(path: str, chunk_chars: int = JSON_READ_CHARS, encoding: str = "utf-8-sig", compression: str = None):
+    """Incrementally decodes the elements of a top-level JSON array without loading the file."""
+    decoder = json.JSONDecoder()
+    with open_text(path, encoding, compression) as handle:
+        buffer = handle.read(chunk_chars).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError("Expected a JSON array")
+        pos = 1
+        eof = False
+        while True:
+            pos = _JSON_SKIP.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos >= len(buffer):
+                    raise ValueError("buffer drained")
+                value, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError("Malformed or unterminated JSON array")
+                # Element straddles the buffer boundary: keep the tail and read on
+                more = handle.read(chunk_chars)
+                eof = not more
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield value
+            pos = end
+
+
+def iter_ndjson(path: str, encoding: str = "utf-8-sig", compression: str = None):
+    with open_text(path, encoding, compression) as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                yield orjson.loads(line)
+
+
+def _as_records(values):
+    """
+    Row dicts from array elements: objects as they are, arrays as positional fields
+    (column_1..n, as headerless CSVs are named; pandas' orient='values'), scalars in column 0.
+    """
+    for value in values:
+        if isinstance(value, dict):
+            yield value
+        elif isinstance(value, list):
+            yield {f"column_{i + 1}": v for i, v in enumerate(value)}
+        else:
+            yield {0: value}
+
+
+def iter_json_batches(path: str, batch_rows: int = INGEST_BATCH_ROWS, info: dict = None):
+    info = info or sniff(path, "json")
+    if info["json_layout"] == "records":
+        values = iter_json_array(path, encoding=info["encoding"], compression=info["compression"])
+    else:
+        values = iter_ndjson(path, encoding=info["encoding"], compression=info["compression"])
+    return _record_batches(_as_records(values), batch_rows, date_names=True)
+
+
+def read_json(path: str, info: dict = None) -> pd.DataFrame:
+    """
+    One parse per file: arrays and NDJSON are streamed in batches; a single top-level
+    object is decoded once and oriented by column, or by index when values are scalars
+    per row key (what the old read_json → orient='index' retry chain produced).
+    """
+    info = info or sniff(path, "json")
+    if info["json_layout"] != "object":
+        return records_to_table(iter_json_batches(path, info=info)).to_pandas()
+    with open_text(path, info["encoding"], info["compression"]) as handle:
+        payload = json.load(handle)
+    try:
+        frame = pd.DataFrame(payload)
+    except ValueError:
+        frame = pd.DataFrame.from_dict(payload, orient="index")
+    return _infer_text_columns(frame, date_names=True)
+
+
+# ─────────────────────────────────────────────────────
+# FORMAT & DIALECT SNIFFING (decided from the first bytes, then one parse)
+# ─────────────────────────────────────────────────────
+
+SNIFF_BYTES = 64 * 1024
+SNIFF_LINES = 50
+DELIMITER_CANDIDATES = ",;\t|"
+
+_COMPRESSION_MAGIC = [
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+]
+_XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+def open_binary(path: str, compression: str = None):
+    """Opens a (possibly compressed) source file as a binary stream of its content."""
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "bz2":
+        return bz2.open(path, "rb")
+    if compression == "xz":
+        return lzma.open(path, "rb")
+    if compression == "zstd":
+        import zstandard
+        return zstandard.open(path, "rb")
+    if compression == "zip":
+        archive = zipfile.ZipFile(path)
+        members = [m for m in archive.infolist() if not m.is_dir()]
+        if len(members) != 1:
+            raise ValueError("ZIP uploads must contain exactly one data file.")
+        return archive.open(members[0])
+    return open(path, "rb")
+
+
+def open_text(path: str, encoding: str = "utf-8-sig", compression: str = None):
+    return io.TextIOWrapper(open_binary(path, compression), encoding=encoding)
+
+
+def _detect_encoding(head: bytes) -> str:
+    """
+    BOMs first; otherwise UTF-8 if the sniffed head decodes, else Latin-1 (never fails).
+    A file that turns out not to be UTF-8 further in is re-read as Latin-1 by load_frame.
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    try:
+        # Not final: the head may end inside a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(head)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin1"
+
+
+def _sniff_dialect(text: str, default_sep: str) -> dict:
+    """Delimiter, quote character and header presence from the first lines."""
+    lines = text.splitlines()
+    if len(lines) > 1 and not text.endswith(("\n", "\r")):
+        lines = lines[:-1]  # the last line of the sample may be cut off
+    lines = lines[:SNIFF_LINES]
+    sample = "\n".join(lines)
+    delimiter, quotechar = default_sep, '"'
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=DELIMITER_CANDIDATES)
+        widths = {len(row) for row in csv.reader(lines, delimiter=dialect.delimiter, quotechar=dialect.quotechar)}
+        # Only trust a delimiter that splits every sampled line into the same number of fields
+        if len(widths) == 1 and widths.pop() > 1:
+            delimiter, quotechar = dialect.delimiter, dialect.quotechar
+    except csv.Error:
+        pass
+
+    rows = list(csv.reader(lines, delimiter=delimiter, quotechar=quotechar))
+    return {"delimiter": delimiter, "quotechar": quotechar, "header": _has_header(rows)}
+
+
+def _field_type(field: str):
+    field = field.strip()
+    if field == "":
+        return None
+    for kind, parse in (("int", int), ("float", float)):
+        try:
+            parse(field)
+            return kind
+        except ValueError:
+            pass
+    return "text"
+
+
+def _has_header(rows: list) -> bool:
+    """
+    csv.Sniffer.has_header's vote: a first row of numbers is data only when every
+    column whose body values share one type gives the first row that same type
+    (so '2019,2020,2021' over decimal or text columns stays a header).
+    """
+    if not rows or not all(_field_type(field) in ("int", "float") for field in rows[0]):
+        return True
+    matches = []
+    for position, field in enumerate(rows[0]):
+        body = {_field_type(row[position]) for row in rows[1:] if position < len(row)} - {None}
+        if len(body) == 1:
+            matches.append(body.pop() == _field_type(field))
+    # No column to compare against (single row, mixed bodies): numbers alone mean data
+    return not all(matches)
+
+
+def sniff(path: str, file_ext: str = None) -> dict:
+    """
+    Inspects the first few KB of a file and returns explicit read parameters:
+    format, compression, encoding, delimiter, quotechar, header and json_layout.
+    Binary signatures win over the extension; .csv/.tsv are always read as delimited text.
+    """
+    file_ext = (file_ext or path.rsplit('.', 1)[-1]).lower()
+    info = {"format": None, "compression": None, "encoding": "utf-8", "delimiter": None,
+            "quotechar": '"', "header": True, "json_layout": None}
+
+    with open(path, "rb") as handle:
+        magic = handle.read(8)
+    if magic.startswith(b"PAR1"):
+        info["format"] = "parquet"
+        return info
+    if magic.startswith(_XLS_MAGIC):
+        info["format"] = "xls"
+        return info
+    if magic.startswith(b"PK\x03\x04"):
+        with zipfile.ZipFile(path) as archive:
+            if any(name.startswith("xl/") for name in archive.namelist()):
+                info["format"] = "xlsx"
+                return info
+        info["compression"] = "zip"
+    for prefix, name in _COMPRESSION_MAGIC:
+        if magic.startswith(prefix):
+            info["compression"] = name
+
+    with open_binary(path, info["compression"]) as handle:
+        head = handle.read(SNIFF_BYTES)
+    info["encoding"] = _detect_encoding(head)
+    text = head.decode(info["encoding"], errors="ignore").lstrip("\ufeff")
+    stripped = text.lstrip()
+
+    if file_ext in ("csv", "tsv"):
+        # Declared delimited text stays delimited even if a cell happens to start with '<' or '['
+        info["format"] = file_ext
+        info.update(_sniff_dialect(text, "\t" if file_ext == "tsv" else ","))
+    elif stripped.startswith("<"):
+        info["format"] = "xml"
+    elif stripped.startswith("[") or stripped.startswith("{"):
+        info["format"] = "json"
+        info["json_layout"] = _json_layout(stripped)
+    else:
+        info["format"] = "csv"
+        info.update(_sniff_dialect(text, ","))
+    return info
+
+
+def load_frame(path: str, file_ext: str = None, sheet=None) -> pd.DataFrame:
+    """
+    Single entry point for reading a data file: sniff once, then one parse with
+    explicit parameters (no retry-on-error chains).
+    """
+    info = sniff(path, file_ext)
+    try:
+        return _parse(path, info, sheet)
+    except UnicodeDecodeError:
+        if info["encoding"] != "utf-8":
+            raise
+        # The sniffed head was UTF-8 but the rest is not: Latin-1 decodes any byte
+        return _parse(path, {**info, "encoding": "latin1"}, sheet)
+
+
+def _parse(path: str, info: dict, sheet=None) -> pd.DataFrame:
+    fmt = info["format"]
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt in ("xlsx", "xls"):
+        return read_excel(path, sheet)
+    if fmt == "json":
+        return read_json(path, info)
+    if fmt == "xml":
+        return read_xml(path, info)
+
+    frame = pd.read_csv(
+        path,
+        sep=info["delimiter"],
+        quotechar=info["quotechar"],
+        encoding=info["encoding"],
+        header=0 if info["header"] else None,
+        compression=info["compression"]
+    )
+    if not info["header"]:
+        frame.columns = [f"column_{i + 1}" for i in range(len(frame.columns))]
+    return frame
@@ -3,7 +3,7 @@ import os
 import json
 from openai import OpenAI  # Use OpenAI SDK for Groq compatibility
 from sqlmodel import Session
-from app.services import eda_service
+from app.services import eda_service, artifact_cache
 from app.models.dataset import Dataset
 
 # backend/app/services/insight_service.py
@@ -71,11 +71,20 @@ def generate_insights(dataset_id: int, session: Session):
       "system_limits": [],
       "summary": ""
     }
+    Served from the artifact cache while the dataset content and record are unchanged.
     """
-    # 1. FETCH METADATA (Source of Truth)
     dataset = session.get(Dataset, dataset_id)
     if not dataset:
         return {}
+    return artifact_cache.get_or_compute(
+        session, dataset, "insights", lambda: _compute_insights(dataset, session),
+        depends_on=artifact_cache.record_state(dataset)
+    )
+
+def _compute_insights(dataset: Dataset, session: Session):
+    dataset_id = dataset.id
+
+    # 1. FETCH METADATA (Source of Truth)
     
     ingestion_meta = json.loads(dataset.ingestion_insights) if dataset.ingestion_insights else {}
     score_breakdown = ingestion_meta.get("score_breakdown", [])
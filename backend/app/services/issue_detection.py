@@ -3,7 +3,7 @@ import numpy as np
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.models.dataset import Dataset
-from app.services.eda_service import get_dataframe
+from app.services import out_of_core, type_inference, profile_service
 
 def calculate_health_score(missing_ratio: float, duplicate_ratio: float, outlier_ratio: float, type_error_ratio: float) -> int:
     score = 100.0
@@ -13,123 +13,185 @@ def calculate_health_score(missing_ratio: float, duplicate_ratio: float, outlier
     score -= type_error_ratio * 20
     return max(0, min(100, int(round(score))))
 
+def _missing_issue(col, m_count: int, total_rows: int, affected_indices: list) -> dict:
+    missing_pct = round((m_count / total_rows) * 100, 2)
+    return {
+        "column": col,
+        "issue": "Missing Values",
+        "count": m_count,
+        "ratio": m_count / total_rows,
+        "missing_percentage": missing_pct,
+        "affected_row_indices": affected_indices,
+        "severity": "High" if (m_count / total_rows) > 0.1 else "Medium",
+        "details": f"{m_count} empty cell{'s' if m_count != 1 else ''} found in column '{col}' ({missing_pct}% of rows)"
+    }
+
+
+def _duplicate_issue(dup_count: int, total_rows: int, dup_indices: list, sample_rows: list) -> dict:
+    return {
+        "column": "Entire Dataset",
+        "issue": "Duplicate Rows",
+        "count": dup_count,
+        "ratio": dup_count / total_rows,
+        "duplicate_row_indices": dup_indices,
+        "sample_rows": sample_rows,
+        "severity": "Low",
+        "details": f"{dup_count} row{'s are' if dup_count != 1 else ' is'} an exact copy of another row"
+    }
+
+
+def _outlier_issue(col, outlier_count: int, total_rows: int, affected_indices: list) -> dict:
+    return {
+        "column": col,
+        "issue": "Outliers",
+        "count": outlier_count,
+        "ratio": outlier_count / total_rows,
+        "affected_row_indices": affected_indices,
+        "severity": "Medium"
+    }
+
+
+def _skew_issue(col, skew_val: float, total_rows: int) -> dict:
+    return {
+        "column": col,
+        "issue": "Skewed Distribution",
+        "count": total_rows,
+        "ratio": 1.0,
+        "severity": "Low",
+        "details": f"Skewness: {skew_val:.2f}"
+    }
+
+
+def _type_issue(col, verdict: dict, affected_indices: list) -> dict:
+    return {
+        "column": col,
+        "issue": "Incorrect Data Type",
+        "count": verdict["bad_count"],
+        "ratio": verdict["bad_count"] / verdict["present"] if verdict["present"] else 0.0,
+        "expected_type": verdict["expected_type"].lower(),
+        "actual_type": verdict["dtype"],
+        "affected_row_indices": affected_indices,
+        "severity": "High",
+        "details": type_inference.DESCRIPTIONS[verdict["kind"]]
+    }
+
+
+def _health_score(total_rows: int, total_cols: int, total_missing: int, dup_count: int, total_outliers: int, wrong_type_cols: int) -> int:
+    total_cells = total_rows * total_cols
+    missing_ratio = total_missing / total_cells if total_cells > 0 else 0
+    duplicate_ratio = dup_count / total_rows if total_rows > 0 else 0
+    outlier_ratio = total_outliers / total_cells if total_cells > 0 else 0
+    type_error_ratio = wrong_type_cols / total_cols if total_cols > 0 else 0
+    return calculate_health_score(missing_ratio, duplicate_ratio, outlier_ratio, type_error_ratio)
+
+
 def detect_issues(dataset_id: int, session: Session):
     dataset = session.get(Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
-        
-    df = get_dataframe(dataset_id, session)
+
+    if out_of_core.enabled_for(dataset):
+        return _detect_issues_out_of_core(dataset)
+
+    # Every check reads the version's column profile (cached, or derived from the parent
+    # version's profile when a repair created it)
+    profile = profile_service.get_profile(session, dataset)
     issues = []
     
-    total_rows = len(df)
+    total_rows = profile["row_count"]
     if total_rows == 0:
         return {"issues": issues, "health_score": 0}
-        
-    total_cells = total_rows * len(df.columns)
+
     total_missing = 0
     total_outliers = 0
     wrong_type_cols = 0
     
     # 1. Missing Values — with affected row indices and percentage
-    for col in df.columns:
-        m_count = int(df[col].isnull().sum())
+    for entry in profile["columns"]:
+        m_count = entry["missing"]
         if m_count > 0:
-            # Get first 20 row indices where this column is null
-            affected_indices = df[df[col].isnull()].index.tolist()[:20]
-            missing_pct = round((m_count / total_rows) * 100, 2)
-            
-            issues.append({
-                "column": col,
-                "issue": "Missing Values",
-                "count": m_count,
-                "ratio": m_count / total_rows,
-                "missing_percentage": missing_pct,
-                "affected_row_indices": affected_indices,
-                "severity": "High" if (m_count / total_rows) > 0.1 else "Medium",
-                "details": f"{m_count} empty cell{'s' if m_count != 1 else ''} found in column '{col}' ({missing_pct}% of rows)"
-            })
+            # First 20 row indices where this column is null
+            issues.append(_missing_issue(entry["column"], m_count, total_rows, entry["missing_rows"]))
             total_missing += m_count
 
     # 2. Duplicate Rows — with sample rows and indices
-    dup_count = int(df.duplicated().sum())
+    duplicates = profile["duplicates"]
+    dup_count = duplicates["count"]
     if dup_count > 0:
-        dup_mask = df.duplicated(keep=False)
-        dup_indices = df[df.duplicated()].index.tolist()[:20]
-        sample_rows = df[df.duplicated()].head(5).replace({np.nan: None}).to_dict(orient="records")
-        
-        issues.append({
-            "column": "Entire Dataset",
-            "issue": "Duplicate Rows",
-            "count": dup_count,
-            "ratio": dup_count / total_rows,
-            "duplicate_row_indices": dup_indices,
-            "sample_rows": sample_rows,
-            "severity": "Low",
-            "details": f"{dup_count} row{'s are' if dup_count != 1 else ' is'} an exact copy of another row"
-        })
-         
-    duplicate_ratio = dup_count / total_rows if total_rows > 0 else 0
+        issues.append(_duplicate_issue(dup_count, total_rows, duplicates["rows"], duplicates["sample_rows"]))
          
     # 3. Outliers (IQR Method) & 4. Skewed distributions & 5. Data Type issues
-    for col in df.columns:
-        if pd.api.types.is_numeric_dtype(df[col]):
-            # Outliers
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            outlier_mask = (df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR)
-            outlier_count = int(outlier_mask.sum())
+    for entry in profile["columns"]:
+        col = entry["column"]
+        if entry["numeric"]:
+            outlier_count = entry["outliers"]
             if outlier_count > 0:
-                affected_indices = df[outlier_mask].index.tolist()[:20]
-                issues.append({
-                    "column": col,
-                    "issue": "Outliers",
-                    "count": outlier_count,
-                    "ratio": outlier_count / total_rows,
-                    "affected_row_indices": affected_indices,
-                    "severity": "Medium"
-                })
+                issues.append(_outlier_issue(col, outlier_count, total_rows, entry["outlier_rows"]))
                 total_outliers += outlier_count
                 
             # Distribution skew
-            skew_val = df[col].skew()
-            if abs(skew_val) > 1:
-                issues.append({
-                    "column": col,
-                    "issue": "Skewed Distribution",
-                    "count": total_rows,
-                    "ratio": 1.0,
-                    "severity": "Low",
-                    "details": f"Skewness: {skew_val:.2f}"
-                })
-        else:
-            # Type issues: numeric stored as object
-            numeric_test = pd.to_numeric(df[col], errors='coerce')
-            if numeric_test.notnull().mean() > 0.8:
-                non_numeric_mask = numeric_test.isnull() & df[col].notnull()
-                affected_indices = df[non_numeric_mask].index.tolist()[:20]
-                issues.append({
-                    "column": col,
-                    "issue": "Incorrect Data Type",
-                    "count": int(non_numeric_mask.sum()),
-                    "ratio": 1.0,
-                    "expected_type": "numeric",
-                    "actual_type": str(df[col].dtype),
-                    "affected_row_indices": affected_indices,
-                    "severity": "High",
-                    "details": "Numeric data stored as text"
-                })
-                wrong_type_cols += 1
+            skew_val = entry["skew"]
+            if skew_val is not None and abs(skew_val) > 1:
+                issues.append(_skew_issue(col, skew_val, total_rows))
+        elif entry.get("type") and type_inference.mismatches([entry["type"]]):
+            # Type issues: values of another kind stored as text
+            verdict = entry["type"]
+            issues.append(_type_issue(col, verdict, verdict["bad_rows"]))
+            wrong_type_cols += 1
                  
-    # Calculate Ratios
-    missing_ratio = total_missing / total_cells if total_cells > 0 else 0
-    outlier_ratio = total_outliers / total_cells if total_cells > 0 else 0
-    type_error_ratio = wrong_type_cols / len(df.columns) if len(df.columns) > 0 else 0
-    
-    score = calculate_health_score(missing_ratio, duplicate_ratio, outlier_ratio, type_error_ratio)
+    score = _health_score(total_rows, profile["column_count"], total_missing, dup_count, total_outliers, wrong_type_cols)
     
     return {
         "dataset_id": dataset_id,
         "health_score": score,
         "issues": issues
     }
+
+
+def _detect_issues_out_of_core(dataset: Dataset) -> dict:
+    """
+    Same report from streamed partial aggregates. Outlier counts are approximate when a
+    column's quartiles came from a sample rather than every value.
+    """
+    profile = out_of_core.issue_profile(dataset)
+    total_rows = profile["total_rows"]
+    if total_rows == 0:
+        return {"issues": [], "health_score": 0}
+
+    issues = []
+    total_missing = sum(profile["missing"].values())
+    for col in profile["columns"]:
+        m_count = profile["missing"][col]
+        if m_count > 0:
+            issues.append(_missing_issue(col, m_count, total_rows, profile["missing_rows"][col]))
+
+    duplicates = out_of_core.duplicate_profile(dataset)
+    dup_count = duplicates["count"]
+    if dup_count > 0:
+        sample = out_of_core.read_rows(dataset, duplicates["rows"][:5])
+        sample_rows = sample.replace({np.nan: None}).to_dict(orient="records")
+        issues.append(_duplicate_issue(dup_count, total_rows, duplicates["rows"], sample_rows))
+
+    total_outliers = 0
+    wrong_type_cols = 0
+    for col in profile["columns"]:
+        if col in profile["skew"]:
+            outlier_count = profile["outliers"][col]
+            if outlier_count > 0:
+                issues.append(_outlier_issue(col, outlier_count, total_rows, profile["outlier_rows"][col]))
+                total_outliers += outlier_count
+            skew_val = profile["skew"][col]
+            if abs(skew_val) > 1:
+                issues.append(_skew_issue(col, skew_val, total_rows))
+        elif col in profile["type_verdicts"] and type_inference.mismatches([profile["type_verdicts"][col]]):
+            verdict = profile["type_verdicts"][col]
+            issues.append(_type_issue(col, verdict, verdict["bad_rows"]))
+            wrong_type_cols += 1
+
+    return {
+        "dataset_id": dataset.id,
+        "health_score": _health_score(total_rows, len(profile["columns"]), total_missing, dup_count, total_outliers, wrong_type_cols),
+        "issues": issues,
+        "execution_mode": "out_of_core",
+        "approximate": not all(profile["quartiles_exact"].values()),
+    }
@@ -0,0 +1,615 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.services import columnar_store, dtype_optimizer, index_service, type_inference
+
+# Datasets whose stored file is at least this large are analysed one row group of the
+# canonical Parquet file at a time, merging partial aggregates, instead of being loaded
+# whole. 0 disables the mode.
+OUT_OF_CORE_THRESHOLD_BYTES = int(float(os.getenv("AVIS_OUT_OF_CORE_THRESHOLD_MB", "512")) * 1024 * 1024)
+
+# Quantiles come from a deterministic bottom-k sample per column: exact while a column
+# has at most this many values, approximate (and flagged) beyond it.
+QUANTILE_SAMPLE_SIZE = 200_000
+# Value counters are pruned to their heaviest entries past this many distinct values.
+VALUE_COUNTER_LIMIT = 100_000
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def enabled_for(dataset) -> bool:
+    return (
+        OUT_OF_CORE_THRESHOLD_BYTES > 0
+        and dataset is not None
+        and (dataset.file_size_bytes or 0) >= OUT_OF_CORE_THRESHOLD_BYTES
+    )
+
+
+# ─────────────────────────────────────────────────────
+# ROW-GROUP ITERATION
+# ─────────────────────────────────────────────────────
+
+def _parquet(dataset) -> pq.ParquetFile:
+    return pq.ParquetFile(columnar_store.ensure_canonical(dataset.filepath))
+
+
+def resolve_schema(dataset, parquet: pq.ParquetFile = None) -> dict:
+    """The stored dtype schema; older datasets get one inferred from the first row group."""
+    if dataset.column_schema:
+        return json.loads(dataset.column_schema)
+    parquet = parquet or _parquet(dataset)
+    if parquet.num_row_groups == 0:
+        return {}
+    return dtype_optimizer.infer_schema(parquet.read_row_group(0).to_pandas())
+
+
+def column_names(dataset) -> list:
+    return list(_parquet(dataset).schema_arrow.names)
+
+
+def iter_chunks(dataset, columns: list = None, raw: bool = False, filters: list = None):
+    """
+    Yields one row group at a time as a frame indexed by global row position, with the
+    dataset's compact dtypes applied (raw=True keeps the stored dtypes, e.g. for rewriting).
+    With filters only matching rows are yielded and row groups without any are skipped.
+    """
+    parquet = _parquet(dataset)
+    schema = None if raw else resolve_schema(dataset, parquet)
+    matched = None
+    if filters:
+        dates = index_service.schema_dates(dataset)
+        matched = index_service.match_rows(dataset.filepath, list(parquet.schema_arrow.names), filters, dates)
+    start = 0
+    for group in range(parquet.num_row_groups):
+        stop = start + parquet.metadata.row_group(group).num_rows
+        if matched is not None:
+            local = matched[np.searchsorted(matched, start):np.searchsorted(matched, stop)]
+            if local.size == 0:
+                start = stop
+                continue
+        frame = parquet.read_row_group(group, columns=columns).to_pandas()
+        frame.index = pd.RangeIndex(start, stop)
+        if matched is not None:
+            frame = frame.loc[local]
+        start = stop
+        yield dtype_optimizer.apply_schema(frame, schema) if schema else frame
+
+
+def empty_frame(dataset, columns: list = None) -> pd.DataFrame:
+    """Zero-row frame with the analysed dtypes (for dtype checks without reading data)."""
+    parquet = _parquet(dataset)
+    table = parquet.schema_arrow.empty_table()
+    frame = (table.select(columns) if columns else table).to_pandas()
+    return dtype_optimizer.apply_schema(frame, resolve_schema(dataset, parquet))
+
+
+# ─────────────────────────────────────────────────────
+# MERGEABLE PARTIAL AGGREGATES
+# ─────────────────────────────────────────────────────
+
+class Moments:
+    """Count, mean, min/max and central moments (M2, M3), merged pairwise across chunks."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        other = Moments()
+        other.n = values.size
+        other.mean = float(values.mean())
+        centred = values - other.mean
+        other.m2 = float(np.dot(centred, centred))
+        other.m3 = float(np.sum(centred ** 3))
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other: "Moments"):
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.m3, self.min, self.max = other.n, other.mean, other.m2, other.m3, other.min, other.max
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m3 = (
+            self.m3 + other.m3
+            + delta ** 3 * self.n * other.n * (self.n - other.n) / n ** 2
+            + 3 * delta * (self.n * other.m2 - other.n * self.m2) / n
+        )
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.n * other.n / n
+        self.mean = self.mean + delta * other.n / n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.n = n
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else np.nan
+
+    @property
+    def skew(self) -> float:
+        """Same adjusted Fisher-Pearson estimator as pandas' Series.skew()."""
+        if self.n < 3:
+            return np.nan
+        if self.m2 <= 1e-14 * max(1.0, self.mean ** 2) * self.n:
+            return 0.0
+        return float((self.n * (self.n - 1) ** 0.5 / (self.n - 2)) * (self.m3 / self.m2 ** 1.5))
+
+
+class QuantileSample:
+    """
+    Bottom-k sample keyed by a hash of the row position: deterministic, mergeable and
+    uniform. Holds every value (exact quantiles) until the column exceeds k values.
+    """
+
+    def __init__(self, k: int = QUANTILE_SAMPLE_SIZE):
+        self.k = k
+        self.n = 0
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.values = np.empty(0, dtype=np.float64)
+
+    def update(self, values: np.ndarray, row_ids: np.ndarray):
+        valid = ~np.isnan(values)
+        values, row_ids = values[valid], row_ids[valid]
+        self.n += values.size
+        keys = row_ids.astype(np.uint64) * _GOLDEN
+        self.keys = np.concatenate([self.keys, keys])
+        self.values = np.concatenate([self.values, values])
+        if self.keys.size > 2 * self.k:
+            self._trim()
+
+    def _trim(self):
+        if self.keys.size > self.k:
+            keep = np.argpartition(self.keys, self.k - 1)[:self.k]
+            self.keys, self.values = self.keys[keep], self.values[keep]
+
+    @property
+    def exact(self) -> bool:
+        return self.n <= self.k
+
+    def quantile(self, q: float) -> float:
+        self._trim()
+        if self.values.size == 0:
+            return np.nan
+        return float(np.quantile(self.values, q))
+
+
+class ValueCounter:
+    """Per-value counts merged across chunks; pruned to the heaviest values when huge."""
+
+    def __init__(self, limit: int = VALUE_COUNTER_LIMIT):
+        self.limit = limit
+        self.counts = pd.Series(dtype="int64")
+        self.approximate = False
+
+    def update(self, series: pd.Series):
+        counts = series.value_counts()
+        counts = counts[counts > 0]
+        if isinstance(counts.index, pd.CategoricalIndex):
+            counts.index = counts.index.astype(object)
+        self.counts = counts.astype("int64") if self.counts.empty else self.counts.add(counts, fill_value=0).astype("int64")
+        if len(self.counts) > self.limit:
+            self.counts = self.counts.nlargest(self.limit // 2)
+            self.approximate = True
+
+    def top(self, n: int) -> pd.Series:
+        return self.counts.sort_values(ascending=False, kind="stable").head(n)
+
+
+class DistinctCounter:
+    """Distinct non-null values via 64-bit value hashes, compacted geometrically."""
+
+    def __init__(self):
+        self.compacted = np.empty(0, dtype=np.uint64)
+        self.pending = []
+        self.pending_size = 0
+
+    def update(self, series: pd.Series):
+        values = series.dropna()
+        if values.empty:
+            return
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        hashes = np.unique(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        self.pending.append(hashes)
+        self.pending_size += hashes.size
+        if self.pending_size > max(self.compacted.size, 1 << 16):
+            self._compact()
+
+    def _compact(self):
+        if self.pending:
+            self.compacted = np.unique(np.concatenate([self.compacted] + self.pending))
+            self.pending, self.pending_size = [], 0
+
+    @property
+    def count(self) -> int:
+        self._compact()
+        return int(self.compacted.size)
+
+
+class CorrelationAccumulator:
+    """
+    Pairwise-complete Pearson sums (n, Σx, Σx², Σxy over rows where both values exist),
+    the same pairing pandas' DataFrame.corr() uses. Values are shifted by the first
+    chunk's means to keep the sums well conditioned.
+    """
+
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift = None
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    def update(self, frame: pd.DataFrame):
+        values = frame[self.columns].to_numpy(dtype="float64", na_value=np.nan)
+        if self.shift is None:
+            self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.columns))
+        values = values - self.shift
+        present = (~np.isnan(values)).astype("float64")
+        filled = np.nan_to_num(values)
+        self.n += present.T @ present
+        self.sx += filled.T @ present
+        self.sxx += (filled ** 2).T @ present
+        self.sxy += filled.T @ filled
+
+    def matrix(self, columns: list) -> pd.DataFrame:
+        idx = [self.columns.index(c) for c in columns]
+        n = self.n[np.ix_(idx, idx)]
+        sx = self.sx[np.ix_(idx, idx)]
+        sxx = self.sxx[np.ix_(idx, idx)]
+        sxy = self.sxy[np.ix_(idx, idx)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * sxy - sx * sx.T
+            var = (n * sxx - sx ** 2) * (n * sxx.T - sx.T ** 2)
+            corr = cov / np.sqrt(var)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.diag(n) > 1, 1.0, np.nan))
+        return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def row_hashes(dataset) -> np.ndarray:
+    """64-bit hash of every row, in row order (8 bytes per row instead of the rows)."""
+    pieces = [pd.util.hash_pandas_object(chunk, index=False).to_numpy() for chunk in iter_chunks(dataset, raw=True)]
+    return np.concatenate(pieces) if pieces else np.empty(0, dtype=np.uint64)
+
+
+def read_rows(dataset, row_ids) -> pd.DataFrame:
+    """Specific rows with the analysed dtypes, indexed by their global positions."""
+    frame = columnar_store.read_rows(dataset.filepath, row_ids, column_names(dataset))
+    frame.index = pd.Index(np.asarray(row_ids, dtype=np.int64))
+    return dtype_optimizer.apply_schema(frame, resolve_schema(dataset))
+
+
+# ─────────────────────────────────────────────────────
+# STREAMED ANALYSES
+# ─────────────────────────────────────────────────────
+
+def summary_statistics(dataset) -> dict:
+    """Describe-style numeric stats and top values per text column in one pass."""
+    moments, samples, counters, distinct = {}, {}, {}, {}
+    columns, total_rows = None, 0
+    for chunk in iter_chunks(dataset):
+        if columns is None:
+            columns = list(chunk.columns)
+            numeric = list(chunk.select_dtypes(include=[np.number]).columns)
+            categorical = list(chunk.select_dtypes(exclude=[np.number]).columns)
+            moments = {c: Moments() for c in numeric}
+            samples = {c: QuantileSample() for c in numeric}
+            counters = {c: ValueCounter() for c in categorical}
+            distinct = {c: DistinctCounter() for c in categorical}
+        total_rows += len(chunk)
+        row_ids = chunk.index.to_numpy()
+        for col in moments:
+            values = chunk[col].to_numpy(dtype="float64", na_value=np.nan)
+            moments[col].update(values)
+            samples[col].update(values, row_ids)
+        for col in counters:
+            counters[col].update(chunk[col])
+            distinct[col].update(chunk[col])
+
+    numeric_stats = []
+    for col, m in moments.items():
+        sample = samples[col]
+        numeric_stats.append({
+            "column": col,
+            "count": float(m.n),
+            "mean": m.mean if m.n else np.nan,
+            "std": m.std,
+            "min": m.min,
+            "25%": sample.quantile(0.25),
+            "50%": sample.quantile(0.5),
+            "75%": sample.quantile(0.75),
+            "max": m.max,
+            "skew": m.skew if m.n > 2 else 0.0,
+            "approximate": not sample.exact,
+        })
+    categorical_stats = [{
+        "column": col,
+        "top_values": counters[col].top(5).to_dict(),
+        "unique_count": distinct[col].count,
+        "approximate": counters[col].approximate,
+    } for col in counters]
+    return {
+        "numeric": numeric_stats,
+        "categorical": categorical_stats,
+        "total_rows": total_rows,
+        "total_columns": len(columns or column_names(dataset)),
+    }
+
+
+def correlation_matrix(dataset) -> pd.DataFrame:
+    """Pearson matrix of the numeric columns that vary (exact, from merged sums)."""
+    numeric = list(empty_frame(dataset).select_dtypes(include=[np.number]).columns)
+    if not numeric:
+        return pd.DataFrame()
+    acc = CorrelationAccumulator(numeric)
+    moments = {c: Moments() for c in numeric}
+    for chunk in iter_chunks(dataset, columns=numeric):
+        acc.update(chunk)
+        for col in numeric:
+            moments[col].update(chunk[col].to_numpy(dtype="float64", na_value=np.nan))
+    varying = [c for c in numeric if moments[c].n > 0 and moments[c].max > moments[c].min]
+    return acc.matrix(varying) if varying else pd.DataFrame()
+
+
+def issue_profile(dataset, sample_limit: int = 20) -> dict:
+    """
+    Everything detect_issues needs, in two passes: one for missing cells, moments,
+    quartile samples and type verdicts of text columns, a second (numeric
+    columns only) to count IQR outliers against the merged quartiles.
+    """
+    base = empty_frame(dataset)
+    numeric = [c for c in base.columns if pd.api.types.is_numeric_dtype(base[c])]
+    text = [c for c in base.columns if dtype_optimizer.is_text_dtype(base[c])]
+    missing = {c: 0 for c in base.columns}
+    missing_rows = {c: [] for c in base.columns}
+    moments = {c: Moments() for c in numeric}
+    samples = {c: QuantileSample() for c in numeric}
+    total_rows = _parquet(dataset).metadata.num_rows
+    verdicts = {c: type_inference.VerdictAccumulator(c, str(base[c].dtype), total_rows) for c in text}
+
+    for chunk in iter_chunks(dataset):
+        row_ids = chunk.index.to_numpy()
+        nulls = chunk.isnull()
+        for col in base.columns:
+            mask = nulls[col].to_numpy()
+            missing[col] += int(mask.sum())
+            if len(missing_rows[col]) < sample_limit:
+                missing_rows[col].extend(row_ids[mask][:sample_limit - len(missing_rows[col])].tolist())
+        for col in numeric:
+            values = chunk[col].to_numpy(dtype="float64", na_value=np.nan)
+            moments[col].update(values)
+            samples[col].update(values, row_ids)
+        for col in text:
+            verdicts[col].update(chunk[col], row_ids)
+
+    bounds = {}
+    for col in numeric:
+        q1, q3 = samples[col].quantile(0.25), samples[col].quantile(0.75)
+        bounds[col] = (q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))
+    outliers = {c: 0 for c in numeric}
+    outlier_rows = {c: [] for c in numeric}
+    if numeric:
+        for chunk in iter_chunks(dataset, columns=numeric):
+            row_ids = chunk.index.to_numpy()
+            for col in numeric:
+                low, high = bounds[col]
+                values = chunk[col].to_numpy(dtype="float64", na_value=np.nan)
+                mask = (values < low) | (values > high)
+                outliers[col] += int(mask.sum())
+                if len(outlier_rows[col]) < sample_limit:
+                    outlier_rows[col].extend(row_ids[mask][:sample_limit - len(outlier_rows[col])].tolist())
+
+    return {
+        "columns": list(base.columns),
+        "dtypes": {c: str(base[c].dtype) for c in base.columns},
+        "total_rows": total_rows,
+        "numeric": numeric,
+        "text": text,
+        "missing": missing,
+        "missing_rows": missing_rows,
+        "skew": {c: moments[c].skew for c in numeric},
+        "outliers": outliers,
+        "outlier_rows": outlier_rows,
+        "quartiles_exact": {c: samples[c].exact for c in numeric},
+        "type_verdicts": {c: verdicts[c].verdict() for c in text},
+    }
+
+
+def duplicate_profile(dataset, sample_limit: int = 20) -> dict:
+    """Exact duplicate-row count (keep='first' semantics) from row hashes."""
+    hashes = row_hashes(dataset)
+    duplicated = pd.Series(hashes).duplicated().to_numpy()
+    rows = np.flatnonzero(duplicated)
+    return {"count": int(rows.size), "rows": rows[:sample_limit].tolist(), "total_rows": int(hashes.size)}
+
+
+def quality_profile(dataset) -> dict:
+    """Inputs of the five quality dimensions, streamed."""
+    base = empty_frame(dataset)
+    distinct = {c: DistinctCounter() for c in base.columns}
+    numeric = list(base.select_dtypes(include=[np.number]).columns)
+    moments = {c: Moments() for c in numeric}
+    missing, total_rows = 0, 0
+    for chunk in iter_chunks(dataset):
+        total_rows += len(chunk)
+        missing += int(chunk.isnull().sum().sum())
+        for col in base.columns:
+            distinct[col].update(chunk[col])
+        for col in numeric:
+            moments[col].update(chunk[col].to_numpy(dtype="float64", na_value=np.nan))
+    return {
+        "total_rows": total_rows,
+        "total_cols": len(base.columns),
+        "missing_cells": missing,
+        "duplicate_rows": duplicate_profile(dataset)["count"],
+        "distinct": {c: d.count for c, d in distinct.items()},
+        "numeric": {c: (m.n, m.skew) for c, m in moments.items()},
+        "text_columns": base.select_dtypes(include=["object", "category", "string"]).shape[1],
+    }
+
+
+def value_counts(dataset, column: str, top: int = None, filters: list = None) -> pd.Series:
+    counter = ValueCounter()
+    for chunk in iter_chunks(dataset, columns=[column], filters=filters):
+        counter.update(chunk[column])
+    counts = counter.counts.sort_values(ascending=False, kind="stable")
+    return counts.head(top) if top else counts
+
+
+def sample_pairs(dataset, x_col: str, y_col: str, size: int, filters: list = None) -> tuple:
+    """Deterministic bottom-k sample of complete (x, y) pairs. Returns (frame, total_pairs)."""
+    keys, frames, total = [], [], 0
+    for chunk in iter_chunks(dataset, columns=[x_col, y_col], filters=filters):
+        pairs = chunk.dropna()
+        total += len(pairs)
+        keys.append(pairs.index.to_numpy().astype(np.uint64) * _GOLDEN)
+        frames.append(pairs)
+        merged_keys = np.concatenate(keys)
+        if merged_keys.size > 4 * size:
+            merged = pd.concat(frames)
+            keep = np.sort(np.argpartition(merged_keys, size - 1)[:size])
+            keys, frames = [merged_keys[keep]], [merged.iloc[keep]]
+    if not frames:
+        return pd.DataFrame(columns=[x_col, y_col]), 0
+    merged_keys, merged = np.concatenate(keys), pd.concat(frames)
+    if merged_keys.size > size:
+        keep = np.sort(np.argpartition(merged_keys, size - 1)[:size])
+        merged = merged.iloc[keep]
+    return merged, total
+
+
+# ─────────────────────────────────────────────────────
+# STREAMED SIMPLE FILLS
+# ─────────────────────────────────────────────────────
+
+STREAMABLE_FILLS = {"Mean Imputation", "Median Imputation", "Mode Replacement", "Fill with 'Unknown'"}
+STREAMABLE_FORMATS = {"csv", "tsv", "parquet"}
+
+
+def can_stream_fill(dataset, strategy: str) -> bool:
+    return strategy in STREAMABLE_FILLS and (dataset.file_type or "csv") in STREAMABLE_FORMATS
+
+
+def fill_value(dataset, column: str, strategy: str):
+    """
+    First pass: the value to fill with, whether the column is integral (filled values are
+    rounded, as apply_strategy does for DISCRETE_INT columns), the missing count, and
+    whether the value is exact. Returns None when the strategy does not apply.
+    """
+    from app.services.repair_engine import detect_column_type
+
+    moments, sample, counter = Moments(), QuantileSample(), ValueCounter()
+    missing, discrete, is_numeric, seen = 0, True, None, False
+    for chunk in iter_chunks(dataset, columns=[column]):
+        series = chunk[column]
+        if is_numeric is None:
+            is_numeric = pd.api.types.is_numeric_dtype(series)
+        missing += int(series.isna().sum())
+        if series.notna().any():
+            seen = True
+            discrete = discrete and detect_column_type(series, column) == "DISCRETE_INT"
+        if is_numeric:
+            values = series.to_numpy(dtype="float64", na_value=np.nan)
+            moments.update(values)
+            sample.update(values, chunk.index.to_numpy())
+        counter.update(series)
+
+    exact = True
+    if strategy == "Mean Imputation":
+        if not is_numeric:
+            return None
+        value = moments.mean if moments.n else np.nan
+    elif strategy == "Median Imputation":
+        if not is_numeric:
+            return None
+        value, exact = sample.quantile(0.5), sample.exact
+    elif strategy == "Mode Replacement":
+        if counter.counts.empty:
+            return None
+        top = counter.counts.max()
+        tied = counter.counts[counter.counts == top].index.tolist()
+        try:
+            value = sorted(tied)[0]  # Series.mode() returns the smallest of tied values
+        except TypeError:
+            value = tied[0]
+        exact = not counter.approximate
+    else:
+        value = "Unknown"
+        if is_numeric:
+            return None
+    return {"value": value, "missing": missing, "discrete": discrete and seen and is_numeric, "exact": exact}
+
+
+def _write_chunk(frame: pd.DataFrame, handle, file_ext: str, first: bool):
+    frame.to_csv(handle, index=False, header=first, sep='\t' if file_ext == 'tsv' else ',')
+
+
+def stream_fill(dataset, column: str, fill: dict, target_path: str) -> dict:
+    """
+    Second pass: rewrites the dataset with the column filled, one row group at a time,
+    into target_path (in the dataset's format) plus its canonical Parquet twin. Row hashes
+    and missing cells of the result are collected on the way for its quality score.
+    Returns {rows, missing_cells, duplicate_rows}.
+    """
+    file_ext = dataset.file_type or "csv"
+    canonical_target = columnar_store.canonical_path(target_path)
+    value = fill["value"]
+    if fill["discrete"] and isinstance(value, float) and not np.isnan(value):
+        value = round(value)
+
+    # Written with the source's Arrow schema so every row group agrees on the types
+    schema = _parquet(dataset).schema_arrow.remove_metadata()
+    if fill["discrete"]:
+        schema = schema.set(schema.get_field_index(column), pa.field(column, pa.int64()))
+
+    rows, missing_cells, hashes = 0, 0, []
+    handle = open(target_path, "w", newline="") if file_ext != "parquet" else None
+    canonical_writer = pq.ParquetWriter(canonical_target + ".tmp", schema)
+    writer = pq.ParquetWriter(target_path, schema) if handle is None else None
+    try:
+        for chunk in iter_chunks(dataset, raw=True):
+            series = chunk[column]
+            if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(series):
+                series = dtype_optimizer.fill_text(series, value)
+            else:
+                series = series.fillna(value)
+            if fill["discrete"] and pd.api.types.is_numeric_dtype(series):
+                series = series.round().astype("Int64")
+            chunk[column] = series
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            canonical_writer.write_table(table, row_group_size=columnar_store.ROW_GROUP_SIZE)
+            if writer is not None:
+                writer.write_table(table)
+            else:
+                _write_chunk(chunk, handle, file_ext, first=rows == 0)
+            missing_cells += int(chunk.isnull().sum().sum())
+            hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+            rows += len(chunk)
+        if handle is not None and rows == 0:
+            _write_chunk(empty_frame(dataset), handle, file_ext, first=True)
+    finally:
+        canonical_writer.close()
+        if handle is not None:
+            handle.close()
+        if writer is not None:
+            writer.close()
+    os.replace(canonical_target + ".tmp", canonical_target)
+
+    duplicate_rows = int(pd.Series(np.concatenate(hashes)).duplicated().sum()) if hashes else 0
+    return {"rows": rows, "missing_cells": missing_cells, "duplicate_rows": duplicate_rows}
@@ -7,6 +7,7 @@ from fastapi import HTTPException
 from sqlmodel import Session
 from app.models.dataset import Dataset
 from app.services.eda_service import get_dataframe
+from app.services import blob_store, dtype_optimizer, type_inference
 
 def get_preparation_suggestions(dataset_id: int, session: Session):
     """
@@ -51,12 +52,13 @@ def get_preparation_suggestions(dataset_id: int, session: Session):
                         fill_suggestions[col] = ["Fill with 'Unknown'", "Remove Rows", "Keep Empty"]
                         
                 elif issue.get("issue_type") == "Wrong Data Type":
+                    expected = issue.get("expected_type", "Number")
                     wrong_types.append({
                         "column": col,
                         "detected": "Text (Object)",
-                        "expected": "Number"
+                        "expected": expected
                     })
-                    type_suggestions[col] = ["Convert to Number", "Keep as Text"]
+                    type_suggestions[col] = [f"Convert to {expected}", "Keep as Text"]
             
             # 3. Duplicates
             for b in breakdown:
@@ -97,10 +99,11 @@ def apply_preparation_strategies(dataset_id: int, config: dict, session: Session
     for col, strategy in type_config.items():
         if col not in df.columns: continue
         
-        if strategy == "Convert to Number":
-            # Coerce errors to NaN, then maybe fill? For now just coerce.
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            change_log.append(f"Converted '{col}' to Number")
+        if strategy.startswith("Convert to "):
+            # Coerce errors to empty cells, then maybe fill? For now just coerce.
+            expected = strategy[len("Convert to "):]
+            df[col] = type_inference.convert_to(df[col], expected)
+            change_log.append(f"Converted '{col}' to {expected}")
 
     # 2. Apply Missing Value Fixes
     fill_config = config.get("fill_missing", {})
@@ -122,7 +125,7 @@ def apply_preparation_strategies(dataset_id: int, config: dict, session: Session
             change_log.append(f"Filled {initial_missing} missing in '{col}' with Median ({median_val})")
             
         elif strategy == "Fill with 'Unknown'":
-            df[col] = df[col].fillna("Unknown")
+            df[col] = dtype_optimizer.fill_text(df[col], "Unknown")
             change_log.append(f"Filled {initial_missing} missing in '{col}' with 'Unknown'")
             
         elif strategy == "Remove Rows":
@@ -143,24 +146,23 @@ def apply_preparation_strategies(dataset_id: int, config: dict, session: Session
     base_name, ext = os.path.splitext(original_dataset.filename)
     new_filename = f"{base_name}_prepared{ext}"
     
-    # Determine storage path
-    original_dir = os.path.dirname(original_dataset.filepath)
-    new_filepath = os.path.join(original_dir, f"{os.path.basename(base_name)}_prepared_v{pd.Timestamp.now().strftime('%H%M%S')}.csv")
-    
-    df.to_csv(new_filepath, index=False)
+    # Content-addressed storage path (prepared data is standardized to CSV)
+    blob = blob_store.put_frame(session, df, "csv", lambda frame, path, ext: frame.to_csv(path, index=False))
     
     # Create DB Entry
     new_dataset = Dataset(
         filename=new_filename,
-        filepath=new_filepath,
+        filepath=blob.storage_path,
+        content_hash=blob.sha256,
         file_type="csv", # We standardize to CSV for prepared data
         row_count=len(df),
         column_count=len(df.columns),
-        file_size_bytes=os.path.getsize(new_filepath),
+        file_size_bytes=blob.size_bytes,
         quality_score=original_dataset.quality_score, # Should ideally recalc, but okay for now
         analyzed=False, # Needs re-analysis? Or we assume cleaned is ready? Let's say False to trigger new preview gen if needed
         processing_log=json.dumps(change_log),
-        ingestion_insights=original_dataset.ingestion_insights # Carry over context
+        ingestion_insights=original_dataset.ingestion_insights, # Carry over context
+        column_schema=dtype_optimizer.dump_schema(df)
     )
     
     session.add(new_dataset)
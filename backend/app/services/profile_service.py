@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from fastapi import HTTPException
+from sqlmodel import Session
+from app.models.dataset import Dataset
+from app.services import artifact_cache, column_profiler, dtype_optimizer, type_inference
+from app.services.eda_service import get_dataframe
+
+# Column profiles: everything issue detection, quality metrics and summary statistics
+# read from a dataset, one entry per column plus a few frame-level counts. A version's
+# profile is built once and cached as an artifact. Repairs derive the child version's
+# profile from its parent's: untouched columns are inherited, touched columns are
+# re-profiled, and duplicates follow from row hashes patched column by column.
+PROFILE_KIND = "column_profiles"
+SAMPLE_ROWS = 20
+DUPLICATE_SAMPLE_ROWS = 5
+ROW_HASH_CACHE_SIZE = 8
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_row_hashes = OrderedDict()  # dataset fingerprint -> uint64 row hashes
+
+
+# ─────────────────────────────────────────────────────
+# ROW HASHES (a row's hash is a sum of per-column terms)
+# ─────────────────────────────────────────────────────
+
+def _column_term(series: pd.Series, position: int) -> np.ndarray:
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    with np.errstate(over="ignore"):
+        # Position-dependent odd multiplier: swapping values between columns changes the row hash
+        return hashes * np.uint64(2 * position + 1) + np.uint64(position) * _GOLDEN
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of every row; replacing one column only swaps that column's term."""
+    total = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for position in range(df.shape[1]):
+            total += _column_term(df.iloc[:, position], position)
+    return total
+
+
+def _remember_hashes(fingerprint: str, hashes: np.ndarray):
+    _row_hashes[fingerprint] = hashes
+    _row_hashes.move_to_end(fingerprint)
+    while len(_row_hashes) > ROW_HASH_CACHE_SIZE:
+        _row_hashes.popitem(last=False)
+
+
+def _duplicates(hashes: np.ndarray) -> dict:
+    """Duplicate rows (keep='first' semantics, as DataFrame.duplicated) from row hashes."""
+    rows = np.flatnonzero(pd.Series(hashes).duplicated().to_numpy())
+    return {"count": int(rows.size), "rows": rows[:SAMPLE_ROWS].tolist()}
+
+
+# ─────────────────────────────────────────────────────
+# COLUMN ENTRIES
+# ─────────────────────────────────────────────────────
+
+def _number(value):
+    """Float for the profile, None for NaN (the form the artifact cache hands back)."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _numeric_block(numeric: pd.DataFrame) -> list:
+    """describe(), skew and IQR outlier rows for a block of numeric columns, in one pass each."""
+    desc = numeric.describe()
+    skews = numeric.skew()
+    values = numeric.to_numpy(dtype="float64", na_value=np.nan)
+    q1 = desc.loc["25%"].to_numpy(dtype="float64")
+    q3 = desc.loc["75%"].to_numpy(dtype="float64")
+    iqr = q3 - q1
+    with np.errstate(invalid="ignore"):
+        mask = (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+    entries = []
+    for position in range(numeric.shape[1]):
+        outlier_rows = np.flatnonzero(mask[:, position])
+        entries.append({
+            "describe": {stat: _number(value) for stat, value in desc.iloc[:, position].items()},
+            "skew": _number(skews.iloc[position]),
+            "outliers": int(outlier_rows.size),
+            "outlier_rows": outlier_rows[:SAMPLE_ROWS].tolist(),
+        })
+    return entries
+
+
+def _base_entry(series: pd.Series, numeric: bool) -> dict:
+    null_rows = np.flatnonzero(series.isna().to_numpy())
+    text = dtype_optimizer.is_text_dtype(series)
+    entry = {
+        "column": series.name,
+        "dtype": str(series.dtype),
+        "numeric": numeric,
+        "text": text,
+        "missing": int(null_rows.size),
+        "missing_rows": null_rows[:SAMPLE_ROWS].tolist(),
+        "distinct": int(series.nunique()),
+    }
+    if not numeric:
+        entry["top_values"] = series.value_counts().head(5).to_dict()
+    if text:
+        entry["type"] = type_inference.infer_column(series)
+    return entry
+
+
+def profile_columns(df: pd.DataFrame) -> list:
+    """Profile entries for every column of `df`, in column order (blocks profiled in parallel)."""
+    numeric_cols = set(df.select_dtypes(include=[np.number]).columns)
+    entries = column_profiler.map_columns(df, lambda series: _base_entry(series, series.name in numeric_cols))
+    numeric_positions = [i for i, entry in enumerate(entries) if entry["numeric"]]
+    if numeric_positions:
+        stats = column_profiler.map_blocks(df, _numeric_block, [df.columns[i] for i in numeric_positions])
+        for position, numeric_entry in zip(numeric_positions, [e for block in stats for e in block]):
+            entries[position].update(numeric_entry)
+    return entries
+
+
+def _frame_profile(df: pd.DataFrame, columns: list, hashes: np.ndarray) -> dict:
+    duplicates = _duplicates(hashes)
+    sample = df.iloc[duplicates["rows"][:DUPLICATE_SAMPLE_ROWS]]
+    return {
+        "row_count": len(df),
+        "column_count": len(df.columns),
+        "duplicates": {**duplicates, "sample_rows": sample.replace({np.nan: None}).to_dict(orient="records")},
+        "columns": columns,
+    }
+
+
+def build_profile(df: pd.DataFrame, fingerprint: str = None) -> dict:
+    hashes = row_hashes(df)
+    if fingerprint:
+        _remember_hashes(fingerprint, hashes)
+    return _frame_profile(df, profile_columns(df), hashes)
+
+
+def get_profile(session: Session, dataset: Dataset) -> dict:
+    """The dataset's column profile, built on first use and served from the artifact cache afterwards."""
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    def compute():
+        fingerprint = artifact_cache.dataset_fingerprint(dataset) if dataset.filepath else None
+        return build_profile(get_dataframe(dataset.id, session), fingerprint)
+    return artifact_cache.get_or_compute(session, dataset, PROFILE_KIND, compute)
+
+
+def type_verdicts(session: Session, dataset: Dataset) -> list:
+    """type_inference verdicts of the text columns, kept with the column profile."""
+    return [entry["type"] for entry in get_profile(session, dataset)["columns"] if entry.get("type")]
+
+
+# ─────────────────────────────────────────────────────
+# INCREMENTAL DERIVATION FOR REPAIRED VERSIONS
+# ─────────────────────────────────────────────────────
+
+def derive_profile(session: Session, parent: Dataset, child: Dataset, df: pd.DataFrame):
+    """
+    Stores the child version's profile, derived from the parent's. `df` is the repaired
+    frame still indexed by parent row positions (row-dropping repairs keep the surviving
+    labels); it only maps child rows to parent rows. Values and dtypes come from the child
+    as it reloads from storage, so the result equals a cold build_profile of the child.
+    Columns that reload unchanged keep the parent's entries; when rows were dropped every
+    column is re-profiled, but duplicates still come from the parent's row hashes.
+    Returns None (the child is then profiled on first use) when the parent was never
+    profiled or the frames do not line up.
+    """
+    parent_profile = artifact_cache.lookup(session, parent, PROFILE_KIND)
+    if parent_profile is None or [str(e["column"]) for e in parent_profile["columns"]] != [str(c) for c in df.columns]:
+        return None
+    kept = df.index.to_numpy()
+    if not pd.api.types.is_integer_dtype(kept) or (len(kept) and (kept.min() < 0 or kept.max() >= parent_profile["row_count"])):
+        return None
+
+    parent_df = get_dataframe(parent.id, session)
+    parent_fingerprint = artifact_cache.dataset_fingerprint(parent)
+    parent_hashes = _row_hashes.get(parent_fingerprint)
+    if parent_hashes is None:
+        parent_hashes = row_hashes(parent_df)
+        _remember_hashes(parent_fingerprint, parent_hashes)
+
+    # The in-memory repair result can hold other dtypes than its stored file reloads with
+    # (e.g. Int64 after an imputation, int64 once reloaded): profile what later loads see
+    child_df = get_dataframe(child.id, session)
+    if list(child_df.columns) != list(df.columns) or len(child_df) != len(kept):
+        return None
+    changed = [
+        position for position in range(child_df.shape[1])
+        if not parent_df.iloc[kept, position].reset_index(drop=True).equals(child_df.iloc[:, position])
+    ]
+
+    hashes = parent_hashes[kept]
+    with np.errstate(over="ignore"):
+        for position in changed:
+            hashes = hashes - _column_term(parent_df.iloc[kept, position], position) + _column_term(child_df.iloc[:, position], position)
+
+    if len(kept) == len(parent_df):
+        # Only the rewritten columns moved: every other entry is the parent's
+        fresh = dict(zip(changed, profile_columns(child_df.iloc[:, changed]))) if changed else {}
+        columns = [fresh.get(position, entry) for position, entry in enumerate(parent_profile["columns"])]
+    else:
+        # Dropped rows shift every column's statistics; only the duplicate pass is saved
+        columns = profile_columns(child_df)
+
+    profile = _frame_profile(child_df, columns, hashes)
+    return artifact_cache.get_or_compute(session, child, PROFILE_KIND, lambda: profile)
@@ -1,12 +1,40 @@
 import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
-from app.services.eda_service import get_dataframe
+from app.models.dataset import Dataset
+from app.services import out_of_core, profile_service
 
 def compute_quality_metrics(dataset_id: int, session: Session) -> dict:
-    df = get_dataframe(dataset_id, session)
-    
-    if df.empty:
+    dataset = session.get(Dataset, dataset_id)
+    if out_of_core.enabled_for(dataset):
+        # Every input below merges exactly across row groups (distinct counts use 64-bit hashes)
+        profile = out_of_core.quality_profile(dataset)
+        metrics = _quality_dimensions(
+            profile["total_rows"], profile["total_cols"], profile["missing_cells"], profile["duplicate_rows"],
+            list(profile["distinct"].values()), list(profile["numeric"].values()), profile["text_columns"]
+        )
+        return {**metrics, "execution_mode": "out_of_core", "approximate": False}
+
+    # Every count comes from the version's column profile (shared with issue detection)
+    profile = profile_service.get_profile(session, dataset)
+    if profile["row_count"] == 0:
+        return _quality_dimensions(0, profile["column_count"], 0, 0, [], [], 0)
+
+    columns = profile["columns"]
+    return _quality_dimensions(
+        profile["row_count"],
+        profile["column_count"],
+        sum(entry["missing"] for entry in columns),
+        profile["duplicates"]["count"],
+        [entry["distinct"] for entry in columns],
+        [(entry["describe"]["count"], entry["skew"]) for entry in columns if entry["numeric"]],
+        sum(1 for entry in columns if entry["text"])
+    )
+
+def _quality_dimensions(total_rows: int, total_cols: int, missing_cells: int, duplicate_rows: int,
+                        distinct_counts: list, numeric_skews: list, object_cols: int) -> dict:
+    """numeric_skews holds (non-null count, skewness) per numeric column."""
+    if total_rows == 0:
         return {
             "completeness": 0,
             "consistency": 0,
@@ -15,44 +43,37 @@ def compute_quality_metrics(dataset_id: int, session: Session) -> dict:
             "type_integrity": 0
         }
 
-    total_cells = df.size
-    total_rows = len(df)
-    total_cols = len(df.columns)
+    total_cells = total_rows * total_cols
 
     # 1. Completeness = 1 - (missing_cells / total_cells)
-    missing_cells = df.isnull().sum().sum()
     completeness = (1 - (missing_cells / total_cells)) * 100 if total_cells > 0 else 0
 
     # 2. Consistency = 1 - duplicate_ratio
-    duplicate_rows = df.duplicated().sum()
     consistency = (1 - (duplicate_rows / total_rows)) * 100 if total_rows > 0 else 0
 
     # 3. Uniqueness = unique_rows / total_rows
     # Differentiating from consistency (which checks full duplicates).
     # We will measure structural uniqueness as the average ratio of unique values per column mapped to row count.
-    col_uniqueness = [len(df[col].dropna().unique()) / total_rows for col in df.columns]
+    col_uniqueness = [count / total_rows for count in distinct_counts]
     # Bound between 0 and 100. High cardinality yields high uniqueness.
     uniqueness = (sum(col_uniqueness) / total_cols) * 100 if total_cols > 0 else 0
     # Boost uniqueness mathematically so dense categorical matrices aren't unfairly penalized.
     uniqueness = min(100, uniqueness * 2 + 20) 
 
     # 4. Distribution Stability = map skewness boundaries
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    if len(numeric_cols) > 0:
+    if len(numeric_skews) > 0:
         stable_count = 0
-        for col in numeric_cols:
-            if df[col].dropna().empty:
+        for count, skewness in numeric_skews:
+            if count == 0:
                 continue
-            skewness = df[col].skew()
             # If skew is close to 0 (-1 to 1 is highly symmetrical, -2 to 2 is acceptable)
             if pd.notna(skewness) and abs(skewness) <= 2:
                 stable_count += 1
-        stability = (stable_count / len(numeric_cols)) * 100
+        stability = (stable_count / len(numeric_skews)) * 100
     else:
         stability = 100  # Default to 100 if no numeric columns to destablize
 
     # 5. Type Integrity = Identify unparsed / mixed types
-    object_cols = df.select_dtypes(include=['object']).shape[1]
     # Penalize purely string/object heavy frames mildly, standard mapping reduces absolute perfection
     type_integrity = max(0, 100 - ((object_cols / total_cols) * 40)) if total_cols > 0 else 0
 
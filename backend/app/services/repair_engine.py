@@ -7,6 +7,8 @@ from app.services.eda_service import get_dataframe
 from app.services.issue_detection import detect_issues, calculate_health_score
 from app.services.confidence_engine import calculate_repair_confidence
 from app.services.risk_engine import calculate_repair_risk
+from app.services.dtype_optimizer import fill_text
+from app.services import type_inference
 from sklearn.impute import KNNImputer
 from sklearn.linear_model import LinearRegression
 
@@ -110,7 +112,7 @@ def generate_recommendations(dataset_id: int, session: Session):
         elif issue_type == "Incorrect Data Type":
             rec["recommended_strategy"] = "Type Conversion"
             rec["confidence_score"] = calculate_repair_confidence(col, issue_type, df, "Type Conversion", corr_matrix)
-            rec["explanation"] = "Data format restricts calculations. Converting to Number is highly recommended."
+            rec["explanation"] = f"Data format restricts calculations. Converting to {issue.get('expected_type', 'number').capitalize()} is highly recommended."
             rec["alternatives"] = []
             
         elif issue_type in ("Outliers", "Skewed Distribution"):
@@ -190,10 +192,11 @@ def apply_strategy(df_copy: pd.DataFrame, column: str, strategy: str) -> tuple[p
             df_copy = df_copy[~((df_copy[column] < Q1 - 1.5 * IQR) | (df_copy[column] > Q3 + 1.5 * IQR))]
             applied = True
     elif strategy == "Type Conversion":
-        df_copy[column] = pd.to_numeric(df_copy[column], errors="coerce")
+        # Numbers, currency amounts, flags or dates, whichever the column's values hold
+        df_copy[column] = type_inference.convert(df_copy[column])
         applied = True
     elif strategy == "Fill with 'Unknown'":
-        df_copy[column] = df_copy[column].fillna("Unknown")
+        df_copy[column] = fill_text(df_copy[column], "Unknown")
         applied = True
     elif strategy == "Log Transformation":
         if pd.api.types.is_numeric_dtype(df_copy[column]):
@@ -270,8 +273,8 @@ def simulate_repair(dataset_id: int, column: str, strategy: str, session: Sessio
     if column != "Entire Dataset" and column not in df.columns:
         raise HTTPException(status_code=400, detail=f"Column '{column}' not found in dataset")
         
-    # CRITICAL: Work on a deep copy only
-    df_original = df.copy()
+    # CRITICAL: Work on a deep copy only (get_dataframe already hands out a private copy)
+    df_original = df
     df_copy = df.copy()
     
     # Compute BEFORE stats
@@ -339,8 +342,9 @@ def simulate_repair(dataset_id: int, column: str, strategy: str, session: Sessio
             })
     
     # ─── BEFORE / AFTER SAMPLES (first 10 rows) ───
-    before_sample = df_original.head(10).replace({np.nan: None}).to_dict(orient="records")
-    after_sample = df_copy.head(10).replace({np.nan: None}).to_dict(orient="records")
+    # Frames are encoded lazily by the response layer (JSON records or Arrow batches)
+    before_sample = df_original.head(10)
+    after_sample = df_copy.head(10)
     
     # ─── METRICS DELTA ───
     metrics_delta = {
@@ -1,6 +1,6 @@
 import pandas as pd
 from sqlalchemy.orm import Session
-from app.services.eda_service import get_dataframe
+from app.services.eda_service import get_column_names, get_columns
 from app.services.repair_engine import simulate_repair
 from app.services.issue_detection import detect_issues
 from fastapi import HTTPException
@@ -9,8 +9,7 @@ def generate_repair_trace(dataset_id: int, column: str, strategy: str, session:
     """
     Generates a full explainable trace comparing before/after effects.
     """
-    df = get_dataframe(dataset_id, session)
-    if column != "Entire Dataset" and column not in df.columns:
+    if column != "Entire Dataset" and column not in get_column_names(dataset_id, session):
         raise HTTPException(status_code=400, detail="Column not found")
         
     # Get initial issue context
@@ -29,10 +28,11 @@ def generate_repair_trace(dataset_id: int, column: str, strategy: str, session:
     # Deep statistical markers
     analysis_block = {}
     if column != "Entire Dataset":
-        missing_count = int(df[column].isnull().sum())
-        analysis_block["missing_ratio"] = round(missing_count / len(df), 4)
-        if pd.api.types.is_numeric_dtype(df[column]):
-            analysis_block["skewness"] = round(df[column].skew(), 4)
+        series = get_columns(dataset_id, [column], session)[column]
+        missing_count = int(series.isnull().sum())
+        analysis_block["missing_ratio"] = round(missing_count / len(series), 4)
+        if pd.api.types.is_numeric_dtype(series):
+            analysis_block["skewness"] = round(series.skew(), 4)
             
     # Reasoning text
     reasoning = "Applied mathematical normalization."
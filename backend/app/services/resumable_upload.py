@@ -0,0 +1,303 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+from contextlib import contextmanager
+from fastapi import HTTPException, Request
+from app.services.dataset_service import UPLOAD_DIR
+from app.services import staging_service
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Resumable uploads: the client sends fixed-size chunks (any order, retries allowed).
+# Each is verified in a side file, then written in place into one pre-sized file per upload.
+RESUMABLE_DIR = os.path.join(UPLOAD_DIR, "resumable")
+RESUMABLE_TTL_SECONDS = int(os.getenv("AVIS_RESUMABLE_TTL_SECONDS", str(24 * 3600)))
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "manifest.lock"
+DATA_NAME = "data.part"
+CHECKSUM_HEADER = "x-chunk-sha256"
+COPY_BLOCK_SIZE = 1024 * 1024
+
+_UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# Running SHA-256 over the contiguous prefix of received chunks, per upload. The manifest
+# records how many chunks the prefix covers and its digest; this process's hash object
+# is only reused while it matches that checkpoint (another worker may have extended the
+# prefix, or a re-sent chunk rewound it), otherwise the prefix is re-read from disk.
+_prefix_hashers = {}
+_EMPTY_DIGEST = hashlib.sha256().hexdigest()
+
+
+def _upload_dir(upload_id: str) -> str:
+    if not _UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+    path = os.path.join(RESUMABLE_DIR, upload_id)
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail="Upload session not found or expired. Please start the upload again.")
+    return path
+
+
+def _load_manifest(upload_dir: str) -> dict:
+    with open(os.path.join(upload_dir, MANIFEST_NAME)) as handle:
+        return json.load(handle)
+
+
+def _save_manifest(upload_dir: str, manifest: dict):
+    path = os.path.join(upload_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as handle:
+        json.dump(manifest, handle)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _manifest_lock(upload_dir: str):
+    """
+    Serializes manifest read-modify-save cycles (and the slot writes they record) across
+    threads and worker processes: flock on POSIX, a one-byte msvcrt region lock on Windows.
+    """
+    with open(os.path.join(upload_dir, LOCK_NAME), "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after ~10 s; keep waiting like flock does
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _chunk_length(manifest: dict, index: int) -> int:
+    start = index * manifest["chunk_size"]
+    return min(manifest["chunk_size"], manifest["total_size"] - start)
+
+
+def purge_expired(now: float = None) -> int:
+    """Removes abandoned upload sessions older than the TTL."""
+    if not os.path.isdir(RESUMABLE_DIR):
+        return 0
+    now = now or time.time()
+    purged = 0
+    for upload_id in os.listdir(RESUMABLE_DIR):
+        path = os.path.join(RESUMABLE_DIR, upload_id)
+        try:
+            if now - os.path.getmtime(path) > RESUMABLE_TTL_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+                _prefix_hashers.pop(upload_id, None)
+                purged += 1
+        except OSError:
+            pass
+    return purged
+
+
+def init_upload(filename: str, total_size: int, chunk_size: int = None, sha256: str = None, sheet: str = None) -> dict:
+    """Opens an upload session and pre-sizes its staging file."""
+    purge_expired()
+    if total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive.")
+    chunk_size = min(max(chunk_size or DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+    file_ext = filename.split('.')[-1].lower()
+    if file_ext not in ("csv", "tsv", "xlsx", "xls", "json", "xml", "parquet"):
+        raise HTTPException(status_code=400, detail=f"Sorry, we can't read '.{file_ext}' files yet. Please use CSV, Excel, JSON, XML, TSV, or Parquet.")
+
+    upload_id = uuid.uuid4().hex
+    upload_dir = os.path.join(RESUMABLE_DIR, upload_id)
+    os.makedirs(upload_dir, exist_ok=True)
+    with open(os.path.join(upload_dir, DATA_NAME), "wb") as handle:
+        handle.truncate(total_size)
+
+    manifest = {
+        "upload_id": upload_id,
+        "filename": os.path.basename(filename),
+        "total_size": total_size,
+        "chunk_size": chunk_size,
+        "total_chunks": -(-total_size // chunk_size),
+        "sha256": sha256.lower() if sha256 else None,
+        "sheet": sheet,
+        "received": {},
+        "hashed_chunks": 0,
+        "prefix_sha256": _EMPTY_DIGEST,
+        "created_at": time.time()
+    }
+    _save_manifest(upload_dir, manifest)
+    _prefix_hashers[upload_id] = hashlib.sha256()
+    return upload_status(upload_id)
+
+
+def upload_status(upload_id: str) -> dict:
+    """Which chunks have arrived, so an interrupted client resumes with only the missing ones."""
+    manifest = _load_manifest(_upload_dir(upload_id))
+    received = sorted(int(i) for i in manifest["received"])
+    missing = sorted(set(range(manifest["total_chunks"])) - set(received))
+    return {
+        "upload_id": upload_id,
+        "filename": manifest["filename"],
+        "total_size": manifest["total_size"],
+        "chunk_size": manifest["chunk_size"],
+        "total_chunks": manifest["total_chunks"],
+        "received_chunks": received,
+        "missing_chunks": missing,
+        "bytes_received": sum(_chunk_length(manifest, i) for i in received),
+        "verified_prefix_bytes": min(manifest["hashed_chunks"] * manifest["chunk_size"], manifest["total_size"]),
+        "complete": not missing
+    }
+
+
+def _prefix_hasher(upload_id: str, upload_dir: str, manifest: dict):
+    """
+    The running hash of the first manifest['hashed_chunks'] chunks. The cached hash object
+    is reused only when its digest equals the manifest checkpoint; otherwise the prefix is
+    rebuilt from the staging file.
+    """
+    hasher = _prefix_hashers.get(upload_id)
+    if hasher is None or hasher.hexdigest() != manifest["prefix_sha256"]:
+        hasher = hashlib.sha256()
+        with open(os.path.join(upload_dir, DATA_NAME), "rb") as handle:
+            for index in range(manifest["hashed_chunks"]):
+                hasher.update(handle.read(_chunk_length(manifest, index)))
+        _prefix_hashers[upload_id] = hasher
+    return hasher
+
+
+def _advance_prefix(upload_id: str, upload_dir: str, manifest: dict):
+    """Folds chunks that arrived out of order into the prefix hash once the gap closes."""
+    hasher = _prefix_hasher(upload_id, upload_dir, manifest)
+    with open(os.path.join(upload_dir, DATA_NAME), "rb") as handle:
+        while str(manifest["hashed_chunks"]) in manifest["received"]:
+            index = manifest["hashed_chunks"]
+            handle.seek(index * manifest["chunk_size"])
+            hasher.update(handle.read(_chunk_length(manifest, index)))
+            manifest["hashed_chunks"] += 1
+    manifest["prefix_sha256"] = hasher.hexdigest()
+    return hasher
+
+
+def _write_slot(upload_dir: str, manifest: dict, index: int, chunk_path: str):
+    with open(chunk_path, "rb") as source, open(os.path.join(upload_dir, DATA_NAME), "r+b") as target:
+        target.seek(index * manifest["chunk_size"])
+        shutil.copyfileobj(source, target, COPY_BLOCK_SIZE)
+
+
+async def receive_chunk(upload_id: str, index: int, request: Request) -> dict:
+    """
+    Streams one chunk from the request body into a side file and verifies it against
+    the client's X-Chunk-SHA256 header; only a verified chunk is copied into its slot
+    in the staging file, so a failed or corrupted send never touches accepted data.
+    Re-sending a chunk is idempotent; re-sending it with other (verified) bytes replaces
+    it. In-order chunks extend the whole-file hash while they stream in.
+    """
+    upload_dir = _upload_dir(upload_id)
+    manifest = _load_manifest(upload_dir)
+    if index < 0 or index >= manifest["total_chunks"]:
+        raise HTTPException(status_code=400, detail=f"Chunk index {index} is outside 0..{manifest['total_chunks'] - 1}.")
+    expected_digest = (request.headers.get(CHECKSUM_HEADER) or "").lower()
+    if not expected_digest:
+        raise HTTPException(status_code=400, detail="Missing X-Chunk-SHA256 header.")
+
+    if manifest["received"].get(str(index)) == expected_digest:
+        return upload_status(upload_id)
+
+    expected_length = _chunk_length(manifest, index)
+    chunk_hash = hashlib.sha256()
+    in_order = index == manifest["hashed_chunks"]
+    prefix = _prefix_hasher(upload_id, upload_dir, manifest).copy() if in_order else None
+    prefix_checkpoint = manifest["prefix_sha256"]
+    written = 0
+    chunk_path = os.path.join(upload_dir, f"chunk-{index}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        with open(chunk_path, "wb") as handle:
+            async for block in request.stream():
+                if not block:
+                    continue
+                written += len(block)
+                if written > expected_length:
+                    raise HTTPException(status_code=400, detail=f"Chunk {index} must be exactly {expected_length} bytes.")
+                handle.write(block)
+                chunk_hash.update(block)
+                if prefix is not None:
+                    prefix.update(block)
+
+        if written != expected_length:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} must be exactly {expected_length} bytes (got {written}).")
+        if chunk_hash.hexdigest() != expected_digest:
+            raise HTTPException(status_code=400, detail=f"Checksum mismatch for chunk {index}; please resend it.")
+
+        with _manifest_lock(upload_dir):
+            _commit_chunk(upload_id, upload_dir, index, expected_digest, chunk_path, prefix, prefix_checkpoint)
+    finally:
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+    return upload_status(upload_id)
+
+
+def _commit_chunk(upload_id: str, upload_dir: str, index: int, digest: str, chunk_path: str, prefix, prefix_checkpoint: str):
+    """Writes a verified chunk into its slot and records it (caller holds the manifest lock)."""
+    # Re-read the manifest: other chunks may have landed while this one streamed
+    manifest = _load_manifest(upload_dir)
+    _write_slot(upload_dir, manifest, index, chunk_path)
+    previous_digest = manifest["received"].get(str(index))
+    manifest["received"][str(index)] = digest
+    if previous_digest not in (None, digest) and index < manifest["hashed_chunks"]:
+        # Different bytes for a chunk already in the prefix: rewind, rebuilt from disk below
+        manifest["hashed_chunks"] = index
+        manifest["prefix_sha256"] = None
+    elif prefix is not None and manifest["hashed_chunks"] == index and manifest["prefix_sha256"] == prefix_checkpoint:
+        _prefix_hashers[upload_id] = prefix
+        manifest["hashed_chunks"] += 1
+        manifest["prefix_sha256"] = prefix.hexdigest()
+    _advance_prefix(upload_id, upload_dir, manifest)
+    _save_manifest(upload_dir, manifest)
+
+
+def complete_upload(upload_id: str) -> dict:
+    """
+    Verifies every chunk arrived (and the whole-file SHA-256 when one was declared),
+    then hands the assembled file to the staged-ingestion pipeline. Returns the
+    preview payload with an upload_token for /datasets/upload/{token}.
+    """
+    upload_dir = _upload_dir(upload_id)
+    status = upload_status(upload_id)
+    if status["missing_chunks"]:
+        raise HTTPException(status_code=409, detail={"message": "Upload incomplete.", "missing_chunks": status["missing_chunks"]})
+
+    with _manifest_lock(upload_dir):
+        manifest = _load_manifest(upload_dir)
+        digest = _advance_prefix(upload_id, upload_dir, manifest).hexdigest()
+        _save_manifest(upload_dir, manifest)
+    if manifest["sha256"] and manifest["sha256"] != digest:
+        raise HTTPException(status_code=400, detail="Whole-file checksum mismatch; the upload is corrupted.")
+
+    try:
+        payload = staging_service.stage_file(os.path.join(upload_dir, DATA_NAME), manifest["filename"], digest, manifest.get("sheet"))
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        _prefix_hashers.pop(upload_id, None)
+    payload["sha256"] = digest
+    return payload
+
+
+def abort_upload(upload_id: str):
+    shutil.rmtree(_upload_dir(upload_id), ignore_errors=True)
+    _prefix_hashers.pop(upload_id, None)
@@ -0,0 +1,319 @@
+import os
+import json
+import time
+import threading
+import duckdb
+import pyarrow as pa
+import pyarrow.dataset as pads
+from fastapi import HTTPException
+from sqlmodel import Session, select
+from app.models.dataset import Dataset
+from app.core.serialization import dumps, records_fragment, iter_ipc_batches
+from app.services import columnar_store
+
+# Read-only SQL over the canonical columnar files. Every query gets its own in-memory
+# engine with the dataset versions registered as Arrow scans; file, network and
+# extension access is switched off before the user's statement runs.
+SQL_MAX_ROWS = int(os.getenv("AVIS_SQL_MAX_ROWS", "100000"))
+SQL_TIMEOUT_SECONDS = float(os.getenv("AVIS_SQL_TIMEOUT_SECONDS", "30"))
+SQL_MEMORY_LIMIT = os.getenv("AVIS_SQL_MEMORY_LIMIT", "1GB")
+SQL_THREADS = int(os.getenv("AVIS_SQL_THREADS", "0"))  # 0 = engine default (all cores)
+SQL_BATCH_ROWS = 10000
+
+CURRENT_TABLE = "data"
+
+
+# ─────────────────────────────────────────────────────
+# TABLE CATALOG (the dataset and every version in its lineage)
+# ─────────────────────────────────────────────────────
+
+def _lineage(dataset: Dataset, session: Session) -> list:
+    """Root first, then every descendant — siblings from other repair branches included."""
+    root = dataset
+    while root.parent_dataset_id:
+        parent = session.get(Dataset, root.parent_dataset_id)
+        if not parent:
+            break
+        root = parent
+
+    family, frontier = [root], [root.id]
+    while frontier:
+        children = session.exec(select(Dataset).where(Dataset.parent_dataset_id.in_(frontier))).all()
+        family.extend(children)
+        frontier = [c.id for c in children]
+    return family
+
+
+def _ancestor_ids(dataset: Dataset, session: Session) -> set:
+    ids, cursor = set(), dataset
+    while cursor:
+        ids.add(cursor.id)
+        cursor = session.get(Dataset, cursor.parent_dataset_id) if cursor.parent_dataset_id else None
+    return ids
+
+
+def _catalog(dataset_id: int, session: Session) -> list:
+    """
+    [(table_name, dataset)] for the query namespace: 'data' is the requested dataset,
+    'dataset_<id>' addresses any version of the family and 'v<n>' the versions on
+    the requested dataset's own history path (version numbers repeat across branches).
+    """
+    dataset = session.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset record missing in database.")
+    if not dataset.filepath or not os.path.exists(dataset.filepath):
+        raise HTTPException(status_code=404, detail="The cleaned data matrix is missing from storage. Please re-upload.")
+
+    ancestors = _ancestor_ids(dataset, session)
+    tables = [(CURRENT_TABLE, dataset)]
+    for member in _lineage(dataset, session):
+        if not member.filepath or not os.path.exists(member.filepath):
+            continue
+        tables.append((f"dataset_{member.id}", member))
+        if member.id in ancestors and member.version_number is not None:
+            tables.append((f"v{member.version_number}", member))
+    return tables
+
+
+def _datetime_columns(dataset: Dataset, schema: pa.Schema) -> list:
+    """Columns the stored schema parses as datetimes but the canonical file keeps as text."""
+    if not dataset.column_schema:
+        return []
+    try:
+        stored = json.loads(dataset.column_schema)
+    except ValueError:
+        return []
+    return [
+        name for name in schema.names
+        if stored.get(name) == "datetime64[ns]" and pa.types.is_string(schema.field(name).type)
+    ]
+
+
+def _source(dataset: Dataset) -> pads.Dataset:
+    return pads.dataset(columnar_store.ensure_canonical(dataset.filepath), format="parquet")
+
+
+def _quote(identifier: str) -> str:
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+# ─────────────────────────────────────────────────────
+# SANDBOXED ENGINE
+# ─────────────────────────────────────────────────────
+
+def validate_query(sql: str) -> str:
+    """Accepts exactly one SELECT (WITH ... SELECT included); raises 400 otherwise."""
+    if not sql or not sql.strip():
+        raise HTTPException(status_code=400, detail="Query is empty.")
+    try:
+        statements = duckdb.extract_statements(sql)
+    except duckdb.Error as e:
+        raise HTTPException(status_code=400, detail=f"SQL syntax error: {e}")
+    if len(statements) != 1:
+        raise HTTPException(status_code=400, detail="Exactly one statement per query is allowed.")
+    if statements[0].type != duckdb.StatementType.SELECT:
+        raise HTTPException(status_code=400, detail="Only read-only SELECT queries are allowed.")
+    return statements[0].query
+
+
+def _connect(tables: list) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect(":memory:")
+    con.execute(f"SET memory_limit = '{SQL_MEMORY_LIMIT}'")
+    if SQL_THREADS > 0:
+        con.execute(f"SET threads = {SQL_THREADS}")
+
+    for name, dataset in tables:
+        # Arrow dataset scans push projections and filters down to the Parquet row groups
+        source = _source(dataset)
+        raw = f"__raw_{name}"
+        con.register(raw, source)
+        casts = _datetime_columns(dataset, source.schema)
+        if casts:
+            replace = ", ".join(f"TRY_CAST({_quote(c)} AS TIMESTAMP) AS {_quote(c)}" for c in casts)
+            con.execute(f"CREATE VIEW {_quote(name)} AS SELECT * REPLACE ({replace}) FROM {_quote(raw)}")
+        else:
+            con.execute(f"CREATE VIEW {_quote(name)} AS SELECT * FROM {_quote(raw)}")
+
+    # Registered scans keep working; read_csv('/etc/...'), COPY, ATTACH and INSTALL do not
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    return con
+
+
+class _Deadline:
+    """Interrupts the engine once the time budget is spent (covers execution and streaming)."""
+
+    def __init__(self, con):
+        self.started = time.perf_counter()
+        self.expired = threading.Event()
+        self._con = con
+        self._timer = threading.Timer(SQL_TIMEOUT_SECONDS, self._interrupt)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _interrupt(self):
+        self.expired.set()
+        self._con.interrupt()
+
+    def cancel(self):
+        self._timer.cancel()
+
+    @staticmethod
+    def message() -> str:
+        return f"Query exceeded the {SQL_TIMEOUT_SECONDS:g}s time limit."
+
+
+class QueryResult:
+    """
+    A running query. The first batch is fetched on construction so parse, bind and
+    timeout errors surface before any response bytes are sent; the remaining batches
+    are pulled lazily by the response stream until the row limit is reached.
+    """
+
+    def __init__(self, con, reader: pa.RecordBatchReader, limit: int, deadline: "_Deadline"):
+        self.con = con
+        self.schema = reader.schema
+        self.limit = limit
+        self.row_count = 0
+        self.truncated = False
+        self.error = None
+        self._reader = reader
+        self._deadline = deadline
+        self._pending = self._next()
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._deadline.started) * 1000, 2)
+
+    def _next(self):
+        try:
+            return self._reader.read_next_batch()
+        except StopIteration:
+            return None
+
+    def batches(self):
+        """Yields Arrow record batches up to the row limit, then releases the engine."""
+        try:
+            batch = self._pending
+            while batch is not None:
+                room = self.limit - self.row_count
+                if batch.num_rows > room:
+                    batch = batch.slice(0, room)
+                    self.truncated = True
+                if batch.num_rows:
+                    self.row_count += batch.num_rows
+                    yield batch
+                if self.truncated or self.row_count >= self.limit:
+                    # A full page still counts as truncated when more rows are waiting
+                    self.truncated = self.truncated or self._next() is not None
+                    break
+                batch = self._next()
+        except (duckdb.Error, pa.ArrowException, OSError) as e:
+            # Headers are already sent: end the stream and report it in the summary.
+            # Interrupts raised inside the Arrow reader surface as plain OSErrors.
+            self.truncated = True
+            self.error = self._deadline.message() if self._deadline.expired.is_set() else str(e)
+        finally:
+            self.close()
+
+    def close(self):
+        self._deadline.cancel()
+        self.con.close()
+
+    def summary(self) -> dict:
+        return {
+            "row_count": self.row_count,
+            "truncated": self.truncated,
+            "limit": self.limit,
+            "elapsed_ms": self.elapsed_ms,
+            "error": self.error
+        }
+
+
+# ─────────────────────────────────────────────────────
+# STREAMED ENCODINGS
+# ─────────────────────────────────────────────────────
+
+def _json_ready(batch: pa.RecordBatch) -> pa.RecordBatch:
+    # SUM/AVG over integers come back as DECIMAL/HUGEINT; JSON clients expect numbers
+    columns = [
+        col.cast(pa.float64()) if pa.types.is_decimal(col.type) else col
+        for col in batch.columns
+    ]
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def iter_json(result: QueryResult):
+    """
+    Streams {"columns": [...], "rows": [...], row_count, truncated, limit, elapsed_ms, error}.
+    Rows are encoded batch by batch; the summary fields follow the rows because they are
+    only known once the stream has been drained.
+    """
+    columns = [
+        {"name": f.name, "type": "double" if pa.types.is_decimal(f.type) else str(f.type)}
+        for f in result.schema
+    ]
+    yield b'{"columns":' + dumps(columns) + b',"rows":['
+    first = True
+    for batch in result.batches():
+        body = dumps(records_fragment(_json_ready(batch).to_pandas()))[1:-1]
+        if not body:
+            continue
+        yield body if first else b"," + body
+        first = False
+    yield b"]," + dumps(result.summary())[1:]
+
+
+def iter_arrow(result: QueryResult, metadata: dict = None):
+    """Arrow IPC stream of the result batches; request metadata rides in the schema under 'avis'."""
+    schema = result.schema
+    if metadata:
+        schema = schema.with_metadata({**(schema.metadata or {}), b"avis": dumps(metadata)})
+    return iter_ipc_batches(schema, result.batches())
+
+
+def run_query(dataset_id: int, sql: str, session: Session, limit: int = None) -> QueryResult:
+    """
+    Executes a read-only query against the dataset ('data') and its versions.
+    Results are capped at AVIS_SQL_MAX_ROWS rows (a smaller per-request limit is honoured)
+    and the engine is interrupted once AVIS_SQL_TIMEOUT_SECONDS have passed.
+    """
+    query = validate_query(sql)
+    limit = SQL_MAX_ROWS if not limit else max(0, min(int(limit), SQL_MAX_ROWS))
+    con = _connect(_catalog(dataset_id, session))
+
+    deadline = _Deadline(con)
+    try:
+        reader = con.execute(query).to_arrow_reader(SQL_BATCH_ROWS)
+        return QueryResult(con, reader, limit, deadline)
+    except (duckdb.Error, pa.ArrowException, OSError) as e:
+        deadline.cancel()
+        con.close()
+        if deadline.expired.is_set():
+            raise HTTPException(status_code=408, detail=deadline.message())
+        raise HTTPException(status_code=400, detail=f"Query failed: {e}")
+
+
+def list_tables(dataset_id: int, session: Session) -> dict:
+    """Query namespace for a dataset: table names, the versions they map to and their columns."""
+    tables = []
+    for name, dataset in _catalog(dataset_id, session):
+        schema = _source(dataset).schema
+        casts = set(_datetime_columns(dataset, schema))
+        tables.append({
+            "name": name,
+            "dataset_id": dataset.id,
+            "version": dataset.version_number,
+            "filename": dataset.filename,
+            "row_count": dataset.row_count,
+            "columns": [
+                {"name": f.name, "type": "timestamp" if f.name in casts else str(f.type)}
+                for f in schema
+            ]
+        })
+    return {
+        "dataset_id": dataset_id,
+        "tables": tables,
+        "max_rows": SQL_MAX_ROWS,
+        "timeout_seconds": SQL_TIMEOUT_SECONDS
+    }
@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+from fastapi import UploadFile, HTTPException
+from app.core.database import Session
+from app.models.dataset import Dataset
+from app.services import columnar_store, blob_store, ingestion
+from app.services.dataset_service import (
+    UPLOAD_DIR,
+    _save_dataframe,
+    _load_uploaded_frame,
+    profile_upload,
+    build_preview_payload,
+    build_dataset_fields
+)
+
+# Preview results are parked here until the user confirms (or the TTL lapses)
+STAGING_DIR = os.path.join(UPLOAD_DIR, "staging")
+STAGING_TTL_SECONDS = int(os.getenv("AVIS_STAGING_TTL_SECONDS", "3600"))
+MANIFEST_NAME = "manifest.json"
+
+_TOKEN_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _stage_dir(token: str) -> str:
+    if not _TOKEN_PATTERN.match(token or ""):
+        raise HTTPException(status_code=404, detail="Upload token not recognised.")
+    return os.path.join(STAGING_DIR, token)
+
+
+def purge_expired(now: float = None) -> int:
+    """Removes staged uploads older than the TTL. Returns the number purged."""
+    if not os.path.isdir(STAGING_DIR):
+        return 0
+    now = now or time.time()
+    purged = 0
+    for token in os.listdir(STAGING_DIR):
+        path = os.path.join(STAGING_DIR, token)
+        try:
+            if now - os.path.getmtime(path) > STAGING_TTL_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+                purged += 1
+        except OSError:
+            pass
+    return purged
+
+
+def _new_stage() -> tuple:
+    purge_expired()
+    token = uuid.uuid4().hex
+    stage_dir = os.path.join(STAGING_DIR, token)
+    os.makedirs(stage_dir, exist_ok=True)
+    return token, stage_dir
+
+
+def stage_upload(file: UploadFile, sheet: str = None) -> dict:
+    """
+    Functionality 1: Automated Orientation Engine (staged).
+    Parses, audits and scores the upload once, keeps the processed file, its
+    canonical columnar twin and the computed record fields under an upload token,
+    and returns the preview payload plus that token for commit_staged().
+    For Excel uploads `sheet` picks the worksheet and the payload lists all sheets.
+    """
+    token, stage_dir = _new_stage()
+    file_ext = file.filename.split('.')[-1].lower()
+    source_path = os.path.join(stage_dir, f"source.{file_ext}")
+    try:
+        source_sha256 = blob_store.copy_and_hash(file.file, source_path)
+    except Exception:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        raise
+    return _stage_source(token, stage_dir, source_path, file.filename, source_sha256, sheet)
+
+
+def stage_file(path: str, filename: str, source_sha256: str = None, sheet: str = None) -> dict:
+    """Stages a file already on disk (e.g. an assembled resumable upload). The file is moved."""
+    token, stage_dir = _new_stage()
+    file_ext = filename.split('.')[-1].lower()
+    source_path = os.path.join(stage_dir, f"source.{file_ext}")
+    os.replace(path, source_path)
+    return _stage_source(token, stage_dir, source_path, filename, source_sha256, sheet)
+
+
+def _stage_source(token: str, stage_dir: str, source_path: str, filename: str, source_sha256: str = None, sheet: str = None) -> dict:
+    file_ext = filename.split('.')[-1].lower()
+    if source_sha256:
+        source_sha256 = blob_store.source_key(source_sha256, sheet)
+    try:
+        try:
+            df = _load_uploaded_frame(source_path, file_ext, sheet)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"We couldn't read your file. Please check that it is a valid data file. Error: {str(e)}")
+
+        payload = stage_frame(df, filename, file_ext, stage_dir, source_sha256)
+        if file_ext in ('xlsx', 'xls'):
+            payload["sheets"] = ingestion.list_sheets(source_path)
+            payload["sheet"] = sheet or payload["sheets"][0]
+        os.remove(source_path)
+        payload["upload_token"] = token
+        payload["upload_token_ttl_seconds"] = STAGING_TTL_SECONDS
+        return payload
+    except Exception:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        raise
+
+
+def stage_frame(df, filename: str, file_ext: str, stage_dir: str, source_sha256: str = None) -> dict:
+    """Profiles a parsed frame and writes the staged processed/canonical files and manifest."""
+    profile = profile_upload(df, filename)
+
+    stem = os.path.basename(filename).rsplit('.', 1)[0]
+    processed_name = f"{stem}_processed.{file_ext}"
+    processed_path = os.path.join(stage_dir, processed_name)
+    _save_dataframe(profile["df_cleaned"], processed_path, file_ext)
+    columnar_store.write_canonical(profile["df_cleaned"], processed_path)
+
+    manifest = {
+        "filename": filename,
+        "file_ext": file_ext,
+        "processed": processed_name,
+        "source_sha256": source_sha256,
+        "created_at": time.time(),
+        "fields": build_dataset_fields(profile, filename, file_ext)
+    }
+    with open(os.path.join(stage_dir, MANIFEST_NAME), "w") as handle:
+        json.dump(manifest, handle)
+
+    return build_preview_payload(profile, filename, file_ext)
+
+
+def _read_manifest(token: str) -> dict:
+    stage_dir = _stage_dir(token)
+    manifest_path = os.path.join(stage_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise HTTPException(status_code=404, detail="Upload token expired or already committed. Please upload the file again.")
+    with open(manifest_path) as handle:
+        manifest = json.load(handle)
+    if time.time() - manifest["created_at"] > STAGING_TTL_SECONDS:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        raise HTTPException(status_code=404, detail="Upload token expired or already committed. Please upload the file again.")
+    return manifest
+
+
+def commit_staged(token: str, session: Session) -> Dataset:
+    """
+    Functionality 7: Final Handshake and MySQL Persistence (staged).
+    Moves the already-processed files into the blob store and writes the Dataset
+    record; nothing is re-parsed or re-audited.
+    """
+    manifest = _read_manifest(token)
+    stage_dir = _stage_dir(token)
+
+    staged_path = os.path.join(stage_dir, manifest["processed"])
+    blob = blob_store.put_file(session, staged_path, manifest["file_ext"])
+    if manifest.get("source_sha256"):
+        blob_store.remember_source(blob, manifest["source_sha256"], manifest["filename"], manifest["fields"])
+
+    dataset = Dataset(
+        filepath=blob.storage_path,
+        content_hash=blob.sha256,
+        file_size_bytes=blob.size_bytes,
+        **manifest["fields"]
+    )
+    session.add(dataset)
+    session.commit()
+    session.refresh(dataset)
+
+    shutil.rmtree(stage_dir, ignore_errors=True)
+    return dataset
+
+
+def discard_staged(token: str):
+    """Drops a staged upload the user cancelled."""
+    shutil.rmtree(_stage_dir(token), ignore_errors=True)
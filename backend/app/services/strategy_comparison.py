@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.services.eda_service import get_dataframe
+from app.services.eda_service import get_column_names, get_columns
 from app.services.issue_detection import detect_issues
 from app.services.repair_engine import simulate_repair
 
@@ -11,9 +11,10 @@ def compare_repair_strategies(dataset_id: int, column: str, session: Session) ->
     Evaluates up to 5 different strategies, calculates the absolute differential distortion,
     and sorts the output by Highest Health Score followed by Lowest Mathematical Distortion.
     """
-    df = get_dataframe(dataset_id, session)
-    if column != "Entire Dataset" and column not in df.columns:
+    if column != "Entire Dataset" and column not in get_column_names(dataset_id, session):
         raise HTTPException(status_code=400, detail="Column not found")
+    # Routing only looks at the target column; the simulations load what they need
+    df = get_columns(dataset_id, [column] if column != "Entire Dataset" else [], session)
         
     detection_result = detect_issues(dataset_id, session)
     issues = detection_result.get("issues", [])
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import zipfile
+import tempfile
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from app.core.serialization import row_fragments
+from app.services import columnar_store
+
+# Rows encoded per chunk — bounds export memory to one chunk, not the whole dataset
+EXPORT_CHUNK_ROWS = 50000
+FILE_READ_BYTES = 1024 * 1024
+
+EXPORT_FORMATS = ("csv", "tsv", "json", "xml", "xlsx", "parquet")
+
+
+def iter_frames(filepath: str, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yields the dataset as consecutive DataFrame chunks read from the canonical columnar file."""
+    parquet = pq.ParquetFile(columnar_store.ensure_canonical(filepath))
+    emitted = False
+    for batch in parquet.iter_batches(batch_size=chunk_rows):
+        emitted = True
+        yield batch.to_pandas()
+    if not emitted:
+        # Keep the header row for empty datasets
+        yield parquet.schema_arrow.empty_table().to_pandas()
+
+
+def iter_file(path: str, chunk_bytes: int = FILE_READ_BYTES):
+    """Reads a stored file from disk in fixed-size chunks."""
+    with open(path, "rb") as handle:
+        while True:
+            block = handle.read(chunk_bytes)
+            if not block:
+                break
+            yield block
+
+
+def _iter_delimited(filepath: str, sep: str):
+    header = True
+    for chunk in iter_frames(filepath):
+        yield chunk.to_csv(index=False, sep=sep, header=header).encode("utf-8")
+        header = False
+
+
+def _iter_json(filepath: str):
+    # Records array written one row per line, chunk by chunk (no full buffer), with the
+    # API's encoding: shortest round-trip floats and ISO dates
+    yield b"["
+    first = True
+    for chunk in iter_frames(filepath):
+        if chunk.empty:
+            continue
+        body = b",\n".join(row_fragments(chunk))
+        yield (b"\n" if first else b",\n") + body
+        first = False
+    yield b"\n]"
+
+
+def _iter_xml(filepath: str):
+    yield b"<?xml version='1.0' encoding='utf-8'?>\n<data>\n"
+    for chunk in iter_frames(filepath):
+        if chunk.empty:
+            continue
+        body = chunk.to_xml(index=False, xml_declaration=False, root_name="data")
+        # Strip the per-chunk <data> wrapper so all rows share one document root
+        inner = body[body.index(">") + 1:body.rindex("</data>")].strip("\n")
+        yield (inner + "\n").encode("utf-8")
+    yield b"</data>\n"
+
+
+def iter_encoded(filepath: str, fmt: str):
+    """
+    Encodes the dataset into a streaming text/binary format chunk by chunk.
+    Supports csv, tsv, json and xml. Excel needs a seekable target (see write_spooled)
+    and Parquet is served straight from the canonical file.
+    """
+    if fmt == "csv":
+        return _iter_delimited(filepath, ",")
+    if fmt == "tsv":
+        return _iter_delimited(filepath, "\t")
+    if fmt == "json":
+        return _iter_json(filepath)
+    if fmt == "xml":
+        return _iter_xml(filepath)
+    raise ValueError(f"'{fmt}' cannot be chunk-encoded")
+
+
+def write_spooled(filepath: str, fmt: str) -> str:
+    """
+    Writes Excel workbooks to a temporary file chunk by chunk (openpyxl write-only
+    mode) so only one chunk is ever resident. Returns the temp path; the caller is
+    responsible for removing it.
+    """
+    handle, tmp_path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(handle)
+
+    if fmt in ("xlsx", "xls"):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        header = True
+        for chunk in iter_frames(filepath):
+            if header:
+                sheet.append([str(c) for c in chunk.columns])
+                header = False
+            for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+                sheet.append([_excel_safe(v) for v in row])
+        workbook.save(tmp_path)
+        return tmp_path
+
+    os.remove(tmp_path)
+    raise ValueError(f"'{fmt}' is not a container format")
+
+
+# ─────────────────────────────────────────────────────
+# STREAMING ZIP (entries are deflated and emitted as they are produced)
+# ─────────────────────────────────────────────────────
+
+# Formats that are already compressed gain nothing from deflate
+_PRECOMPRESSED = ("xlsx", "xls", "parquet", "zip")
+
+
+class _ZipSink:
+    """
+    Non-seekable write target for zipfile. Without tell()/seek() zipfile falls back
+    to data descriptors, so every entry can be flushed to the client immediately.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip(entries):
+    """
+    Streams a ZIP archive. `entries` yields (name, chunks) pairs where chunks is an
+    iterable of bytes/str, or a zero-argument callable returning one (so expensive
+    entries are only produced when the archive reaches them).
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, chunks in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            stored = name.rsplit(".", 1)[-1].lower() in _PRECOMPRESSED
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            if callable(chunks):
+                chunks = chunks()
+            with archive.open(info, "w", force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _excel_safe(value):
+    if hasattr(value, "to_pydatetime"):
+        return value.to_pydatetime().replace(tzinfo=None)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
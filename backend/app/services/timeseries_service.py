@@ -0,0 +1,229 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from fastapi import HTTPException
+from sqlmodel import Session
+from app.models.dataset import Dataset
+from app.services import columnar_store, index_service, out_of_core
+from app.services.eda_service import get_column_names
+from app.services.aggregation_service import (
+    _build_cube, _rollup, _finalize_cube, _finalize_rows, _is_decomposable, _value_columns, _validate
+)
+
+# Resampling of datetime columns (detected at ingestion by the stored dtype schema) into
+# calendar buckets. Each dataset version keeps a sorted time index per column; the first
+# request builds a base rollup at the finest granularity that stays under BASE_MAX_BUCKETS,
+# and every coarser granularity that nests in it is a roll-up of those partials.
+GRANULARITIES = ("minute", "hour", "day", "week", "month", "quarter", "year")
+AUTO = "auto"
+
+_SECOND = 1_000_000_000
+_APPROX_NS = {
+    "minute": 60 * _SECOND,
+    "hour": 3600 * _SECOND,
+    "day": 86400 * _SECOND,
+    "week": 7 * 86400 * _SECOND,
+    "month": int(30.44 * 86400 * _SECOND),
+    "quarter": int(91.31 * 86400 * _SECOND),
+    "year": int(365.25 * 86400 * _SECOND),
+}
+_FIXED_NS = {"minute": _APPROX_NS["minute"], "hour": _APPROX_NS["hour"], "day": _APPROX_NS["day"]}
+
+# Auto granularity picks the finest bucket that keeps a chart under this many points
+MAX_AUTO_POINTS = int(os.getenv("AVIS_TIMESERIES_POINTS", "500"))
+# Explicit granularities are cut off here (flagged as truncated)
+MAX_POINTS = 10000
+BASE_MAX_BUCKETS = 200_000
+
+
+def check_granularity(granularity: str) -> str:
+    granularity = (granularity or AUTO).lower()
+    if granularity != AUTO and granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown granularity '{granularity}'. Use auto or one of: {', '.join(GRANULARITIES)}"
+        )
+    return granularity
+
+
+def bucket_starts(times: np.ndarray, granularity: str) -> np.ndarray:
+    """Floors epoch-nanosecond timestamps to the start of their bucket (weeks start on Monday)."""
+    if granularity in _FIXED_NS:
+        return times // _FIXED_NS[granularity] * _FIXED_NS[granularity]
+    if granularity == "week":
+        days = times // _FIXED_NS["day"]
+        # 1970-01-01 was a Thursday: (days + 3) % 7 is 0 on Mondays
+        return (days - (days + 3) % 7) * _FIXED_NS["day"]
+    stamps = times.astype("datetime64[ns]")
+    if granularity == "year":
+        return stamps.astype("datetime64[Y]").astype("datetime64[ns]").view("int64")
+    months = stamps.astype("datetime64[M]").astype("int64")
+    if granularity == "quarter":
+        months = months - months % 3
+    return months.astype("datetime64[M]").astype("datetime64[ns]").view("int64")
+
+
+def _nests(base: str, target: str) -> bool:
+    """True when every target bucket is a union of base buckets."""
+    if GRANULARITIES.index(target) < GRANULARITIES.index(base):
+        return False
+    return base != "week" or target == "week"
+
+
+def _finest_within(span: int, max_buckets: int) -> str:
+    for granularity in GRANULARITIES:
+        if span // _APPROX_NS[granularity] + 1 <= max_buckets:
+            return granularity
+    return GRANULARITIES[-1]
+
+
+# ─────────────────────────────────────────────────────
+# SORTED TIME INDEX & BASE ROLLUPS (cached per dataset version)
+# ─────────────────────────────────────────────────────
+
+@lru_cache(maxsize=16)
+def _time_index(filepath: str, mtime_ns: int, column: str) -> dict:
+    """
+    Row ids ordered by time and the matching epoch-ns timestamps (nulls dropped).
+    Text dates kept as strings in the canonical file are parsed like the dtype schema does.
+    """
+    series = columnar_store.read_column(filepath, column)
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, errors="coerce")
+    times = series.to_numpy(dtype="datetime64[ns]").view("int64")
+    rows = np.flatnonzero(~np.isnat(times.view("datetime64[ns]")))
+    order = rows[np.argsort(times[rows], kind="stable")]
+    return {"order": order, "times": times[order]}
+
+
+def _window(index: dict, filepath: str, filters_key: str, start, end, date_columns: tuple) -> tuple:
+    """(row ids, times) in time order, restricted to [start, end) and the row filters."""
+    order, times = index["order"], index["times"]
+    low = np.searchsorted(times, start, side="left") if start is not None else 0
+    high = np.searchsorted(times, end, side="left") if end is not None else len(times)
+    order, times = order[low:high], times[low:high]
+    filters = json.loads(filters_key)
+    if filters:
+        matched = index_service.match_rows(filepath, columnar_store.get_layout(filepath)["columns"], filters, date_columns)
+        keep = np.isin(order, matched)
+        order, times = order[keep], times[keep]
+    return order, times
+
+
+def _frame(filepath: str, order: np.ndarray, buckets: np.ndarray, value_columns: tuple) -> pd.DataFrame:
+    frame = pd.DataFrame({"bucket": buckets})
+    for col in value_columns:
+        values = columnar_store.read_column(filepath, col).to_numpy()[order]
+        frame[col] = values.astype("float64") if values.dtype == bool else values
+    return frame
+
+
+@lru_cache(maxsize=32)
+def _base_rollup(filepath: str, mtime_ns: int, time_col: str, value_columns: tuple, filters_key: str,
+                 date_columns: tuple) -> dict:
+    """Partials (rows, count, sum, M2, min, max) per base bucket over the whole time range."""
+    order, times = _window(_time_index(filepath, mtime_ns, time_col), filepath, filters_key, None, None, date_columns)
+    span = int(times[-1] - times[0]) if len(times) else 0
+    base = _finest_within(span, BASE_MAX_BUCKETS)
+    # Rows are already in time order, so first-seen grouping yields sorted buckets
+    cube = _build_cube(_frame(filepath, order, bucket_starts(times, base), value_columns), ["bucket"], list(value_columns))
+    return {"granularity": base, "cube": cube}
+
+
+def _coerce_time(value, name: str):
+    if value in (None, ""):
+        return None
+    try:
+        stamp = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=f"'{name}' is not a valid timestamp: {value}")
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_convert("UTC").tz_localize(None)
+    return int(stamp.value)
+
+
+# ─────────────────────────────────────────────────────
+# PUBLIC ENTRY POINT
+# ─────────────────────────────────────────────────────
+
+def resample(dataset_id: int, time_col: str, measures: list, session: Session, granularity: str = AUTO,
+             start=None, end=None, filters: list = None) -> dict:
+    """
+    Aggregates `measures` ({name, agg, column}) per time bucket of `time_col`, oldest first.
+    granularity='auto' picks the finest bucket keeping the series under MAX_AUTO_POINTS.
+    start/end (ISO timestamps) restrict the range; pre-computed rollups are cut at base-bucket
+    boundaries, so the window is exact to the base granularity.
+    """
+    granularity = check_granularity(granularity)
+    dataset = session.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset record missing in database.")
+    available = get_column_names(dataset_id, session)
+    for col in [time_col] + _value_columns(measures):
+        if col not in available:
+            raise HTTPException(status_code=400, detail=f"Column '{col}' not found")
+    dtypes = out_of_core.empty_frame(dataset, list(dict.fromkeys([time_col] + _value_columns(measures))))
+    if not pd.api.types.is_datetime64_any_dtype(dtypes[time_col]):
+        raise HTTPException(status_code=400, detail=f"Column '{time_col}' is not a datetime column")
+    _validate(dtypes, [time_col], measures)
+
+    low, high = _coerce_time(start, "start"), _coerce_time(end, "end")
+    filepath = dataset.filepath
+    mtime_ns = os.stat(filepath).st_mtime_ns
+    filters_key = json.dumps(filters or [], sort_keys=True, default=str)
+    date_columns = index_service.schema_dates(dataset) if filters else ()
+    index = _time_index(filepath, mtime_ns, time_col)
+
+    # Span of the requested window decides the automatic granularity
+    times = index["times"]
+    first = np.searchsorted(times, low) if low is not None else 0
+    stop = np.searchsorted(times, high) if high is not None else len(times)
+    span = int(times[stop - 1] - times[first]) if stop > first else 0
+    chosen = _finest_within(span, MAX_AUTO_POINTS) if granularity == AUTO else granularity
+
+    value_columns = tuple(_value_columns(measures))
+    source = "rows"
+    if all(_is_decomposable(m) for m in measures):
+        base = _base_rollup(filepath, mtime_ns, time_col, value_columns, filters_key, date_columns)
+        if _nests(base["granularity"], chosen):
+            cube = base["cube"]
+            if low is not None or high is not None:
+                starts = cube.index.to_numpy()
+                keep = np.ones(len(starts), dtype=bool)
+                if low is not None:
+                    keep &= starts >= bucket_starts(np.array([low]), base["granularity"])[0]
+                if high is not None:
+                    keep &= starts < high
+                cube = cube[keep]
+            rebucketed = cube.copy()
+            rebucketed.index = pd.Index(bucket_starts(cube.index.to_numpy(), chosen), name="bucket")
+            result = _finalize_cube(_rollup(rebucketed, ["bucket"]), measures)
+            source = "rollup"
+    if source == "rows":
+        order, window_times = _window(index, filepath, filters_key, low, high, date_columns)
+        frame = _frame(filepath, order, bucket_starts(window_times, chosen), value_columns)
+        result = _finalize_rows(frame, ["bucket"], measures)
+
+    result = result.sort_index()
+    truncated = len(result) > MAX_POINTS
+    result = result.head(MAX_POINTS)
+    rows = result.reset_index()
+    rows.columns = [time_col] + list(result.columns)
+    rows[time_col] = pd.to_datetime(rows[time_col].to_numpy(dtype="int64"))
+
+    return {
+        "time_column": time_col,
+        "granularity": chosen,
+        "measures": measures,
+        "rows": rows,
+        "meta": {
+            "auto": granularity == AUTO,
+            "buckets": len(rows),
+            "truncated": truncated,
+            "source": source,
+            "window": {"start": start, "end": end},
+            "filters": filters or []
+        }
+    }
@@ -0,0 +1,238 @@
+import re
+import numpy as np
+import pandas as pd
+from app.services import dtype_optimizer, column_profiler
+
+# "Values stored as text" detection shared by ingestion, issue detection and previews.
+# A text column is tested on a stratified sample first; only the kinds the sample makes
+# plausible are confirmed over the whole column, and that pass parses each distinct
+# value once. Verdicts for stored datasets are kept in their column profiles (profile_service).
+KINDS = ("numeric", "currency", "boolean", "date")
+# Kinds recognised by their text pattern rather than by being numbers
+PATTERN_KINDS = ("currency", "boolean", "date")
+EXPECTED_TYPES = {"numeric": "Number", "currency": "Number", "boolean": "Boolean", "date": "Date"}
+DESCRIPTIONS = {
+    "numeric": "Numeric data stored as text",
+    "currency": "Currency amounts stored as text",
+    "boolean": "True/false values stored as text",
+    "date": "Dates stored as text",
+}
+
+# Share of the non-empty values that must parse for a column to be flagged
+MISMATCH_RATIO = 0.8
+# A kind is confirmed over the full column only when the sample reaches this share
+CANDIDATE_RATIO = 0.5
+SAMPLE_SIZE = 1024
+SAMPLE_STRATA = 16
+SAMPLE_ROWS = 20
+
+_SYMBOLS = "$€£¥₹"
+_AMOUNT = r"(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|\.\d+"
+_CURRENCY = re.compile(
+    rf"^\(?[-+]?\s*(?:[{_SYMBOLS}]\s*[-+]?\s*(?:{_AMOUNT})|(?:{_AMOUNT})\s*[{_SYMBOLS}]|\d{{1,3}}(?:,\d{{3}})+(?:\.\d+)?)\)?$"
+)
+_TRUE = {"true", "yes", "y", "t"}
+_FALSE = {"false", "no", "n", "f"}
+
+
+# ─────────────────────────────────────────────────────
+# VALUE PARSERS (one call per distinct value)
+# ─────────────────────────────────────────────────────
+
+def _as_text(values: pd.Series) -> pd.Series:
+    return values.astype(str).str.strip()
+
+
+def _currency_number(values: pd.Series) -> pd.Series:
+    text = _as_text(values)
+    negative = text.str.startswith("(") & text.str.endswith(")")
+    digits = text.str.replace(rf"[{_SYMBOLS},()\s]", "", regex=True)
+    numbers = pd.to_numeric(digits.where(text.str.fullmatch(_CURRENCY)), errors="coerce")
+    return numbers.where(~negative, -numbers)
+
+
+def _parse(values: pd.Series, kind: str) -> pd.Series:
+    """Parsed values of `kind` (NaN/NaT/NA where a value does not fit)."""
+    if kind == "numeric":
+        return pd.to_numeric(values, errors="coerce")
+    if kind == "currency":
+        numbers = pd.to_numeric(values, errors="coerce")
+        return numbers.fillna(_currency_number(values))
+    if kind == "boolean":
+        lowered = _as_text(values).str.lower()
+        return lowered.map(lambda v: True if v in _TRUE else False if v in _FALSE else None).astype("boolean")
+    if kind == "date":
+        text = _as_text(values)
+        candidates = text.where(text.str.match(dtype_optimizer._DATE_LIKE))
+        return pd.to_datetime(candidates, errors="coerce", format="mixed")
+    raise ValueError(f"Unknown value kind '{kind}'")
+
+
+def _parses(values: pd.Series, kind: str) -> np.ndarray:
+    return _parse(values.reset_index(drop=True), kind).notna().to_numpy(dtype=bool)
+
+
+def _distinct(series: pd.Series) -> tuple:
+    """(codes, distinct values) with -1 codes for empty cells."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), pd.Series(series.cat.categories, dtype=object)
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Series(uniques, dtype=object)
+
+
+def parsed_mask(series: pd.Series, kind: str) -> np.ndarray:
+    """Row mask of the values that parse as `kind` (False for empty cells)."""
+    codes, uniques = _distinct(series)
+    parsed = np.zeros(len(series), dtype=bool)
+    present = codes >= 0
+    if len(uniques):
+        parsed[present] = _parses(uniques, kind)[codes[present]]
+    return parsed
+
+
+def _stratified_sample(values: pd.Series) -> pd.Series:
+    """Up to SAMPLE_SIZE values drawn evenly from SAMPLE_STRATA contiguous blocks."""
+    if len(values) <= SAMPLE_SIZE:
+        return values
+    rng = np.random.default_rng(len(values))
+    bounds = np.linspace(0, len(values), SAMPLE_STRATA + 1).astype(np.int64)
+    per_stratum = SAMPLE_SIZE // SAMPLE_STRATA
+    positions = np.concatenate([
+        rng.choice(np.arange(low, high), size=min(per_stratum, high - low), replace=False)
+        for low, high in zip(bounds[:-1], bounds[1:])
+    ])
+    return values.iloc[np.sort(positions)]
+
+
+def candidate_kinds(values: pd.Series) -> list:
+    """Kinds the non-empty `values` plausibly hold, judged from a stratified sample."""
+    sample = _stratified_sample(values)
+    if sample.empty:
+        return []
+    codes, uniques = pd.factorize(sample)
+    return [
+        kind for kind in KINDS
+        if _parses(pd.Series(uniques, dtype=object), kind)[codes].mean() >= CANDIDATE_RATIO
+    ]
+
+
+# ─────────────────────────────────────────────────────
+# VERDICTS
+# ─────────────────────────────────────────────────────
+
+def _verdict(column, dtype: str, kind, present: int, parsed: int, bad_rows: list, sampled: bool) -> dict:
+    return {
+        "column": column,
+        "dtype": dtype,
+        "kind": kind,
+        "expected_type": EXPECTED_TYPES.get(kind),
+        "present": present,
+        "parsed": parsed,
+        "bad_count": present - parsed if kind else 0,
+        "bad_rows": bad_rows if kind else [],
+        "sampled": sampled,
+    }
+
+
+def infer_column(series: pd.Series) -> dict:
+    """
+    Verdict for one text column: the first kind (numeric, currency, boolean, date) that
+    more than MISMATCH_RATIO of the non-empty values parse as, or kind None.
+    bad_rows holds the positions of the first SAMPLE_ROWS values that do not parse.
+    """
+    present_mask = series.notna().to_numpy()
+    present = int(present_mask.sum())
+    dtype = str(series.dtype)
+    if present == 0:
+        return _verdict(series.name, dtype, None, 0, 0, [], False)
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Categories are already the distinct values: test them all, no sample needed
+        kinds, sampled = list(KINDS), False
+    else:
+        kinds, sampled = candidate_kinds(series[present_mask]), True
+
+    for kind in kinds:
+        parsed = parsed_mask(series, kind)
+        parsed_count = int(parsed.sum())
+        if parsed_count > MISMATCH_RATIO * present:
+            bad_rows = np.flatnonzero(present_mask & ~parsed)[:SAMPLE_ROWS].tolist()
+            return _verdict(series.name, dtype, kind, present, parsed_count, bad_rows, sampled)
+    return _verdict(series.name, dtype, None, present, 0, [], sampled)
+
+
+def infer_frame(df: pd.DataFrame) -> list:
+    """Verdicts for every text column of the frame, in column order."""
+    text_columns = [col for col in df.columns if dtype_optimizer.is_text_dtype(df[col])]
+    return column_profiler.map_columns(df, infer_column, text_columns)
+
+
+def mismatches(verdicts: list) -> list:
+    """
+    Verdicts that are data-type issues. Pattern kinds (dates, flags, amounts) whose values
+    all match are not: the stored dtype schema turns text dates into datetimes on every
+    load, and clean yes/no or currency text is a representation choice, not bad data.
+    Text numbers are always reported.
+    """
+    return [v for v in verdicts if v["kind"] and not (v["kind"] in PATTERN_KINDS and v["bad_count"] == 0)]
+
+
+class VerdictAccumulator:
+    """
+    Mergeable counterpart of infer_column for chunked scans. Kinds are dropped as soon as
+    their unparsed values rule them out for the whole column (total_rows is known upfront).
+    """
+
+    def __init__(self, column, dtype: str, total_rows: int):
+        self.column = column
+        self.dtype = dtype
+        self.total_rows = total_rows
+        self.present = 0
+        self.kinds = list(KINDS)
+        self.parsed = {k: 0 for k in KINDS}
+        self.bad_rows = {k: [] for k in KINDS}
+
+    def update(self, series: pd.Series, row_ids: np.ndarray):
+        present_mask = series.notna().to_numpy()
+        self.present += int(present_mask.sum())
+        for kind in list(self.kinds):
+            parsed = parsed_mask(series, kind)
+            self.parsed[kind] += int(parsed.sum())
+            if len(self.bad_rows[kind]) < SAMPLE_ROWS:
+                bad = row_ids[present_mask & ~parsed]
+                self.bad_rows[kind].extend(bad[:SAMPLE_ROWS - len(self.bad_rows[kind])].tolist())
+            if self.present - self.parsed[kind] >= (1 - MISMATCH_RATIO) * self.total_rows:
+                self.kinds.remove(kind)
+
+    def verdict(self) -> dict:
+        for kind in self.kinds:
+            if self.present and self.parsed[kind] > MISMATCH_RATIO * self.present:
+                return _verdict(self.column, self.dtype, kind, self.present, self.parsed[kind], self.bad_rows[kind], False)
+        return _verdict(self.column, self.dtype, None, self.present, 0, [], False)
+
+
+# ─────────────────────────────────────────────────────
+# CONVERSION
+# ─────────────────────────────────────────────────────
+
+def convert(series: pd.Series, kind: str = None) -> pd.Series:
+    """
+    Converts a text column to its inferred kind (values that do not fit become empty).
+    Without an explicit kind the column's own verdict decides, falling back to numbers.
+    """
+    if kind is None:
+        kind = infer_column(series)["kind"] or "numeric"
+    codes, uniques = _distinct(series)
+    # Parse each distinct value once; empty cells (code -1) come back empty
+    converted = _parse(uniques, kind).reindex(codes)
+    converted.index = series.index
+    converted.name = series.name
+    return converted
+
+
+def convert_to(series: pd.Series, expected_type: str) -> pd.Series:
+    """convert() towards an expected type label (Number, Boolean, Date) picked by the user."""
+    kind = infer_column(series)["kind"]
+    if EXPECTED_TYPES.get(kind) != expected_type:
+        kind = next((k for k in KINDS if EXPECTED_TYPES[k] == expected_type), "numeric")
+    return convert(series, kind)
@@ -2,14 +2,39 @@ import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.services.eda_service import get_dataframe
+from app.models.dataset import Dataset
+from app.services.eda_service import get_column_names, get_columns
+from app.services import out_of_core, aggregation_service, timeseries_service
 
-def get_chart_data(dataset_id: int, x_col: str, chart_type: str, y_col: str = None, session: Session = None):
+AGGREGATED_CHARTS = ('bar', 'line', 'area')
+AGGREGATION_LABELS = {"mean": "Average", "sum": "Total", "count": "Count", "median": "Median",
+                      "min": "Minimum", "max": "Maximum", "std": "Std. deviation", "nunique": "Distinct count"}
+
+def get_chart_data(dataset_id: int, x_col: str, chart_type: str, y_col: str = None, session: Session = None, filters: list = None,
+                   agg: str = "mean", top_k: int = 50, others: bool = False,
+                   granularity: str = "auto", start: str = None, end: str = None):
     """
     Functionality 4: High-Fidelity Visualization Node.
     Reformats raw database matrices into Plotly-compliant arrays (x, y).
+    Only the x/y columns are loaded; datasets above the out-of-core threshold are
+    aggregated one row group at a time. `filters` ({column, op, value} predicates, as
+    in the row drilldown) restrict the chart to matching rows. Bar/line/area charts
+    aggregate y with `agg` (mean, sum, median, p90, ...). Bars keep the top_k groups by
+    value, optionally folding the rest into an "Others" bar; lines and areas keep the
+    first top_k x values so the axis stays contiguous. Over a datetime x axis they
+    are resampled into minute..year buckets (`granularity`, auto by default) between
+    the optional `start`/`end` timestamps.
     """
-    df = get_dataframe(dataset_id, session)
+    dataset = session.get(Dataset, dataset_id) if session is not None else None
+    streamed = out_of_core.enabled_for(dataset)
+    available = get_column_names(dataset_id, session)
+    plotted = [c for c in (x_col, y_col) if c and c in available]
+    if streamed or chart_type in AGGREGATED_CHARTS:
+        # Grouped charts are computed by the aggregation service; only dtypes are needed here
+        df = out_of_core.empty_frame(dataset, plotted)
+    else:
+        # Only the plotted columns are read from the columnar store
+        df = get_columns(dataset_id, plotted, session, filters=filters)
     
     if x_col not in df.columns:
         raise HTTPException(status_code=400, detail=f"Column '{x_col}' not found")
@@ -20,29 +45,48 @@ def get_chart_data(dataset_id: int, x_col: str, chart_type: str, y_col: str = No
         y_label = "Count"
         
         # --- LOGIC LAYER: DATA AGGREGATION & FORMATTING ---
-        if chart_type in ['bar', 'line', 'area']:
+        if chart_type in AGGREGATED_CHARTS:
             if y_col and y_col in df.columns:
                 # Forensic Check: Is Y numeric?
                 if pd.api.types.is_numeric_dtype(df[y_col]):
-                    grouped = df.groupby(x_col)[y_col].mean().reset_index()
-                    y_label = f"Average of {y_col}"
+                    measure = f"{agg}:{y_col}"
+                    y_label = f"{AGGREGATION_LABELS.get(agg, agg.upper())} of {y_col}"
                 else:
                     # Fallback: Count occurrences if Y is categorical
-                    grouped = df.groupby(x_col).size().reset_index(name='count')
+                    measure = "count"
                     y_label = "Frequency Count"
+                sort_by, descending = x_col, False
             else:
                 # Basic frequency count for single-axis analysis
-                grouped = df[x_col].value_counts().reset_index()
-                grouped.columns = [x_col, 'count']
+                measure = "count"
                 y_label = "Total Count"
+                sort_by, descending = "count", True
 
-            # Clean, sort, and limit to ensure UI stability
-            grouped = grouped.dropna().head(50)
+            measures = aggregation_service.parse_measures([measure])
+            if pd.api.types.is_datetime64_any_dtype(df[x_col]):
+                # Time axis: calendar buckets in time order instead of one point per timestamp
+                result = timeseries_service.resample(
+                    dataset_id, x_col, measures, session, granularity=granularity,
+                    start=start, end=end, filters=filters
+                )
+            elif chart_type == 'bar':
+                # Top-k groups ranked by the measure (not the first k keys), in axis order
+                result = aggregation_service.aggregate(
+                    dataset_id, [x_col], measures, session,
+                    sort_by=sort_by, descending=descending, top_k=top_k, others=others, filters=filters
+                )
+            else:
+                # Lines and areas need a contiguous axis: the first top_k keys in x order
+                result = aggregation_service.aggregate(
+                    dataset_id, [x_col], measures, session,
+                    sort_by=x_col, descending=False, filters=filters, limit=top_k
+                )
+            grouped = result["rows"].dropna()
             x_data = grouped[x_col].tolist()
-            y_data = grouped.iloc[:, 1].tolist() # Use the calculated mean or count
+            y_data = grouped.iloc[:, 1].tolist() # Use the calculated measure or count
 
         elif chart_type == 'pie':
-            counts = df[x_col].value_counts().head(10)
+            counts = out_of_core.value_counts(dataset, x_col, top=10, filters=filters) if streamed else df[x_col].value_counts().head(10)
             x_data = counts.index.tolist()
             y_data = counts.values.tolist()
             y_label = "Proportional Distribution"
@@ -52,7 +96,12 @@ def get_chart_data(dataset_id: int, x_col: str, chart_type: str, y_col: str = No
                 raise HTTPException(status_code=400, detail="Scatter plots require an intersect (Y) dimension.")
             
             # Sampling for high-performance rendering (Deterministic)
-            plot_df = df[[x_col, y_col]].dropna().sample(min(len(df), MAX_POINTS), random_state=42)
+            if streamed:
+                plot_df, total_points = out_of_core.sample_pairs(dataset, x_col, y_col, MAX_POINTS, filters=filters)
+            else:
+                pairs = df[[x_col, y_col]].dropna()
+                plot_df = pairs.sample(min(len(pairs), MAX_POINTS), random_state=42)
+                total_points = len(pairs)
             x_data = plot_df[x_col].tolist()
             y_data = plot_df[y_col].tolist()
             y_label = y_col
@@ -78,10 +127,10 @@ def get_chart_data(dataset_id: int, x_col: str, chart_type: str, y_col: str = No
 
         # Indicate if we downsampled for performance
         is_downsampled = False
-        if chart_type == 'scatter' and len(df) > MAX_POINTS:
+        if chart_type == 'scatter' and total_points > MAX_POINTS:
             is_downsampled = True
 
-        return {
+        chart = {
             "data": [trace],
             "layout": {
                 "title": f"Forensic Audit: {x_col} Analysis",
@@ -94,10 +143,19 @@ def get_chart_data(dataset_id: int, x_col: str, chart_type: str, y_col: str = No
             },
             "meta": {
                 "downsampled": is_downsampled,
-                "limit": MAX_POINTS
+                "limit": MAX_POINTS,
+                "execution_mode": "out_of_core" if streamed else "in_memory",
+                "filters": filters or []
             }
         }
+        if chart_type in AGGREGATED_CHARTS:
+            chart["meta"]["aggregation"] = result["meta"]
+            if "granularity" in result:
+                chart["meta"]["granularity"] = result["granularity"]
+        return chart
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Standardized Forensic Error Mapping
         raise HTTPException(status_code=500, detail=f"Visualization Node Failure: {str(e)}")
\ No newline at end of file
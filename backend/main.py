@@ -5,7 +5,9 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.database import create_db_and_tables
-from app.api.endpoints import datasets, eda, viz, auth, insights, chat, preparation, downloads, repair, repair_analysis, strategy_analysis, quality, version
+from app.core.serialization import FastJSONResponse
+from app.core.http_cache import ConditionalGetMiddleware
+from app.api.endpoints import datasets, eda, viz, auth, insights, chat, preparation, downloads, repair, repair_analysis, strategy_analysis, quality, version, sql
 from contextlib import asynccontextmanager
 import time
 import logging
@@ -32,7 +34,8 @@ app = FastAPI(
     title="A.V.I.S. - Analytical Visual Intelligence System",
     description="Advanced Forensic Backend for Automated Data Analysis (AMAP)",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Advanced CORS Configuration: Dynamic environment handling
@@ -49,8 +52,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Conditional GETs: analysis responses carry strong ETags derived from dataset content
+app.add_middleware(ConditionalGetMiddleware)
+
 # Forensic Middleware: Tracks request latency and audit IDs
 @app.middleware("http")
 async def audit_request_middleware(request: Request, call_next):
@@ -108,6 +115,9 @@ app.include_router(quality.router, prefix="/api/quality", tags=["Dataset Quality
 # Node 14: Version Tracking History
 app.include_router(version.router, prefix="/api/versions", tags=["Versioning"])
 
+# Node 15: Read-only SQL over stored datasets and their versions
+app.include_router(sql.router, prefix="/api/sql", tags=["Query Node"])
+
 @app.get("/", tags=["Diagnostic"])
 def read_root():
     return {
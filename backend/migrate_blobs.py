@@ -0,0 +1,27 @@
+import os
+import urllib.parse
+from sqlalchemy import create_engine, text
+
+# Reuse the encoded logic configured in main
+DB_USER = "root"
+DB_PASSWORD = urllib.parse.quote_plus("Dashvanth@raj@0606")
+DB_HOST = "localhost"
+DB_NAME = "AVIS_DB"
+
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+engine = create_engine(DATABASE_URL)
+
+with engine.connect() as conn:
+    print("Initiating Content-Addressed Storage Upgrade")
+    try:
+        conn.execute(text("ALTER TABLE dataset ADD COLUMN content_hash VARCHAR(64) DEFAULT NULL;"))
+        print(" -> Added content_hash column")
+        conn.execute(text("CREATE INDEX ix_dataset_content_hash ON dataset (content_hash);"))
+        print(" -> Indexed content_hash")
+    except Exception as e:
+        print(f" -> content_hash already exists or error: {e}")
+
+    # The storedblob table itself is created by create_db_and_tables() on startup.
+    # Existing datasets keep their legacy paths (content_hash NULL) until re-uploaded.
+    conn.commit()
+    print("Content-Addressed Storage Migration Finalized successfully.")
@@ -0,0 +1,24 @@
+import os
+import urllib.parse
+from sqlalchemy import create_engine, text
+
+# Reuse the encoded logic configured in main
+DB_USER = "root"
+DB_PASSWORD = urllib.parse.quote_plus("Dashvanth@raj@0606")
+DB_HOST = "localhost"
+DB_NAME = "AVIS_DB"
+
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+engine = create_engine(DATABASE_URL)
+
+with engine.connect() as conn:
+    print("Initiating Column Schema Upgrade")
+    try:
+        conn.execute(text("ALTER TABLE dataset ADD COLUMN column_schema TEXT DEFAULT NULL;"))
+        print(" -> Added column_schema column")
+    except Exception as e:
+        print(f" -> column_schema already exists or error: {e}")
+
+    # Existing datasets keep NULL and get their compact dtypes inferred on load.
+    conn.commit()
+    print("Column Schema Migration Finalized successfully.")
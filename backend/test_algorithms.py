@@ -121,5 +121,429 @@ class TestBackendAlgorithms(unittest.TestCase):
         # Should be nullable integer type (Int64)
         self.assertTrue(pd.api.types.is_integer_dtype(modified_df['age']))
 
+    def test_secondary_index_filters(self):
+        """Range, equality and IS NULL predicates resolve through the column indexes."""
+        import os
+        import tempfile
+        from app.services.index_service import match_rows
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "staff.csv")
+            self.df.to_csv(path, index=False)
+            cols = list(self.df.columns)
+
+            self.assertEqual(match_rows(path, cols, [{"column": "age", "op": "is_null"}]).tolist(), [2])
+            self.assertEqual(match_rows(path, cols, [{"column": "age", "op": "between", "value": [25, 35]}]).tolist(), [0, 1, 3, 5])
+            self.assertEqual(match_rows(path, cols, [{"column": "department", "op": "eq", "value": "HR"}]).tolist(), [1, 3])
+            combined = match_rows(path, cols, [
+                {"column": "department", "op": "eq", "value": "IT"},
+                {"column": "salary", "op": "gt", "value": 50000}
+            ])
+            self.assertEqual(combined.tolist(), [2, 6])
+
+    def test_pushdown_filters_match_indexes(self):
+        """Row-group scans return the same row ids as the secondary indexes."""
+        import os
+        import tempfile
+        from app.services.index_service import scan_rows, get_column_index, evaluate_predicate
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "staff.csv")
+            self.df.to_csv(path, index=False)
+            for f in [
+                {"column": "age", "op": "is_null"},
+                {"column": "age", "op": "between", "value": [25, 35]},
+                {"column": "department", "op": "in", "value": ["HR", "Sales"]},
+                {"column": "salary", "op": "gt", "value": 50000},
+            ]:
+                expected = evaluate_predicate(get_column_index(path, f["column"]), f["op"], f.get("value"))
+                self.assertEqual(scan_rows(path, [f]).tolist(), expected.tolist())
+
+    def test_date_filters_on_text_dates(self):
+        """Schema-datetime columns stored as text filter and sort by time, not by string."""
+        import os
+        import tempfile
+        from app.services.index_service import scan_rows, match_rows, get_column_index, get_sort_order
+
+        df = pd.DataFrame({"when": ["2024-01-15", "2024-03-02", None, "2023-12-31", "2024-02-29", "2024-11-01"]})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "events.csv")
+            df.to_csv(path, index=False)
+            dates = ("when",)
+            f = {"column": "when", "op": "gte", "value": "2024-02-29"}
+            self.assertEqual(scan_rows(path, [f], date_columns=dates).tolist(), [1, 4, 5])
+            get_column_index(path, "when", dates)
+            self.assertEqual(match_rows(path, ["when"], [f], dates).tolist(), [1, 4, 5])
+            self.assertEqual(get_sort_order(path, "when", date_columns=dates)["order"][:3].tolist(), [3, 0, 4])
+
+    def test_fast_json_records(self):
+        """Row fragments map NaN to null and splice into orjson payloads unchanged."""
+        import json
+        from app.core.serialization import dumps, records_fragment
+
+        payload = json.loads(dumps({"rows": records_fragment(self.df.head(3)), "n": np.int64(3), "m": np.float64("nan")}))
+        self.assertEqual(payload["n"], 3)
+        self.assertIsNone(payload["m"])
+        self.assertIsNone(payload["rows"][2]["age"])
+        self.assertEqual(payload["rows"][1]["department"], "HR")
+
+        # Floats keep their shortest round-trip repr, dates their isoformat()
+        values = pd.DataFrame({"x": [66557.544502378543, 1.234567890123e-7], "d": pd.to_datetime(["2024-01-01", None])})
+        rows = json.loads(dumps(records_fragment(values)))
+        self.assertEqual([r["x"] for r in rows], [66557.544502378543, 1.234567890123e-7])
+        self.assertEqual([r["d"] for r in rows], ["2024-01-01T00:00:00", None])
+
+        # Columns are encoded whole and split per row: commas/quotes in text and nested values survive
+        text = pd.DataFrame({"s": ['a,"b"', "c\\", None], "m": [[1, "x,y"], "z", 2.5]})
+        self.assertEqual(json.loads(dumps(records_fragment(text))), [
+            {"s": 'a,"b"', "m": [1, "x,y"]}, {"s": "c\\", "m": "z"}, {"s": None, "m": 2.5},
+        ])
+
+        # JSON exports stream the same encoding
+        import os
+        import tempfile
+        from app.services.stream_export import iter_encoded
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "values.parquet")
+            values.to_parquet(path, index=False)
+            exported = json.loads(b"".join(iter_encoded(path, "json")))
+        self.assertEqual(exported, rows)
+
+    def test_json_array_of_arrays(self):
+        """Top-level arrays of arrays (orient='values') load as positional columns."""
+        import os
+        import tempfile
+        from app.services.ingestion import load_frame
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "values.json")
+            pd.DataFrame({"n": [1, 2], "s": ["a", "b"]}).to_json(path, orient="values")
+            frame = load_frame(path, "json")
+        self.assertEqual(list(frame.columns), ["column_1", "column_2"])
+        self.assertEqual(frame["column_1"].tolist(), [1, 2])
+        self.assertEqual(frame["column_2"].tolist(), ["a", "b"])
+
+    def test_csv_numeric_header_and_late_latin1(self):
+        """Year headers over decimal columns stay headers; all-int rows are data; non-UTF-8 past the sniffed head still loads."""
+        import os
+        import tempfile
+        from app.services.ingestion import load_frame, SNIFF_BYTES
+
+        with tempfile.TemporaryDirectory() as tmp:
+            years = os.path.join(tmp, "years.csv")
+            with open(years, "w") as f:
+                f.write("2019,2020,2021\n1.5,2.5,3.5\n4.0,5.0,6.0\n")
+            frame = load_frame(years, "csv")
+            self.assertEqual(list(frame.columns), ["2019", "2020", "2021"])
+            self.assertEqual(len(frame), 2)
+
+            plain = os.path.join(tmp, "plain.csv")
+            with open(plain, "w") as f:
+                f.write("1,2,3\n4,5,6\n")
+            frame = load_frame(plain, "csv")
+            self.assertEqual(list(frame.columns), ["column_1", "column_2", "column_3"])
+            self.assertEqual(frame["column_1"].tolist(), [1, 4])
+
+            late = os.path.join(tmp, "late.csv")
+            with open(late, "wb") as f:
+                f.write(b"name,n\n" + b"abc,1\n" * (SNIFF_BYTES // 6 + 10) + b"caf\xe9,2\n")
+            frame = load_frame(late, "csv")
+            self.assertEqual(frame["name"].iloc[-1], "café")
+
+    def test_dtype_schema_roundtrip(self):
+        """Stored schemas shrink dtypes on load without changing values; categoricals still accept new fills."""
+        from app.services.dtype_optimizer import dump_schema, apply_schema, fill_text
+
+        df = pd.DataFrame({
+            "qty": [1, 2, 3, 4],
+            "dept": ["HR", "IT", "HR", "IT"],
+            "code": ["a1", "b2", "c3", None],
+            "day": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]
+        })
+        compact = apply_schema(df, dump_schema(df))
+        self.assertEqual(str(compact["qty"].dtype), "int8")
+        self.assertEqual(str(compact["dept"].dtype), "category")
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(compact["day"]))
+        self.assertEqual(compact["code"].tolist()[:3], ["a1", "b2", "c3"])
+        self.assertEqual(compact["qty"].sum(), 10)
+        filled = fill_text(compact["dept"].where(compact["qty"] > 1), "Unknown")
+        self.assertEqual(filled.tolist(), ["Unknown", "IT", "HR", "IT"])
+
+    def test_out_of_core_partial_aggregates(self):
+        """Chunk-wise moments and correlation sums merge to the whole-frame pandas results."""
+        from app.services.out_of_core import Moments, CorrelationAccumulator
+
+        rng = np.random.default_rng(7)
+        frame = pd.DataFrame({"a": rng.lognormal(0, 1, 1000), "b": rng.normal(5, 2, 1000)})
+        frame.loc[::9, "a"] = np.nan
+        moments = Moments()
+        acc = CorrelationAccumulator(["a", "b"])
+        for start in range(0, 1000, 137):
+            chunk = frame.iloc[start:start + 137]
+            moments.update(chunk["a"].to_numpy())
+            acc.update(chunk)
+        self.assertAlmostEqual(moments.mean, frame["a"].mean())
+        self.assertAlmostEqual(moments.std, frame["a"].std())
+        self.assertAlmostEqual(moments.skew, frame["a"].skew())
+        np.testing.assert_allclose(acc.matrix(["a", "b"]).values, frame.corr().values)
+
+    def test_cube_rollup_matches_groupby(self):
+        """A finer cube rolled up to fewer keys gives pandas' own group statistics."""
+        from app.services.aggregation_service import parse_measures, _build_cube, _rollup, _finalize_cube
+
+        measures = parse_measures(["count", "sum:salary", "mean:salary", "std:salary", "max:age"])
+        cube = _build_cube(self.df, ["department", "remote"], ["salary", "age"])
+        result = _finalize_cube(_rollup(cube, ["department"]), measures).sort_index()
+        grouped = self.df.groupby("department")
+        self.assertEqual(result["count"].tolist(), grouped.size().tolist())
+        np.testing.assert_allclose(result["sum_salary"], grouped["salary"].sum())
+        np.testing.assert_allclose(result["mean_salary"], grouped["salary"].mean())
+        np.testing.assert_allclose(result["std_salary"], grouped["salary"].std())
+        self.assertEqual(result["max_age"].tolist(), grouped["age"].max().tolist())
+
+    def test_time_buckets_match_pandas_periods(self):
+        """Calendar bucket starts agree with pandas periods (weeks start on Monday)."""
+        from app.services.timeseries_service import bucket_starts
+
+        stamps = pd.to_datetime(["1969-12-31 23:59:00", "2024-02-29 13:45:00", "2024-03-03 00:00:00", "2024-12-31 23:59:59"])
+        ns = stamps.to_numpy(dtype="datetime64[ns]").view("int64")
+        for granularity, freq in [("hour", "h"), ("day", "D"), ("week", "W-SUN"), ("month", "M"), ("quarter", "Q"), ("year", "Y")]:
+            expected = stamps.to_period(freq).start_time
+            self.assertEqual(pd.to_datetime(bucket_starts(ns, granularity)).tolist(), expected.tolist(), granularity)
+
+    @patch('app.services.profile_service.get_dataframe')
+    def test_vectorized_issue_detection(self, mock_get_df):
+        """Frame-level checks report the same issues as the per-column rules."""
+        from app.services.issue_detection import detect_issues
+
+        df = self.df.copy()
+        df["code"] = ["1", "2", "3", "4", "5", "1", "n/a"]  # numbers stored as text
+        mock_get_df.return_value = df
+        mock_session = MagicMock()
+        mock_session.get.return_value.file_size_bytes = 0
+        mock_session.get.return_value.filepath = None  # nothing on disk: artifacts are computed, not cached
+
+        issues = detect_issues(1, mock_session)["issues"]
+        found = [(i["issue"], i["column"]) for i in issues]
+        self.assertEqual(found, [
+            ("Missing Values", "age"), ("Missing Values", "salary"), ("Duplicate Rows", "Entire Dataset"),
+            ("Outliers", "age"), ("Skewed Distribution", "age"), ("Outliers", "salary"),
+            ("Skewed Distribution", "salary"), ("Incorrect Data Type", "code")
+        ])
+        self.assertEqual(issues[0]["affected_row_indices"], [2])
+        self.assertEqual(issues[3]["affected_row_indices"], [6])
+        self.assertEqual(issues[-1]["affected_row_indices"], [6])
+        self.assertAlmostEqual(issues[-1]["ratio"], 1 / 7)
+
+        # Flags and amounts whose text all matches are not type issues
+        clean = pd.DataFrame({"flag": ["yes", "no"] * 10, "price": ["$1,200.00", "$35.50"] * 10, "n": range(20)})
+        mock_get_df.return_value = clean
+        report = detect_issues(2, mock_session)
+        self.assertEqual((report["issues"], report["health_score"]), ([], 100))
+
+    def test_type_inference_verdicts(self):
+        """Sampled probing confirms numbers, amounts, flags and dates stored as text."""
+        from app.services.type_inference import infer_column, convert
+
+        n = 5000
+        columns = {
+            "numeric": pd.Series([str(i) for i in range(n)], dtype=object),
+            "currency": pd.Series([f"${i:,}.50" for i in range(n)], dtype=object),
+            "boolean": pd.Series(["Yes", "no"] * (n // 2), dtype=object),
+            "date": pd.Series([f"2024-01-{i % 28 + 1:02d}" for i in range(n)], dtype=object),
+            "text": pd.Series([f"item {i}" for i in range(n)], dtype=object),
+        }
+        for kind, series in columns.items():
+            series.iloc[[7, 4000]] = "unknown"
+            if kind == "boolean":
+                series = columns[kind] = series.astype("category")  # categories are tested without sampling
+            verdict = infer_column(series)
+            if kind == "text":
+                self.assertIsNone(verdict["kind"])
+                continue
+            self.assertEqual(verdict["kind"], kind)
+            self.assertEqual((verdict["bad_count"], verdict["bad_rows"]), (2, [7, 4000]))
+
+        self.assertEqual(convert(columns["currency"]).iloc[1234], 1234.5)
+        self.assertEqual(convert(columns["boolean"]).iloc[:2].tolist(), [True, False])
+        self.assertTrue(pd.isna(convert(columns["date"]).iloc[7]))
+
+    def test_parallel_column_profiling_keeps_order(self):
+        """Column blocks profiled on worker threads merge back in column order."""
+        import os
+        from app.services import column_profiler
+
+        wide = pd.DataFrame(np.random.rand(50, 23), columns=[f"c{i}" for i in range(23)])
+        wide.iloc[::7, ::3] = np.nan
+        with patch.object(column_profiler, "PROFILE_WORKERS", 4), patch.object(column_profiler, "PARALLEL_MIN_CELLS", 0):
+            blocks = column_profiler.partition(list(range(23)), 8)
+            self.assertEqual([p for block in blocks for p in block], list(range(23)))
+            self.assertEqual(column_profiler.map_columns(wide, lambda s: (s.name, int(s.isna().sum()))),
+                             [(c, int(wide[c].isna().sum())) for c in wide.columns])
+
+        # macOS and Windows have no CPU affinity mask
+        with patch.object(column_profiler.os, "sched_getaffinity", None, create=True):
+            self.assertEqual(column_profiler._available_cpus(), os.cpu_count() or 1)
+
+    def test_line_charts_keep_a_contiguous_axis(self):
+        """Bars rank groups by value; lines keep the first top_k x values in axis order."""
+        from app.services import viz_service
+
+        rows = pd.DataFrame({"age": [25, 30, 35], "mean_salary": [50000.0, 60000.0, 55000.0]})
+        session = MagicMock()
+        session.get.return_value = MagicMock(file_size_bytes=0)
+        with patch.object(viz_service, "get_column_names", return_value=list(self.df.columns)), \
+             patch.object(viz_service.out_of_core, "empty_frame", return_value=self.df[["age", "salary"]].head(0)), \
+             patch.object(viz_service.aggregation_service, "aggregate", return_value={"rows": rows, "meta": {}}) as aggregate:
+            chart = viz_service.get_chart_data(1, "age", "line", "salary", session=session, top_k=3)
+            self.assertEqual(chart["data"][0]["x"], [25, 30, 35])
+            kwargs = aggregate.call_args.kwargs
+            self.assertEqual((kwargs["sort_by"], kwargs["descending"], kwargs["limit"]), ("age", False, 3))
+            self.assertNotIn("top_k", kwargs)
+
+            viz_service.get_chart_data(1, "age", "bar", "salary", session=session, top_k=3)
+            self.assertEqual(aggregate.call_args.kwargs["top_k"], 3)
+
+    def test_child_profile_derived_from_parent(self):
+        """A repaired version's derived profile matches a cold profile of the child as reloaded."""
+        import os
+        import tempfile
+        from app.services import profile_service, artifact_cache, dtype_optimizer
+        from app.services.eda_service import _load_dataframe_from_disk
+        from app.services.dataset_service import _save_dataframe
+        from app.services.repair_engine import apply_strategy
+
+        with tempfile.TemporaryDirectory() as tmp:
+            stored = {}
+
+            def reload(dataset_id, session=None):
+                return _load_dataframe_from_disk(*stored[dataset_id]).copy()
+
+            def store(dataset_id, frame):
+                path = os.path.join(tmp, f"{dataset_id}.csv")
+                _save_dataframe(frame, path, "csv")
+                stored[dataset_id] = (path, dtype_optimizer.dump_schema(frame))
+                return reload(dataset_id)
+
+            parent = self.df.copy()
+            parent["code"] = ["1", "2", "3", "4", "5", "1", "n/a"]
+            parent = store(1, parent)
+            parent_profile = profile_service.build_profile(parent)
+            with patch.object(profile_service, "get_dataframe", side_effect=reload), \
+                 patch.object(artifact_cache, "lookup", return_value=parent_profile), \
+                 patch.object(artifact_cache, "dataset_fingerprint", return_value="parent"), \
+                 patch.object(artifact_cache, "get_or_compute", side_effect=lambda s, d, kind, compute: compute()):
+                for child_id, (column, strategy) in enumerate([("age", "Median Imputation"), ("Entire Dataset", "Duplicate Removal")], 2):
+                    child, _ = apply_strategy(parent.copy(), column, strategy)
+                    store(child_id, child)
+                    derived = profile_service.derive_profile(MagicMock(), MagicMock(id=1), MagicMock(id=child_id), child)
+                    self.assertEqual(derived, profile_service.build_profile(reload(child_id)), strategy)
+                    if strategy == "Median Imputation":
+                        # Stored and reloaded, the imputed column is plain int64, not the in-memory Int64
+                        self.assertEqual(derived["columns"][0]["dtype"], str(reload(child_id)["age"].dtype))
+                        # Columns the repair did not rewrite keep the parent's entries
+                        self.assertIs(derived["columns"][-1], parent_profile["columns"][-1])
+
+    def test_resumable_prefix_hash_survives_workers_and_resends(self):
+        """The whole-file digest stays right when another worker took chunks or one is re-sent."""
+        import asyncio, hashlib, tempfile
+        from app.services import resumable_upload
+
+        def send(upload_id, index, data):
+            request = MagicMock(headers={"x-chunk-sha256": hashlib.sha256(data).hexdigest()})
+            async def stream():
+                yield data
+            request.stream = stream
+            return asyncio.run(resumable_upload.receive_chunk(upload_id, index, request))
+
+        size = resumable_upload.MIN_CHUNK_SIZE
+        chunks = [bytes([i]) * size for i in range(3)]
+        with tempfile.TemporaryDirectory() as tmp, patch.object(resumable_upload, "RESUMABLE_DIR", tmp), \
+             patch.object(resumable_upload.staging_service, "stage_file", return_value={}):
+            upload_id = resumable_upload.init_upload("a.csv", 3 * size, size)["upload_id"]
+            send(upload_id, 0, b"x" * size)
+            resumable_upload._prefix_hashers.clear()  # chunk 1 lands on another worker
+            send(upload_id, 1, chunks[1])
+            send(upload_id, 0, chunks[0])  # re-sent with different bytes after it was hashed
+            send(upload_id, 2, chunks[2])
+            payload = resumable_upload.complete_upload(upload_id)
+        self.assertEqual(payload["sha256"], hashlib.sha256(b"".join(chunks)).hexdigest())
+
+    def test_resumable_corrupted_resend_leaves_chunk_intact(self):
+        """A re-sent chunk that fails its checksum is rejected without touching the accepted bytes."""
+        import asyncio, hashlib, os, tempfile
+        from fastapi import HTTPException
+        from app.services import resumable_upload
+
+        def send(upload_id, index, data, digest=None):
+            request = MagicMock(headers={"x-chunk-sha256": digest or hashlib.sha256(data).hexdigest()})
+            async def stream():
+                yield data
+            request.stream = stream
+            return asyncio.run(resumable_upload.receive_chunk(upload_id, index, request))
+
+        size = resumable_upload.MIN_CHUNK_SIZE
+        chunks = [bytes([i]) * size for i in range(3)]
+        staged = {}
+        with tempfile.TemporaryDirectory() as tmp, patch.object(resumable_upload, "RESUMABLE_DIR", tmp), \
+             patch.object(resumable_upload.staging_service, "stage_file",
+                          side_effect=lambda path, *args: staged.update(data=open(path, "rb").read()) or {}):
+            upload_id = resumable_upload.init_upload("a.csv", 3 * size, size)["upload_id"]
+            for index, chunk in enumerate(chunks):
+                send(upload_id, index, chunk)
+            with self.assertRaises(HTTPException) as rejected:
+                send(upload_id, 1, b"garbage".ljust(size, b"!"), digest="0" * 64)
+            self.assertEqual(rejected.exception.status_code, 400)
+            self.assertFalse([name for name in os.listdir(os.path.join(tmp, upload_id)) if name.endswith(".tmp")])
+            payload = resumable_upload.complete_upload(upload_id)
+        self.assertEqual(staged["data"], b"".join(chunks))
+        self.assertEqual(payload["sha256"], hashlib.sha256(b"".join(chunks)).hexdigest())
+
+    def test_blob_refs_survive_racing_uploads(self):
+        """Two uploads of the same content share one row: the losing insert becomes a reference."""
+        import os, tempfile
+        from sqlmodel import SQLModel, Session, create_engine
+        from app.models.blob import StoredBlob
+        from app.services import blob_store
+
+        with tempfile.TemporaryDirectory() as tmp, patch.object(blob_store, "BLOB_DIR", os.path.join(tmp, "blobs")), \
+             patch.object(blob_store, "INCOMING_DIR", os.path.join(tmp, "incoming")):
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'avis.db')}")
+            SQLModel.metadata.create_all(engine, tables=[StoredBlob.__table__])
+
+            def upload():
+                path = blob_store.incoming_path("csv")
+                with open(path, "w") as f:
+                    f.write("a,b\n1,2\n")
+                return path
+
+            with Session(engine) as first, Session(engine) as second:
+                real_get, calls = second.get, []
+
+                def stale_get(*args, **kwargs):
+                    # The second upload looked for the row before the first one committed it
+                    calls.append(args)
+                    return None if len(calls) == 1 else real_get(*args, **kwargs)
+
+                blob = blob_store.put_file(first, upload(), "csv")
+                first.commit()
+                with patch.object(second, "get", side_effect=stale_get):
+                    shared = blob_store.put_file(second, upload(), "csv")
+                second.commit()
+                self.assertEqual(shared.sha256, blob.sha256)
+                self.assertEqual(shared.ref_count, 2)
+                self.assertTrue(os.path.exists(blob.storage_path))
+
+            with Session(engine) as session:
+                blob_store.release(session, blob.sha256)
+                session.commit()
+                self.assertEqual(session.get(StoredBlob, blob.sha256).ref_count, 1)
+                blob_store.release(session, blob.sha256)
+                session.commit()
+                self.assertIsNone(session.get(StoredBlob, blob.sha256))
+                self.assertFalse(os.path.exists(blob.storage_path))
+            engine.dispose()
+
 if __name__ == '__main__':
     unittest.main()
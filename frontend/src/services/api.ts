@@ -43,6 +43,14 @@ export const previewDataset = async (file: File): Promise<PreviewData> => {
   return response.data;
 };
 
+/**
+ * Commits a previewed upload using its staged token (no second file transfer).
+ */
+export const commitStagedUpload = async (uploadToken: string): Promise<Dataset> => {
+  const response = await api.post<Dataset>(`datasets/upload/${uploadToken}`);
+  return response.data;
+};
+
 /**
  * Retrieves forensic preview data for an existing dataset.
  */
@@ -96,25 +104,76 @@ export const getCorrelationMatrix = async (
 
 // --- Interactive Visualization ---
 
+/** Row predicate shared by charts and the row drilldown (op: eq, in, gt, gte, lt, lte, between, is_null, not_null). */
+export interface RowFilter {
+  column: string;
+  op: string;
+  value?: unknown;
+}
+
 /**
- * Fetches formatted data for dynamic Plotly charting.
+ * Grouping options for bar/line/area charts (agg: count, sum, mean, median, min, max, std, nunique, pNN).
+ * Datetime X axes are bucketed by granularity (auto, minute, hour, day, week, month, quarter, year).
+ */
+export interface ChartAggregation {
+  agg?: string;
+  topK?: number;
+  others?: boolean;
+  granularity?: string;
+  start?: string;
+  end?: string;
+}
+
+/**
+ * Fetches formatted data for dynamic Plotly charting, optionally over a filtered subset.
  */
 export const getChartData = async (
   id: number,
   xCol: string,
   chartType: string,
-  yCol?: string
+  yCol?: string,
+  filters?: RowFilter[],
+  aggregation?: ChartAggregation
 ): Promise<any> => {
   const params = new URLSearchParams({
     x_col: xCol,
     chart_type: chartType,
   });
   if (yCol) params.append("y_col", yCol);
+  if (filters && filters.length) params.append("filters", JSON.stringify(filters));
+  if (aggregation?.agg) params.append("agg", aggregation.agg);
+  if (aggregation?.topK) params.append("top_k", String(aggregation.topK));
+  if (aggregation?.others) params.append("others", "true");
+  if (aggregation?.granularity) params.append("granularity", aggregation.granularity);
+  if (aggregation?.start) params.append("start", aggregation.start);
+  if (aggregation?.end) params.append("end", aggregation.end);
 
   const response = await api.get(`viz/${id}/chart?${params.toString()}`);
   return response.data;
 };
 
+/**
+ * Pivot-style group-by: several keys, 'agg:column' measures (e.g. "sum:amount"), ranked top-k.
+ */
+export const getAggregate = async (
+  id: number,
+  groupBy: string[],
+  measures: string[] = ["count"],
+  options: { sortBy?: string; descending?: boolean; topK?: number; others?: boolean; filters?: RowFilter[] } = {}
+): Promise<any> => {
+  const params = new URLSearchParams();
+  groupBy.forEach((key) => params.append("group_by", key));
+  measures.forEach((measure) => params.append("measure", measure));
+  if (options.sortBy) params.append("sort_by", options.sortBy);
+  if (options.descending === false) params.append("descending", "false");
+  if (options.topK) params.append("top_k", String(options.topK));
+  if (options.others) params.append("others", "true");
+  if (options.filters && options.filters.length) params.append("filters", JSON.stringify(options.filters));
+
+  const response = await api.get(`viz/${id}/aggregate?${params.toString()}`);
+  return response.data;
+};
+
 // --- Context-Aware AI Assistance ---
 
 /**
@@ -238,6 +297,18 @@ export const restoreDatasetVersion = async (id: number): Promise<any> => {
    return response.data;
 }
 
+// --- Read-only SQL (tables: data, v<n>, dataset_<id>) ---
+
+export const getQueryTables = async (id: number): Promise<any> => {
+  const response = await api.get(`sql/${id}/tables`);
+  return response.data;
+};
+
+export const runSqlQuery = async (id: number, query: string, limit?: number): Promise<any> => {
+  const response = await api.post(`sql/${id}`, { query, limit });
+  return response.data;
+};
+
 // --- Authentication Management ---
 
 export const login = async (email: string, password: string): Promise<any> => {
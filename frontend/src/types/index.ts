@@ -138,6 +138,10 @@ export interface PreviewData {
   dataset_explanation?: DatasetExplanation;
   readiness?: DatasetReadiness;
   parent_dataset_id?: number | null;
+
+  // Staged upload handle returned by /datasets/preview
+  upload_token?: string;
+  upload_token_ttl_seconds?: number;
 }
 
 /**